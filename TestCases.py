@@ -21,7 +21,7 @@ def run_tests():
     else:
         print(f"Cache file '{CACHE_FILE}' not found.")
         with open(CACHE_FILE, 'wb') as f:
-            CubeTools.save_to(f)
+            CubeTools.save_to(f, jobs=os.cpu_count() or 1)
             
     init_duration = time.time() - init_start_time
     print(f"--- Initialization Complete ({init_duration:.2f}s) ---\n")
@@ -66,7 +66,44 @@ def run_tests():
         print(f"Solution: {solution} (found in {solve_duration:.4f}s)\n")
 
 
+def run_api_tests():
+    """
+    Checks request validation in app.py: time limits that are not positive, finite numbers and search bounds
+    that are not positive integers are rejected.
+    """
+    import app
+    print("--- API Validation Tests ---")
+    for value in (float("nan"), float("inf"), -float("inf"), 0, -1, True, "5"):
+        time_limit, error = app.parse_time_limit(value)
+        assert time_limit is None and error, f"time_limit {value!r} was accepted"
+    assert app.parse_time_limit(1) == (1.0, None)
+    assert app.parse_time_limit(None) == (app.SOLVE_TIME_LIMIT, None)
+    assert app.parse_time_limit(1e9) == (app.SOLVE_TIME_LIMIT, None)
+    for value in ("0", "-3", "1.5", "abc", ""):
+        bound, error = app.parse_search_bound(value, "max_depth", 21, app.MAX_SEARCH_DEPTH)
+        assert bound is None and error, f"max_depth {value!r} was accepted"
+    assert app.parse_search_bound(None, "max_depth", 21, app.MAX_SEARCH_DEPTH) == (21, None)
+    assert app.parse_search_bound("99", "max_depth", 21, app.MAX_SEARCH_DEPTH) == (app.MAX_SEARCH_DEPTH, None)
+
+    app.tables_ready.wait()
+    client = app.app.test_client()
+    for body in ('{"scramble": "R U", "time_limit": NaN}', '{"scramble": "R U", "time_limit": Infinity}'):
+        response = client.post("/solve", data=body, content_type="application/json")
+        assert response.status_code == 400, f"{body} gave {response.status_code}"
+    response = client.get("/solve/stream?scramble=R&time_limit=nan")
+    assert response.status_code == 400, f"/solve/stream gave {response.status_code}"
+    response = client.post("/solve/batch?time_limit=nan", json=["R U"])
+    assert response.status_code == 400, f"/solve/batch gave {response.status_code}"
+    for query in ("max_depth=-1", "max_depth=x", "max_probes=0"):
+        response = client.post(f"/solve/batch?{query}", json=["R U"])
+        assert response.status_code == 400, f"/solve/batch?{query} gave {response.status_code}"
+    response = client.post("/solve/batch?max_depth=1000&max_probes=99999999", json=["R U"])
+    assert response.status_code == 200 and b'"solution"' in response.data, response.data
+    print("All API validation tests passed.\n")
+
+
 if __name__ == "__main__":
     print(f"\n\n------------------ To observe time taken to generate tables, please delete `cache.bin` ------------------\n\n")
     run_tests()
+    run_api_tests()
     print(f"\n\n------------------ To enter custom scramble through CLI, please run `main.py` ------------------\n\n")
@@ -1,29 +1,131 @@
+import json
+import math
 import os
+import queue
+import threading
 import time
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from batch_solver import BatchSolver
 from solver import Search
 from cube_io_and_display import CubeTools
 from cubie_cube import CubieCube
+from optimal_search import OptimalSearch, OptimalTableUnavailable
 
 app = Flask(__name__)
 
 # --- Server-side Initialization ---
 
 CACHE_FILE = "cache.bin"
-print("--- Initializing Solver ---")
-init_start_time = time.time()
-if os.path.exists(CACHE_FILE):
-    print(f"Loading tables from '{CACHE_FILE}'...")
-    with open(CACHE_FILE, 'rb') as f:
-        CubeTools.init_from(f)
-else:
-    print(f"Cache file not found. Generating new tables...")
-    with open(CACHE_FILE, 'wb') as f:
-        CubeTools.save_to(f)
-init_duration = time.time() - init_start_time
-print(f"--- Initialization Complete ({init_duration:.2f}s) ---")
+# Compressed table bundle from build_bundle.py; preferred over CACHE_FILE when present
+TABLE_BUNDLE = os.environ.get("TABLE_BUNDLE", "tables.bundle")
+# Seconds clients are told to wait (Retry-After) while the tables are still loading
+TABLE_RETRY_AFTER = int(os.environ.get("TABLE_RETRY_AFTER", 5))
+tables_ready = threading.Event()
+tables_error = None
+init_duration = None
+
+def initialize_tables():
+    """
+    Loads the solver tables from TABLE_BUNDLE (regenerating them in memory if it fails its checksum) or
+    CACHE_FILE, or generates and saves them if neither file exists.
+    Runs on a background thread so the server can answer health checks meanwhile.
+    """
+    global tables_error, init_duration
+    print("--- Initializing Solver ---")
+    init_start_time = time.time()
+    try:
+        if os.environ.get("TWIST_FLIP_PRUNING") == "1":
+            Search.set_twist_flip_pruning(True)
+        if os.path.exists(TABLE_BUNDLE):
+            print(f"Loading tables from '{TABLE_BUNDLE}'...")
+            CubeTools.init_from_bundle(TABLE_BUNDLE, jobs=os.cpu_count() or 1)
+        elif os.path.exists(CACHE_FILE):
+            print(f"Loading tables from '{CACHE_FILE}'...")
+            with open(CACHE_FILE, 'rb') as f:
+                CubeTools.init_from(f)
+        else:
+            print(f"Cache file not found. Generating new tables...")
+            with open(CACHE_FILE, 'wb') as f:
+                CubeTools.save_to(f, jobs=os.cpu_count() or 1)
+        Search.set_solution_cache(int(os.environ.get("SOLUTION_CACHE_SIZE", 10000)))
+        global batch_solver
+        batch_solver = create_batch_solver()
+    except Exception as e:
+        tables_error = str(e)
+        print(f"--- Initialization Failed: {tables_error} ---")
+        return
+    init_duration = time.time() - init_start_time
+    tables_ready.set()
+    print(f"--- Initialization Complete ({init_duration:.2f}s) ---")
+    # The optimal mode's table is only mapped here, never built; without it optimal requests are refused
+    try:
+        OptimalSearch.init()
+    except OptimalTableUnavailable as e:
+        print(f"--- Optimal solving disabled: {e} ---")
+
+threading.Thread(target=initialize_tables, name="table-warmup", daemon=True).start()
+
+# Per-cube search time limit in seconds; requests may ask for less
+SOLVE_TIME_LIMIT = float(os.environ.get("SOLVE_TIME_LIMIT", 5))
+# Caps on the max_depth and max_probes query parameters; the solver's move buffers hold 30 moves
+MAX_SEARCH_DEPTH = 30
+MAX_SEARCH_PROBES = int(os.environ.get("MAX_SEARCH_PROBES", 1000000))
 # -----------------------------
 
+def parse_time_limit(value):
+    """
+    Validates a requested time limit in seconds, capped at SOLVE_TIME_LIMIT.
+    Returns (time_limit, error).
+    """
+    if value is None:
+        return SOLVE_TIME_LIMIT, None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        return None, 'Invalid request. time_limit must be a positive, finite number of seconds.'
+    return min(float(value), SOLVE_TIME_LIMIT), None
+
+def parse_search_bound(value, name, default, cap):
+    """
+    Validates an optional positive integer query parameter, capped at `cap`.
+    Returns (value, error).
+    """
+    if value is None:
+        return default, None
+    try:
+        value = int(value)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        return None, f'Invalid request. {name} must be a positive integer.'
+    return min(value, cap), None
+
+def tables_not_ready():
+    """
+    503 response for solving endpoints hit before the tables are loaded.
+    """
+    response = jsonify({'error': 'Solver tables are still loading. Retry later.'})
+    response.headers['Retry-After'] = str(TABLE_RETRY_AFTER)
+    return response, 503
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """
+    Liveness check: fails only if loading the tables failed, since this process can then never serve a solve.
+    """
+    if tables_error is not None:
+        return jsonify({'status': 'error', 'error': tables_error}), 500
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    Readiness check: 200 with the table load time once the tables are loaded, 503 with Retry-After until then.
+    """
+    if not tables_ready.is_set():
+        response = jsonify({'ready': False, 'error': tables_error})
+        response.headers['Retry-After'] = str(TABLE_RETRY_AFTER)
+        return response, 503
+    return jsonify({'ready': True, 'init_time': init_duration})
+
 @app.route('/')
 def index():
     """
@@ -35,30 +137,220 @@ def index():
 def solve():
     """
     API endpoint to solve a given scramble.
-    Accepts a JSON object with a scramble key.
-    Returns a JSON object containing the solution and the time taken to find it.
+    Accepts a JSON object with a scramble key, an optional time_limit in seconds and an optional
+    optimal flag asking for a shortest solution (much slower; "Error 9" if the time limit runs out first;
+    503 if the optimal table was not built offline).
+    Returns a JSON object containing the solution, the time taken to find it and whether
+    the time limit cut the search short (the solution is then the best one found in time).
+    With "stats": true it also carries the search's node counts, probes and per-phase timings.
+    Returns 503 with Retry-After while the tables are still loading.
     """
+    if not tables_ready.is_set():
+        return tables_not_ready()
     data = request.get_json()
     if not data or 'scramble' not in data:
         return jsonify({'error': 'Invalid request. Scramble not provided.'}), 400
 
     scramble_string = data['scramble']
+    time_limit, error = parse_time_limit(data.get('time_limit'))
+    if error:
+        return jsonify({'error': error}), 400
+    optimal = data.get('optimal', False)
+    if not isinstance(optimal, bool):
+        return jsonify({'error': 'Invalid request. optimal must be true or false.'}), 400
+    if optimal and not OptimalSearch.inited:
+        if OptimalSearch.init_error is not None:
+            return jsonify({'error': f'Optimal solving is unavailable. {OptimalSearch.init_error}'}), 503
+        return tables_not_ready()
+    with_stats = data.get('stats', False)
+    if not isinstance(with_stats, bool):
+        return jsonify({'error': 'Invalid request. stats must be true or false.'}), 400
 
     max_depth = 21
     probe_max = 100000
     probe_min = 0
-    verbose = 0
+    verbose = Search.OPTIMAL_SOLUTION if optimal else 0
 
     try:
         search_solver = Search() 
         facelets = CubeTools.from_scramble_string(scramble_string)
         start_time = time.time()
-        solution = search_solver.solution(facelets, max_depth, probe_max, probe_min, verbose)
+        solution = search_solver.solution(facelets, max_depth, probe_max, probe_min, verbose, time_limit)
         solve_duration = time.time() - start_time
-        return jsonify({'solution': solution, 'time': solve_duration})
+        response = {'solution': solution, 'time': solve_duration, 'cut_short': search_solver.cut_short}
+        if with_stats:
+            response['stats'] = search_solver.stats.to_dict()
+        return jsonify(response)
 
     except Exception as e:
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/solve/stream', methods=['GET'])
+def solve_stream():
+    """
+    Server-sent-events version of /solve, for EventSource clients.
+    Takes scramble and optional max_depth, min_probes and time_limit query parameters. Unlike /solve it
+    keeps searching for shorter solutions after the first one, for at least min_probes probes.
+    Emits a "solution" event (solution, length, time) for every shorter solution as soon as the search
+    finds it, then one "done" event with the final solution (or error) and cut_short. The search is
+    cancelled if the client disconnects.
+    """
+    if not tables_ready.is_set():
+        return tables_not_ready()
+    scramble_string = request.args.get('scramble')
+    if not scramble_string or not CubeTools.input_sanitizer(scramble_string):
+        return jsonify({'error': 'Invalid request. Scramble not provided.'}), 400
+    max_depth, error = parse_search_bound(request.args.get('max_depth'), 'max_depth', 21, MAX_SEARCH_DEPTH)
+    if error:
+        return jsonify({'error': error}), 400
+    min_probes = request.args.get('min_probes', 1000, type=int)
+    time_limit, error = parse_time_limit(request.args.get('time_limit', type=float))
+    if error:
+        return jsonify({'error': error}), 400
+
+    facelets = CubeTools.from_scramble_string(scramble_string)
+    events = queue.Queue()
+    cancelled = threading.Event()
+    start_time = time.time()
+
+    def on_solution(solution, length):
+        events.put(('solution', {'solution': solution, 'length': length, 'time': time.time() - start_time}))
+
+    def run():
+        search_solver = Search()
+        try:
+            solution = search_solver.solution(facelets, max_depth, 100000, min_probes, 0, time_limit,
+                                              cancel_token=cancelled, on_solution=on_solution)
+            if solution.startswith("Error"):
+                data = {'error': solution}
+            else:
+                data = {'solution': solution}
+            data.update({'time': time.time() - start_time, 'cut_short': search_solver.cut_short})
+        except Exception as e:
+            data = {'error': f'An error occurred: {str(e)}'}
+        events.put(('done', data))
+
+    def generate():
+        threading.Thread(target=run, daemon=True).start()
+        try:
+            while True:
+                event, data = events.get()
+                yield sse_event(event, data)
+                if event == 'done':
+                    break
+        finally:
+            cancelled.set()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Returns the size, capacity and hit/miss/eviction counters of this process's solution cache.
+    """
+    if Search.solution_cache is None:
+        return jsonify({'error': 'Solution cache is disabled.'}), 404
+    return jsonify(Search.solution_cache.stats())
+
+# --- Batch solving ---
+
+MAX_BATCH_SIZE = 10000
+FACELET_CHARS = set("URFDLB")
+# Shared worker pool, created by initialize_tables before the tables are published
+batch_solver = None
+
+def create_batch_solver():
+    """
+    Forks the batch worker pool once, at the end of the warm-up and before any request is served, so the
+    workers share the already loaded tables.
+    """
+    jobs = int(os.environ.get("BATCH_JOBS", 0)) or os.cpu_count() or 1
+    try:
+        return BatchSolver(jobs)
+    except OSError:
+        return BatchSolver(1)
+
+def parse_batch_item(item):
+    """
+    Turns one batch entry into a facelet string. An entry is a scramble or 54-character facelet
+    string, or an object with a "scramble" or "facelets" key.
+    Returns (facelets, error).
+    """
+    if isinstance(item, dict):
+        if isinstance(item.get('facelets'), str):
+            return item['facelets'], None
+        item = item.get('scramble')
+    if not isinstance(item, str):
+        return None, 'Expected a scramble or facelet string.'
+    if len(item) == 54 and set(item) <= FACELET_CHARS:
+        return item, None
+    if not CubeTools.input_sanitizer(item):
+        return None, 'Invalid scramble.'
+    return CubeTools.from_scramble_string(item), None
+
+@app.route('/solve/batch', methods=['POST'])
+def solve_batch():
+    """
+    API endpoint to solve many cubes in one request.
+    Accepts a JSON array, or NDJSON (one JSON value per line), of scrambles or facelet strings.
+    Optional max_depth, max_probes and time_limit (seconds per cube) query parameters apply to the whole batch.
+    Streams back one NDJSON object per cube, as each one finishes, tagged with its input index.
+    """
+    if not tables_ready.is_set():
+        return tables_not_ready()
+    body = request.get_data(as_text=True)
+    try:
+        if body.lstrip().startswith('['):
+            items = json.loads(body)
+        else:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+    except ValueError:
+        return jsonify({'error': 'Invalid request. Body must be a JSON array or NDJSON.'}), 400
+    if not items:
+        return jsonify({'error': 'Invalid request. No scrambles provided.'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Invalid request. At most {MAX_BATCH_SIZE} cubes per batch.'}), 400
+
+    max_depth, error = parse_search_bound(request.args.get('max_depth'), 'max_depth', 21, MAX_SEARCH_DEPTH)
+    if error:
+        return jsonify({'error': error}), 400
+    max_probes, error = parse_search_bound(request.args.get('max_probes'), 'max_probes', 100000, MAX_SEARCH_PROBES)
+    if error:
+        return jsonify({'error': error}), 400
+    time_limit, error = parse_time_limit(request.args.get('time_limit', type=float))
+    if error:
+        return jsonify({'error': error}), 400
+
+    rejected = []
+    accepted = []
+    for index, item in enumerate(items):
+        facelets, error = parse_batch_item(item)
+        if error is None:
+            accepted.append((index, facelets))
+        else:
+            rejected.append({'index': index, 'solution': None, 'error': error})
+
+    def generate():
+        for line in rejected:
+            yield json.dumps(line) + '\n'
+        start_time = time.time()
+        results = batch_solver.solve_many((facelets for _, facelets in accepted),
+                                                max_depth, max_probes, ordered=False, chunk_size=1,
+                                                time_limit=time_limit)
+        for result in results:
+            yield json.dumps({
+                'index': accepted[result.index][0],
+                'solution': result.solution,
+                'error': result.error,
+                'cut_short': result.cut_short,
+                'time': time.time() - start_time,
+            }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     app.run(debug=True, use_reloader=False)
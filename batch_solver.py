@@ -0,0 +1,134 @@
+import multiprocessing
+import os
+import queue
+from collections import namedtuple
+from solver import Search
+
+# One entry per input cube. `solution` is None when `error` is set: either the solver's
+# "Error N" code (invalid cube, no solution within max_depth, probe or time limit) or the exception text.
+# `cut_short` is set when the time limit stopped the search early.
+SolveResult = namedtuple("SolveResult", ["index", "facelets", "solution", "error", "cut_short"], defaults=[False])
+
+worker_search = None
+
+
+def solve_one(index, facelets, max_depth, max_probes, min_probes, verbosity_level, time_limit=None):
+    global worker_search
+    if worker_search is None:
+        worker_search = Search()
+    try:
+        solution = worker_search.solution(facelets, max_depth, max_probes, min_probes, verbosity_level, time_limit)
+    except Exception as e:
+        worker_search = None
+        return SolveResult(index, facelets, None, f"{type(e).__name__}: {e}")
+    if solution.startswith("Error"):
+        return SolveResult(index, facelets, None, solution, worker_search.cut_short)
+    return SolveResult(index, facelets, solution, None, worker_search.cut_short)
+
+
+def solve_chunk(start, chunk, params):
+    return [solve_one(start + i, facelets, *params) for i, facelets in enumerate(chunk)]
+
+
+class BatchSolver:
+    """Process pool for solving many cubes, forked after the tables are loaded so workers share them copy-on-write.
+
+    Load or generate the tables (CubeTools.init_from / save_to) before creating the pool. Falls back to
+    solving in the calling process when jobs == 1 or fork is unavailable.
+    """
+    CHUNK_SIZE = 16
+    CHUNKS_PER_WORKER = 4
+
+    def __init__(self, jobs=None):
+        Search.init()
+        self.jobs = jobs or os.cpu_count() or 1
+        self.pool = None
+        if self.jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+            self.pool = multiprocessing.get_context("fork").Pool(self.jobs)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def solve_many(self, facelets_iterable, max_depth=21, max_probes=100000, min_probes=0, verbosity_level=0,
+                   ordered=True, chunk_size=None, time_limit=None):
+        """Yields a SolveResult per input, in input order or, with ordered=False, as they complete.
+
+        The input is consumed lazily, keeping a bounded number of chunks in flight. `time_limit` bounds
+        each cube's search, in seconds from when a worker picks it up.
+        """
+        params = (max_depth, max_probes, min_probes, verbosity_level, time_limit)
+        if self.pool is None:
+            for index, facelets in enumerate(facelets_iterable):
+                yield solve_one(index, facelets, *params)
+            return
+
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        done = queue.Queue()
+        pending = {}
+        in_flight = 0
+        next_index = 0
+        items = iter(facelets_iterable)
+        exhausted = False
+
+        def submit():
+            nonlocal next_index, exhausted
+            chunk = []
+            for facelets in items:
+                chunk.append(facelets)
+                if len(chunk) == chunk_size:
+                    break
+            if not chunk:
+                exhausted = True
+                return False
+            start = next_index
+            next_index += len(chunk)
+            self.pool.apply_async(solve_chunk, (start, chunk, params), callback=done.put,
+                                  error_callback=lambda e: done.put(
+                                      [SolveResult(start + i, f, None, f"{type(e).__name__}: {e}")
+                                       for i, f in enumerate(chunk)]))
+            return True
+
+        next_yield = 0
+        while True:
+            while not exhausted and in_flight < self.jobs * self.CHUNKS_PER_WORKER:
+                if submit():
+                    in_flight += 1
+            if in_flight == 0:
+                return
+            results = done.get()
+            in_flight -= 1
+            if not ordered:
+                yield from results
+                continue
+            pending[results[0].index] = results
+            while next_yield in pending:
+                results = pending.pop(next_yield)
+                next_yield += len(results)
+                yield from results
+
+
+def solve_many(facelets_iterable, jobs=None, max_depth=21, max_probes=100000, min_probes=0, verbosity_level=0,
+               ordered=True, time_limit=None):
+    """Solves every facelet string in `facelets_iterable` on `jobs` worker processes, yielding SolveResults."""
+    with BatchSolver(jobs) as solver:
+        yield from solver.solve_many(facelets_iterable, max_depth, max_probes, min_probes, verbosity_level, ordered,
+                                     time_limit=time_limit)
+
+
+if __name__ == "__main__":
+    # Solves one facelet string per stdin line, printing "<facelets> <solution or error>" per line
+    import sys
+    from cube_io_and_display import CubeTools
+    CubeTools.init_from_cache()
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    for result in solve_many((line.strip() for line in sys.stdin if line.strip()), jobs=jobs):
+        print(result.facelets, result.solution or result.error, flush=True)
@@ -0,0 +1,200 @@
+# benchmark_suite.py
+"""
+End-to-end benchmark: solves a fixed-seed corpus of uniformly random cube states plus named hard cases,
+and reports latency percentiles, mean solution length, node rate and table-load time as JSON.
+
+    python benchmark_suite.py run [--count N] [--seed S] [--repeat R] [--output results.json]
+    python benchmark_suite.py compare baseline.json [--current results.json] [--threshold 0.5]
+
+compare runs the suite (or reads --current) and exits with status 1 when a gated metric regresses. Solution
+lengths and node counts do not depend on timing, so any increase fails. Timings are the fastest of R
+interleaved rounds; the median, hard-case and table-load times and the node rate fail when worse than the
+baseline by more than the threshold (a fraction of the baseline value), tail latencies are only reported.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from benchmarks import CACHE_FILE, cold_load_time, random_state_corpus, solves
+from cube_io_and_display import CubeTools
+from cube_utils import CubeUtils
+from solver import Search
+
+MAX_DEPTH = 21
+MAX_PROBES = 100000
+
+# Positions that are slow or unusual for the two-phase search: superflip needs 20 moves, the others are
+# highly symmetric, which exercises the self-symmetry handling
+HARD_CASES = {
+    "superflip": "U R2 F B R B2 R U2 L B2 R U' D' R2 F R' L B2 U2 F2",
+    "checkerboard": "U2 D2 F2 B2 L2 R2",
+    "cube_in_cube": "F L F U' R U F2 L2 U' L' B D' B' L2 U",
+    "six_spot": "U D' R L' F B' U D'",
+    "twisted_corners": "R' D' R D R' D' R D U R' D' R D R' D' R D U'",
+}
+
+# Each round solves every hard case at least once and for at least this long
+HARD_CASE_ROUND_SECONDS = 0.2
+
+# Solves of a separate seed run before timing starts, so imports, caches and the allocator are warm
+WARMUP_SOLVES = 20
+
+# How compare gates each metric: EXACT fails on any increase, TIMING when worse than the threshold
+# (RATE is a timing where higher is better), REPORT is printed only
+EXACT, TIMING, RATE, REPORT = "exact", "timing", "rate", "report"
+METRICS = {
+    "table_load_ms": TIMING,
+    "random.p50_ms": TIMING,
+    "random.p90_ms": REPORT,
+    "random.p99_ms": REPORT,
+    "random.mean_ms": REPORT,
+    "random.mean_length": EXACT,
+    "random.nodes": EXACT,
+    "random.nodes_per_second": RATE,
+}
+for _name in HARD_CASES:
+    METRICS[f"hard_cases.{_name}.ms"] = TIMING
+    METRICS[f"hard_cases.{_name}.length"] = EXACT
+    METRICS[f"hard_cases.{_name}.nodes"] = EXACT
+
+
+def timed_solve(facelets):
+    """Returns (solution, seconds, nodes) of one solve on a fresh Search."""
+    search = Search()
+    start = time.perf_counter()
+    solution = search.solution(facelets, MAX_DEPTH, MAX_PROBES, 0, 0)
+    elapsed = time.perf_counter() - start
+    if not solves(facelets, solution):
+        raise AssertionError(f"bad solution {solution!r} for {facelets}")
+    return solution, elapsed, search.stats.phase1_nodes + search.stats.phase2_nodes
+
+
+def run_suite(count=200, seed=2024, repeat=5):
+    """
+    Runs `repeat` interleaved rounds of a cold table load, the random corpus and the hard cases, keeping
+    each measurement's fastest round, so a burst of machine noise cannot cover every run of it.
+    """
+    CubeTools.init_from_cache()
+    for facelets in random_state_corpus(WARMUP_SOLVES, seed + 1):
+        timed_solve(facelets)
+    corpus = list(random_state_corpus(count, seed))
+    cases = {name: CubeTools.from_scramble_string(scramble) for name, scramble in HARD_CASES.items()}
+    load_time = float("inf")
+    times = [float("inf")] * count
+    best = {name: float("inf") for name in cases}
+    lengths, nodes, hard_cases = [], 0, {}
+
+    for r in range(repeat):
+        load_time = min(load_time, cold_load_time(CACHE_FILE))
+        for i, facelets in enumerate(corpus):
+            solution, elapsed, n = timed_solve(facelets)
+            times[i] = min(times[i], elapsed)
+            if r == 0:
+                lengths.append(len(solution.replace(",", " ").split()))
+                nodes += n
+        for name, facelets in cases.items():
+            spent = 0.0
+            while spent == 0.0 or spent < HARD_CASE_ROUND_SECONDS:
+                solution, elapsed, n = timed_solve(facelets)
+                best[name] = min(best[name], elapsed)
+                spent += elapsed
+            hard_cases[name] = {"ms": best[name] * 1000, "length": len(solution.replace(",", " ").split()),
+                                "nodes": n}
+        print(f"round {r + 1}/{repeat} done", file=sys.stderr)
+
+    cuts = statistics.quantiles(times, n=100, method="inclusive")
+    return {
+        "config": {
+            "count": count, "seed": seed, "repeat": repeat, "max_depth": MAX_DEPTH, "max_probes": MAX_PROBES,
+            "twist_flip_pruning": CubeUtils.USE_TWIST_FLIP_PRUNING, "python": platform.python_version(),
+        },
+        "table_load_ms": load_time * 1000,
+        "random": {
+            "p50_ms": cuts[49] * 1000,
+            "p90_ms": cuts[89] * 1000,
+            "p99_ms": cuts[98] * 1000,
+            "mean_ms": statistics.mean(times) * 1000,
+            "mean_length": statistics.mean(lengths),
+            "nodes": nodes,
+            "nodes_per_second": nodes / sum(times),
+        },
+        "hard_cases": hard_cases,
+    }
+
+
+def metric_value(results, path):
+    for key in path.split("."):
+        results = results[key]
+    return results
+
+
+def compare(current, baseline, threshold=0.5):
+    """
+    Returns (path, baseline, current, relative change, regressed) for every metric in both results.
+    `threshold` only applies to timings; deterministic metrics regress on any increase.
+    """
+    rows = []
+    for path, kind in METRICS.items():
+        try:
+            old, new = metric_value(baseline, path), metric_value(current, path)
+        except KeyError:
+            continue
+        change = (new - old) / old if old else 0.0
+        if kind == EXACT:
+            regressed = new > old
+        elif kind == TIMING:
+            regressed = change > threshold
+        elif kind == RATE:
+            regressed = change < -threshold
+        else:
+            regressed = False
+        rows.append((path, old, new, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproducible end-to-end solver benchmark.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the suite and print or save the results")
+    cmp = commands.add_parser("compare", help="fail if results regress against a baseline")
+    cmp.add_argument("baseline")
+    cmp.add_argument("--current", help="saved results to compare instead of running the suite")
+    cmp.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown of timings (fraction)")
+    for command in (run, cmp):
+        command.add_argument("--count", type=int, default=200)
+        command.add_argument("--seed", type=int, default=2024)
+        command.add_argument("--repeat", type=int, default=5, help="timing rounds; the fastest is kept")
+        command.add_argument("--output", help="also write the results of this run to this file")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare" and args.current:
+        with open(args.current) as f:
+            results = json.load(f)
+    else:
+        results = run_suite(args.count, args.seed, args.repeat)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if args.command == "run":
+        print(json.dumps(results, indent=2))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results.get("config"):
+        print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+    failed = False
+    for path, old, new, change, regressed in compare(results, baseline, args.threshold):
+        failed |= regressed
+        note = "  REGRESSION" if regressed else "  (not gated)" if METRICS[path] == REPORT else ""
+        print(f"{path:>34}: {old:12.3f} -> {new:12.3f}  {change:+7.1%}{note}")
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
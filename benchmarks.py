@@ -0,0 +1,786 @@
+# benchmarks.py
+
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from cube_io_and_display import CubeTools, OutputWriter
+from coordinate_cube import CoordCube
+from cubie_cube import CubieCube
+from cube_utils import CubeUtils
+from packed_cube import PackedCube
+from solver import Search
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = CubeTools.CACHE_FILE
+
+LOAD_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+from cube_io_and_display import CubeTools
+with open(sys.argv[1], 'rb') as f:
+    CubeTools.init_from(f)
+print(time.perf_counter() - start, file=sys.stderr)
+"""
+
+MEMORY_SNIPPET = """
+import io, resource, sys
+from cube_io_and_display import CubeTools
+if sys.argv[1] == "load":
+    with open(sys.argv[2], 'rb') as f:
+        CubeTools.init_from(f)
+else:
+    CubeTools.save_to(io.BytesIO())
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)
+"""
+
+
+def cold_load_time(path):
+    """Imports the solver and loads `path` in a fresh interpreter, returning the elapsed seconds."""
+    proc = subprocess.run([sys.executable, "-c", LOAD_SNIPPET, path], cwd=SCRIPT_DIR,
+                          capture_output=True, text=True, check=True)
+    return float(proc.stderr.strip().splitlines()[-1])
+
+
+def benchmark_table_load(repeat=5):
+    """Compares cold-start load time of the legacy big-endian cache against the mapped layout."""
+    CubeTools.init_from_cache()
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "cache_v1.bin")
+        mapped_path = os.path.join(tmp, "cache_v3.bin")
+        with open(legacy_path, 'wb') as f:
+            CubeTools.write_legacy_tables(OutputWriter(f))
+        with open(mapped_path, 'wb') as f:
+            CubeTools.write_tables(f)
+
+        print("--- Table load (cold interpreter, best of %d) ---" % repeat)
+        for label, path in (("v1 struct", legacy_path), ("v3 mmap", mapped_path)):
+            best = min(cold_load_time(path) for _ in range(repeat))
+            print(f"{label:>10}: {best * 1000:8.2f} ms  ({os.path.getsize(path)} bytes)")
+
+
+PRUNING_TABLE_BUILDERS = [
+    ("MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE", CoordCube.initialize_middle_corner_permutation_pruning_table),
+    ("EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE", CoordCube.init_perm_comb_p_prun),
+    ("UD_SLICE_TWIST_PRUNING_TABLE", CoordCube.initialize_slice_twist_pruning_table),
+    ("UDSliceFlipPrun", CoordCube.initialize_slice_flip_pruning_table),
+]
+
+
+def prepare_move_tables():
+    """Regenerates move tables into plain lists and returns the tables stored in cache.bin for comparison."""
+    CubeTools.init_from_cache()
+    with open(CACHE_FILE, 'rb') as f:
+        expected = {name: section[0] for name, section in CubeTools.table_sections(f.read()).items()}
+
+    for owner, attr, typecode, length in CubeTools.table_layout():
+        setattr(owner, attr, CubeTools.new_table(typecode, length))
+    CoordCube.initialize_move_tables()
+    return expected
+
+
+def benchmark_pruning_tables():
+    """Times every pruning-table BFS with and without NumPy and checks the output against cache.bin."""
+    expected = prepare_move_tables()
+
+    modes = [("numpy", True), ("python", False)] if CoordCube.USE_NUMPY else [("python", False)]
+    print("--- Pruning table generation ---")
+    for attr, builder in PRUNING_TABLE_BUILDERS:
+        for label, use_numpy in modes:
+            CoordCube.USE_NUMPY = use_numpy
+            table = getattr(CoordCube, attr)
+            table[:] = [0] * len(table)
+            start = time.perf_counter()
+            builder()
+            elapsed = time.perf_counter() - start
+            same = list(table) == list(expected[attr])
+            print(f"{attr:>50} {label:>6}: {elapsed:7.3f}s  {'identical' if same else 'MISMATCH'}")
+    CoordCube.USE_NUMPY = modes[0][1]
+
+
+def benchmark_parallel_generation():
+    """Times building all pruning tables with 1..cpu_count worker processes."""
+    if not CoordCube.USE_NUMPY:
+        print("NumPy is not installed; parallel generation is unavailable.")
+        return
+    expected = prepare_move_tables()
+    names = CoordCube.pruning_table_names()
+    cpus = os.cpu_count() or 1
+
+    print(f"--- Parallel pruning table generation ({cpus} CPUs) ---")
+    for jobs in sorted({1, 2, 4, cpus}):
+        for name in names:
+            table = getattr(CoordCube, name)
+            table[:] = [0] * len(table)
+        start = time.perf_counter()
+        if jobs == 1:
+            CoordCube.initialize_pruning_tables(True)
+        else:
+            CoordCube.initialize_pruning_tables_parallel(jobs, names)
+        elapsed = time.perf_counter() - start
+        same = all(list(getattr(CoordCube, name)) == list(expected[name]) for name in names)
+        print(f"jobs={jobs:<3}: {elapsed:7.3f}s  {'identical' if same else 'MISMATCH'}")
+
+
+def random_state_corpus(count, seed=2024):
+    """Returns `count` facelet strings drawn uniformly from all solvable cube states."""
+    rng = random.Random(seed)
+    return [CubeTools.random_state(rng) for _ in range(count)]
+
+
+def solves(facelets, solution):
+    """Applies a solver output string to `facelets` and reports whether the cube ends up solved."""
+    if solution.startswith("Error"):
+        return False
+    c1, c2 = CubieCube(), CubieCube()
+    CubeUtils.facelet_string_to_cubie_cube(["URFDLB".index(c) for c in facelets], c1)
+    for token in solution.replace(",", " ").split():
+        move = CubeUtils.MOVE_TO_STRING_MAP.index(token + ",")
+        CubieCube.multiply_corners(c1, CubieCube.MOVE_CUBE_STATES[move], c2)
+        CubieCube.multiply_edges(c1, CubieCube.MOVE_CUBE_STATES[move], c2)
+        c1.copy(c2)
+    return c1.corner_array == CubieCube().corner_array and c1.edge_array == CubieCube().edge_array
+
+
+class ReferenceSearch(Search):
+    """Search carrying the recursive reference engines that Search's iterative phase 1 and phase 2 replaced.
+
+    Subclasses switch them on; they visit the same nodes in the same order, so results must agree.
+    """
+
+    def search_phase1_with_pre_moves_recursive(self, maxl: int, lm: int, cc: CubieCube, ssym: int) -> int:
+        """One call per pre-move level; the reference implementation for search_phase1_with_pre_moves."""
+        self.pre_move_sequence_length = self.max_pre_moves_to_try - maxl
+
+        if (self.is_recursive_call and self.current_phase1_depth == self.phase1_length - self.pre_move_sequence_length) or \
+        (not self.is_recursive_call and (self.pre_move_sequence_length == 0 or ((0x36FB7 >> lm) & 1) == 0)):
+
+            self.current_phase1_depth = self.phase1_length - self.pre_move_sequence_length
+            self.phase1_cubie_cubes[0] = cc
+            self.allow_shorter_phase1 = (self.current_phase1_depth == self.MIN_PHASE1_LENGTH_AFTER_PREMOVES and self.pre_move_sequence_length != 0)
+
+            if self.phase1_nodes[self.current_phase1_depth + 1].set_coordinates_with_pruning(cc, self.current_phase1_depth) and \
+                self.phase1_recursive(self.phase1_nodes[self.current_phase1_depth + 1], ssym, self.current_phase1_depth, -1) == 0:
+                return 0
+
+        if maxl == 0 or self.pre_move_sequence_length + self.MIN_PHASE1_LENGTH_AFTER_PREMOVES >= self.phase1_length:
+            return 1
+
+        skipMoves = CubieCube.get_skippable_moves_for_symmetry(ssym)
+
+        if maxl == 1 or self.pre_move_sequence_length + 1 + self.MIN_PHASE1_LENGTH_AFTER_PREMOVES >= self.phase1_length:
+            skipMoves |= 0x36FB7
+
+        lm = (lm // 3) * 3
+
+        for m in range(18):
+            if m == lm or m == lm - 9 or m == lm + 9:
+                m += 2
+                continue
+            if (self.is_recursive_call and m != self.pre_move_sequence[self.max_pre_moves_to_try - maxl]) or \
+            ((skipMoves & (1 << m)) != 0):
+                continue
+
+            PackedCube.move_multiply(m, cc, self.pre_move_cubie_cubes[maxl])
+            self.pre_move_sequence[self.max_pre_moves_to_try - maxl] = m
+
+            ret = self.search_phase1_with_pre_moves_recursive(
+                maxl - 1,
+                m,
+                self.pre_move_cubie_cubes[maxl],
+                ssym & CubieCube.MOVE_CUBE_SYMMETRIES[m]
+            )
+            if ret == 0:
+                return 0
+
+        return 1
+
+    def phase1_recursive(self, node, ssym, maxl, lm):
+        """One call per phase-1 node; the reference implementation for the phase-1 loop of search_phase1_with_pre_moves."""
+        if node.prun == 0 and maxl < 5:
+            if self.allow_shorter_phase1 or maxl == 0:
+                self.current_phase1_depth -= maxl
+                ret = self.initialize_phase2_from_pre_moves()
+                self.current_phase1_depth += maxl
+                return ret
+            else:
+                return 1
+
+        skipMoves = CubieCube.get_skippable_moves_for_symmetry(ssym)
+
+        for axis in range(0, 18, 3):
+            if axis == lm or axis == lm - 9:
+                continue
+            for power in range(3):
+                m = axis + power
+
+                if (self.is_recursive_call and m != self.move[self.current_phase1_depth - maxl]) or \
+                (skipMoves != 0 and (skipMoves & (1 << m)) != 0):
+                    continue
+
+                prun = self.phase1_nodes[maxl].move_and_get_pruning_table_value_value(node, m, True)
+                if prun > maxl:
+                    break
+                elif prun == maxl:
+                    continue
+
+                if self.USE_CONJUGATE_PRUNING:
+                    prun = self.phase1_nodes[maxl].conjugate_move_and_get_pruning_table_value_value(node, m)
+                    if prun > maxl:
+                        break
+                    elif prun == maxl:
+                        continue
+
+                self.move[self.current_phase1_depth - maxl] = m
+                self.valid_phase1_moves_count = min(self.valid_phase1_moves_count, self.current_phase1_depth - maxl)
+                ret = self.phase1_recursive(self.phase1_nodes[maxl], ssym & CubieCube.MOVE_CUBE_SYMMETRIES[m], maxl - 1, axis)
+                if ret == 0:
+                    return 0
+                elif ret == 2:
+                    break
+        return 1
+
+    def phase2_recursive(self, edge, esym, corn, csym, mid, maxl, depth, lm):
+        """One call per node; the reference implementation for phase2."""
+        if edge == 0 and corn == 0 and mid == 0:
+            return maxl
+
+        # Hot path: bind the flat tables once per node and read the pruning nibbles inline
+        N_MOVES = CoordCube.N_MOVES_PHASE_2
+        mid_move = CoordCube.MIDDLE_PERMUTATION_MOVE_TABLE
+        corn_move = CoordCube.CORNER_PERMUTATION_MOVE_TABLE
+        edge_move = CoordCube.EDGE_PERMUTATION_MOVE_TABLE
+        mid_conj = CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE
+        comb_conj = CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE
+        mid_corn_prun = CoordCube.MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE
+        edge_comb_prun = CoordCube.EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE
+        perm_to_comb = CubieCube.PERMUTATION_TO_COMBINATION_PLUS_PARITY
+        sym_mult = CubieCube.SYMMETRY_MULTIPLICATION_TABLE
+        sym_mult_inv = CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE
+        csym_moves = CubieCube.SYMMETRY_UP_DOWN_MOVE_TABLE[csym]
+        esym_moves = CubieCube.SYMMETRY_UP_DOWN_MOVE_TABLE[esym]
+        inverse_symmetry = CubieCube.get_inverse_permutation_symmetry
+
+        move_mask = CubeUtils.CHECK_MOVE_TO_BIT_MAP[lm]
+        m = 0
+        while m < 10:
+            if (move_mask >> m) & 1 != 0:
+                m += (0x42 >> m) & 3
+                m += 1
+                continue
+
+            midx = mid_move[mid * N_MOVES + m]
+            cornx = corn_move[corn * N_MOVES + csym_moves[m]]
+            csymx = sym_mult[cornx & 0xf][csym]
+            cornx >>= 4
+            edgex = edge_move[edge * N_MOVES + esym_moves[m]]
+            esymx = sym_mult[edgex & 0xf][esym]
+            edgex >>= 4
+
+            edgei = inverse_symmetry(edgex, esymx, False)
+            corni = inverse_symmetry(cornx, csymx, True)
+
+            idx = (edgei >> 4) * CoordCube.N_COMB + comb_conj[(perm_to_comb[corni >> 4] & 0xff) << 4 | sym_mult_inv[edgei & 0xf][corni & 0xf]]
+            prun = (edge_comb_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+            if prun >= maxl:
+                m += ((0x42 >> m) & 3) & (maxl - prun)
+                m += 1
+                continue
+
+            # --- Pruning Check 2 ---
+            idx = cornx * CoordCube.N_MPERM + mid_conj[midx << 4 | csymx]
+            prun = (mid_corn_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+            idx = edgex * CoordCube.N_COMB + comb_conj[(perm_to_comb[cornx] & 0xff) << 4 | sym_mult_inv[esymx][csymx]]
+            prun = max(prun, (edge_comb_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF)
+            if prun >= maxl:
+                m += ((0x42 >> m) & 3) & (maxl - prun)
+                m += 1
+                continue
+                
+            ret = self.phase2_recursive(edgex, esymx, cornx, csymx, midx, maxl - 1, depth + 1, m)
+            if ret >= 0:
+                self.move[depth] = CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[m]
+                return ret
+            
+            m += 1
+            
+        return -1
+
+
+class RecursiveSearch(ReferenceSearch):
+    """Search running the recursive reference engines for both phases."""
+    def search_phase1_with_pre_moves(self, maxl, lm, cc, ssym):
+        return self.search_phase1_with_pre_moves_recursive(maxl, lm, cc, ssym)
+
+    def phase2(self, edge, esym, corn, csym, mid, maxl, depth, lm):
+        return self.phase2_recursive(edge, esym, corn, csym, mid, maxl, depth, lm)
+
+
+class CountingSearch(RecursiveSearch):
+    """Search that counts phase-1 and phase-2 node expansions (running the recursive engines to do so).
+
+    It visits the same nodes as Search but is slower; time the plain Search when measuring node rates.
+    """
+    def __init__(self):
+        super().__init__()
+        self.phase1_nodes_expanded = 0
+        self.phase2_nodes_expanded = 0
+
+    def phase1_recursive(self, node, ssym, maxl, lm):
+        self.phase1_nodes_expanded += 1
+        return super().phase1_recursive(node, ssym, maxl, lm)
+
+    def phase2_recursive(self, edge, esym, corn, csym, mid, maxl, depth, lm):
+        self.phase2_nodes_expanded += 1
+        return super().phase2_recursive(edge, esym, corn, csym, mid, maxl, depth, lm)
+
+
+class Phase2Recorder(Search):
+    """Search that records the arguments of every top-level phase-2 search."""
+    def __init__(self):
+        super().__init__()
+        self.phase2_calls = []
+
+    def phase2(self, edge, esym, corn, csym, mid, maxl, depth, lm):
+        self.phase2_calls.append((edge, esym, corn, csym, mid, maxl, depth, lm))
+        return super().phase2(edge, esym, corn, csym, mid, maxl, depth, lm)
+
+
+def benchmark_twist_flip_pruning(count=100):
+    """Solves a fixed random-state corpus with and without the twist x flip pruning table."""
+    CubeTools.init_from_cache()
+    start = time.perf_counter()
+    Search.set_twist_flip_pruning(True)
+    print(f"Twist-flip table ready in {time.perf_counter() - start:.3f}s")
+    corpus = random_state_corpus(count)
+
+    print(f"--- Phase-1 pruning, {count} random states ---")
+    for label, enabled in (("off", False), ("on", True)):
+        Search.set_twist_flip_pruning(enabled)
+        nodes, times, lengths = [], [], []
+        for facelets in corpus:
+            search = CountingSearch()
+            search.solution(facelets, 21, 100000, 0, 0)
+            start = time.perf_counter()
+            solution = Search().solution(facelets, 21, 100000, 0, 0)
+            times.append(time.perf_counter() - start)
+            if not solves(facelets, solution):
+                raise AssertionError(f"bad solution {solution!r} for {facelets}")
+            nodes.append(search.phase1_nodes_expanded)
+            lengths.append(len(solution.replace(",", " ").split()))
+        print(f"twist-flip {label:>3}: {statistics.mean(nodes):9.1f} phase-1 nodes  "
+              f"{statistics.mean(times) * 1000:7.2f} ms mean  {statistics.median(times) * 1000:7.2f} ms p50  "
+              f"{statistics.mean(lengths):5.2f} moves")
+
+
+def benchmark_batch_solving(count=48):
+    """Measures solve_many throughput on a random-state corpus for 1..cpu_count workers."""
+    from batch_solver import solve_many
+    CubeTools.init_from_cache()
+    corpus = random_state_corpus(count)
+    cpus = os.cpu_count() or 1
+
+    print(f"--- Batch solving, {count} random states ({cpus} CPUs) ---")
+    for jobs in sorted({1, 2, 4, cpus}):
+        start = time.perf_counter()
+        results = list(solve_many(corpus, jobs=jobs))
+        elapsed = time.perf_counter() - start
+        ok = all(solves(r.facelets, r.solution) for r in results if r.error is None)
+        print(f"jobs={jobs:<3}: {count / elapsed:7.2f} cubes/s  {'ok' if ok else 'BAD SOLUTION'}")
+
+
+def benchmark_thread_stress(count=24, threads=16, rounds=3):
+    """Runs many concurrent solves (and concurrent table loading) on threads and checks each result."""
+    from concurrent.futures import ThreadPoolExecutor
+    corpus = random_state_corpus(count)
+    # With a GIL, switch threads as often as possible so shared state actually gets interleaved
+    sys.setswitchinterval(1e-6)
+
+    def solve(facelets):
+        CubeTools.init_from_cache()
+        return Search().solution(facelets, 21, 100000, 0, 0)
+
+    print(f"--- Thread stress, {count} random states x {rounds} rounds on {threads} threads ---")
+    with ThreadPoolExecutor(threads) as pool:
+        expected = list(pool.map(solve, corpus))
+    bad = sum(not solves(f, s) for f, s in zip(corpus, expected))
+    print(f"cold start: {bad} bad solutions")
+    if bad:
+        raise AssertionError(f"{bad} concurrent cold-start solves returned bad solutions")
+
+    rng = random.Random(7)
+    try:
+        for round_ in range(rounds):
+            Search.set_solution_cache(count // 2 if round_ == rounds - 1 else 0)
+            order = list(range(count)) * 2
+            rng.shuffle(order)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                results = list(pool.map(solve, [corpus[i] for i in order]))
+            elapsed = time.perf_counter() - start
+            bad = sum(not solves(corpus[i], s) for i, s in zip(order, results))
+            changed = sum(s != expected[i] for i, s in zip(order, results))
+            label = "cached" if Search.solution_cache else "search"
+            print(f"round {round_} ({label}): {len(order) / elapsed:7.2f} solves/s  {bad} bad, {changed} differ from first run")
+            if bad:
+                raise AssertionError(f"{bad} concurrent solves in round {round_} returned bad solutions")
+    finally:
+        Search.set_solution_cache(0)
+
+
+def peak_rss_kb(mode):
+    """Peak RSS (KiB) of a fresh interpreter that loads cache.bin ("load") or generates the tables ("generate")."""
+    proc = subprocess.run([sys.executable, "-c", MEMORY_SNIPPET, mode, CACHE_FILE], cwd=SCRIPT_DIR,
+                          capture_output=True, text=True, check=True)
+    return int(proc.stderr.strip().splitlines()[-1])
+
+
+def benchmark_table_memory_and_speed(count=40, repeat=3):
+    """Reports peak RSS with loaded and generated tables, and the node expansion rate of both search phases."""
+    CubeTools.init_from_cache()
+    print("--- Table memory (peak RSS, fresh interpreter) ---")
+    for mode in ("load", "generate"):
+        print(f"{mode:>9}: {peak_rss_kb(mode) / 1024:8.1f} MiB")
+
+    corpus = random_state_corpus(count)
+    phase1 = phase2 = 0
+    for facelets in corpus:
+        search = CountingSearch()
+        search.solution(facelets, 21, 100000, 0, 0)
+        phase1 += search.phase1_nodes_expanded
+        phase2 += search.phase2_nodes_expanded
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for facelets in corpus:
+            if not solves(facelets, Search().solution(facelets, 21, 100000, 0, 0)):
+                raise AssertionError(f"bad solution for {facelets}")
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"--- Node expansion, {count} random states (best of {repeat}) ---")
+    print(f"{phase1} phase-1 + {phase2} phase-2 nodes in {best:.2f}s: {(phase1 + phase2) / best:9.0f} nodes/s")
+
+
+def benchmark_phase2_search(count=40, repeat=3):
+    """Replays the phase-2 searches of a random-state corpus on the iterative and the recursive engine."""
+    CubeTools.init_from_cache()
+    calls = []
+    for facelets in random_state_corpus(count):
+        search = Phase2Recorder()
+        search.solution(facelets, 21, 100000, 0, 0)
+        calls.extend(search.phase2_calls)
+
+    counter = CountingSearch()
+    for args in calls:
+        counter.phase2_recursive(*args)
+    nodes = counter.phase2_nodes_expanded
+
+    print(f"--- Phase-2 search, {len(calls)} searches from {count} random states, {nodes} nodes (best of {repeat}) ---")
+    results = {}
+    for name in ("phase2_recursive", "phase2"):
+        search = ReferenceSearch()
+        engine = getattr(search, name)
+        best = None
+        for _ in range(repeat):
+            outcome = []
+            start = time.perf_counter()
+            for args in calls:
+                ret = engine(*args)
+                outcome.append((ret, search.move[args[6]:args[6] + args[5] - ret] if ret >= 0 else None))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = (outcome, best)
+        print(f"{name:>17}: {best:7.3f}s  {nodes / best:9.0f} nodes/s")
+    if results["phase2"][0] != results["phase2_recursive"][0]:
+        raise AssertionError("iterative phase 2 disagrees with the recursive engine")
+    print(f"speedup: {results['phase2_recursive'][1] / results['phase2'][1]:.2f}x, identical results")
+
+
+class RecursivePhase1Search(ReferenceSearch):
+    """Search running the recursive phase-1 and pre-move engine with the iterative phase 2."""
+    def search_phase1_with_pre_moves(self, maxl, lm, cc, ssym):
+        return self.search_phase1_with_pre_moves_recursive(maxl, lm, cc, ssym)
+
+
+def benchmark_phase1_search(count=40, repeat=3):
+    """Times full solves of a random-state corpus with the iterative and the recursive search engines."""
+    CubeTools.init_from_cache()
+    corpus = random_state_corpus(count)
+    phase1 = phase2 = 0
+    for facelets in corpus:
+        search = CountingSearch()
+        search.solution(facelets, 21, 100000, 0, 0)
+        phase1 += search.phase1_nodes_expanded
+        phase2 += search.phase2_nodes_expanded
+
+    print(f"--- Search engines, {count} random states, {phase1} phase-1 + {phase2} phase-2 nodes (best of {repeat}) ---")
+    results = {}
+    for label, cls in (("recursive", RecursiveSearch), ("recursive phase 1", RecursivePhase1Search),
+                       ("iterative", Search)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            solutions = [cls().solution(facelets, 21, 100000, 0, 0) for facelets in corpus]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[label] = (solutions, best)
+        print(f"{label:>17}: {best:7.3f}s  {best / count * 1000:7.2f} ms/solve  {(phase1 + phase2) / best:9.0f} nodes/s")
+    if any(solutions != results["iterative"][0] for solutions, _ in results.values()):
+        raise AssertionError("search engines disagree")
+    print(f"iterative phase 1: {results['recursive phase 1'][1] / results['iterative'][1]:.2f}x, "
+          f"both phases: {results['recursive'][1] / results['iterative'][1]:.2f}x, identical solutions")
+
+
+def benchmark_move_application(count=100000, repeat=3):
+    """Moves applied per second by the CubieCube loops, the PackedCube drop-ins and PackedCube itself."""
+    CubeTools.init_from_cache()
+    rng = random.Random(2024)
+    moves = [rng.randrange(18) for _ in range(count)]
+
+    def cubie_loops():
+        c, d = CubieCube(), CubieCube()
+        for m in moves:
+            CubieCube.multiply_corners(c, CubieCube.MOVE_CUBE_STATES[m], d)
+            CubieCube.multiply_edges(c, CubieCube.MOVE_CUBE_STATES[m], d)
+            c, d = d, c
+        return c
+
+    def cubie_drop_in():
+        c, d = CubieCube(), CubieCube()
+        for m in moves:
+            PackedCube.multiply_by_move(c, m, d)
+            c, d = d, c
+        return c
+
+    def cubie_pre_move():
+        c, d = CubieCube(), CubieCube()
+        for m in reversed(moves):
+            PackedCube.move_multiply(m, c, d)
+            c, d = d, c
+        return c
+
+    def packed():
+        p = PackedCube()
+        for m in moves:
+            p.move(m)
+        return p.to_cubie_cube()
+
+    def packed_pre_move():
+        p = PackedCube()
+        for m in reversed(moves):
+            p.pre_move(m)
+        return p.to_cubie_cube()
+
+    print(f"--- Move application, {count} random moves (best of {repeat}) ---")
+    expected = None
+    for name, run in (("CubieCube.multiply_*", cubie_loops), ("PackedCube.multiply_by_move", cubie_drop_in),
+                      ("PackedCube.move_multiply", cubie_pre_move), ("PackedCube.move", packed),
+                      ("PackedCube.pre_move", packed_pre_move)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        state = (result.corner_array, result.edge_array)
+        if expected is not None and state != expected:
+            raise AssertionError(f"{name} disagrees with CubieCube.multiply_*")
+        expected = state
+        print(f"{name:>28}: {count / best:10.0f} moves/s")
+
+
+def benchmark_random_states(count=200000, repeat=3):
+    """Uniform random states per second, one at a time and in NumPy batches; every batch state is checked."""
+    search = Search()
+    print(f"--- Uniform random states, {count} per run (best of {repeat}) ---")
+    for name, run in (("CubeTools.random_state", lambda: [CubeTools.random_state() for _ in range(count // 10)]),
+                      ("CubeTools.random_states", lambda: CubeTools.random_states(count))):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            states = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>28}: {len(states) / best:10.0f} states/s")
+    invalid = sum(search.verify_facelet_string(facelets) != 0 for facelets in states)
+    if invalid or len(set(states)) != len(states):
+        raise AssertionError(f"{invalid} invalid and {len(states) - len(set(states))} repeated batch states")
+
+def benchmark_facelet_parsing(count=100000, repeat=3):
+    """Facelet strings validated and parsed per second by verify_facelet_string and CubeBatch.parse_facelets."""
+    from cube_batch import CubeBatch
+    rng = random.Random(2024)
+    corpus = []
+    for facelets in CubeTools.random_states(count, 2024):
+        if rng.random() < 0.5:
+            # Swapping two stickers gives every kind of error: wrong pieces, twist, flip or parity
+            i, j = rng.sample(range(54), 2)
+            facelets = list(facelets)
+            facelets[i], facelets[j] = facelets[j], facelets[i]
+            facelets = "".join(facelets)
+        corpus.append(facelets)
+    search = Search()
+
+    print(f"--- Facelet validation and parsing, {count} strings (best of {repeat}) ---")
+    results = {}
+    for name, run in (("verify_facelet_string", lambda: [search.verify_facelet_string(f) for f in corpus]),
+                      ("CubeBatch.parse_facelets", lambda: CubeBatch.parse_facelets(corpus)[2].tolist())):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>28}: {count / best:10.0f} strings/s")
+    if results["verify_facelet_string"] != results["CubeBatch.parse_facelets"]:
+        raise AssertionError("batch parser disagrees with verify_facelet_string")
+    codes = results["verify_facelet_string"]
+    print("identical error codes: " + ", ".join(f"{code}: {codes.count(code)}" for code in sorted(set(codes))))
+
+def benchmark_scramble_application(count=100000, repeat=3):
+    """Scrambles turned into facelet strings per second by from_scramble_array and CubeBatch.from_scramble_arrays."""
+    from cube_batch import CubeBatch
+    CubieCube.initialize_moves()
+    rng = random.Random(2024)
+    scrambles = [[rng.randrange(18) for _ in range(rng.randrange(41))] for _ in range(count)]
+
+    print(f"--- Scramble application, {count} scrambles of 0-40 moves (best of {repeat}) ---")
+    results = {}
+    for name, run in (("from_scramble_array", lambda: [CubeTools.from_scramble_array(s) for s in scrambles]),
+                      ("CubeBatch.from_scramble_arrays", lambda: CubeBatch.from_scramble_arrays(scrambles))):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>30}: {count / best:10.0f} scrambles/s")
+    if results["from_scramble_array"] != results["CubeBatch.from_scramble_arrays"]:
+        raise AssertionError("batch scramble application disagrees with from_scramble_array")
+    print("identical facelet strings")
+
+
+def benchmark_solution_verification(count=100000, solve_count=20, repeat=3):
+    """Solutions checked per second by solves() and CubeBatch.verify_solutions, against cubes solved per second."""
+    from cube_batch import CubeBatch
+    CubeTools.init_from_cache()
+    search = Search()
+    states = random_state_corpus(solve_count)
+    start = time.perf_counter()
+    solutions = [search.solution(facelets, 21, 100000, 0, 0) for facelets in states]
+    solve_rate = solve_count / (time.perf_counter() - start)
+    # Every other pair loses its last move, so half of the checks fail
+    corpus = [(states[i % solve_count], solutions[i % solve_count].rsplit(",", i % 2)[0]) for i in range(count)]
+    facelets, solutions = [f for f, _ in corpus], [s for _, s in corpus]
+
+    print(f"--- Solution verification, {count} pairs (best of {repeat}) ---")
+    print(f"{'Search.solution':>28}: {solve_rate:10.0f} cubes/s")
+    results = {}
+    for name, run in (("solves", lambda: [solves(f, s) for f, s in corpus]),
+                      ("CubeBatch.verify_solutions", lambda: CubeBatch.verify_solutions(facelets, solutions).tolist())):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>28}: {count / best:10.0f} pairs/s")
+    if results["solves"] != results["CubeBatch.verify_solutions"]:
+        raise AssertionError("batch verifier disagrees with solves()")
+    print(f"identical results: {sum(results['solves'])} of {count} pass")
+
+
+def benchmark_rank_tables(count=100000, repeat=3):
+    """Coordinates ranked and unranked per second by the CubeUtils loops and the table-driven helpers."""
+    rng = random.Random(2024)
+    corners, edges, g1_edges = [], [], []
+    for _ in range(count):
+        perm = rng.sample(range(8), 8)
+        corners.append([p | rng.randrange(3) << 3 for p in perm])
+        perm = rng.sample(range(12), 12)
+        edges.append([p << 1 | rng.randrange(2) for p in perm])
+        perm = rng.sample(range(8), 8) + rng.sample(range(8, 12), 4)
+        g1_edges.append([p << 1 for p in perm])
+    perm_idx = [rng.randrange(40320) for _ in range(count)]
+    slice_idx = [rng.randrange(495) for _ in range(count)]
+    mid_idx = [rng.randrange(24) for _ in range(count)]
+    U = CubeUtils
+
+    def setter(cubes, set_value, indices):
+        def run():
+            arrays = [a[:] for a in cubes]
+            for a, idx in zip(arrays, indices):
+                set_value(a, idx)
+            return arrays
+        return run
+
+    cases = (
+        ("corner permutation", lambda: [U.get_index_from_permutation(a, 8, False) for a in corners],
+         lambda: [U.rank_permutation(a, False) for a in corners]),
+        ("edge permutation", lambda: [U.get_index_from_permutation(a, 8, True) for a in g1_edges],
+         lambda: [U.rank_permutation(a, True) for a in g1_edges]),
+        ("middle permutation", lambda: [U.get_index_from_permutation(a, 12, True) % 24 for a in g1_edges],
+         lambda: [U.rank_middle_permutation(a) for a in g1_edges]),
+        ("UD slice combination", lambda: [U.get_combination_from_index(a, 8, True) for a in edges],
+         lambda: [U.rank_combination(a, 8, True) for a in edges]),
+        ("corner combination", lambda: [U.get_combination_from_index(a, 0, False) for a in corners],
+         lambda: [U.rank_combination(a, 0, False) for a in corners]),
+        ("set corner permutation", setter(corners, lambda a, i: U.set_permutation_from_index(a, i, 8, False), perm_idx),
+         setter(corners, lambda a, i: U.unrank_permutation(a, i, False), perm_idx)),
+        ("set edge permutation", setter(g1_edges, lambda a, i: U.set_permutation_from_index(a, i, 8, True), perm_idx),
+         setter(g1_edges, lambda a, i: U.unrank_permutation(a, i, True), perm_idx)),
+        ("set middle permutation", setter(g1_edges, lambda a, i: U.set_permutation_from_index(a, i, 12, True), mid_idx),
+         setter(g1_edges, U.unrank_middle_permutation, mid_idx)),
+        ("set UD slice combination",
+         setter(edges, lambda a, i: U.set_combination_from_index(a, i, 8, True), slice_idx),
+         setter(edges, lambda a, i: U.unrank_combination(a, i, 8, True), slice_idx)),
+    )
+
+    print(f"--- Permutation and combination ranking, {count} cubes (best of {repeat}) ---")
+    for name, loop, table in cases:
+        rates, results = [], []
+        for run in (loop, table):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = run()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            rates.append(count / best)
+            results.append(result)
+        if results[0] != results[1]:
+            raise AssertionError(f"table-driven {name} disagrees with the loop")
+        print(f"{name:>24}: loop {rates[0]:10.0f}/s  table {rates[1]:10.0f}/s  ({rates[1] / rates[0]:.1f}x)")
+
+
+BENCHMARKS = {
+    "load": benchmark_table_load,
+    "prune": benchmark_pruning_tables,
+    "parallel": benchmark_parallel_generation,
+    "twistflip": benchmark_twist_flip_pruning,
+    "batch": benchmark_batch_solving,
+    "threads": benchmark_thread_stress,
+    "tables": benchmark_table_memory_and_speed,
+    "moves": benchmark_move_application,
+    "phase2": benchmark_phase2_search,
+    "phase1": benchmark_phase1_search,
+    "random": benchmark_random_states,
+    "facelets": benchmark_facelet_parsing,
+    "scrambles": benchmark_scramble_application,
+    "verify": benchmark_solution_verification,
+    "ranks": benchmark_rank_tables,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    if len(names) > 1:
+        # Each benchmark gets a fresh interpreter so table state never leaks between them
+        for name in names:
+            subprocess.run([sys.executable, os.path.abspath(__file__), name], cwd=SCRIPT_DIR, check=True)
+    else:
+        start = time.perf_counter()
+        BENCHMARKS[names[0]]()
+        print(f"({names[0]} finished in {time.perf_counter() - start:.2f}s)\n")
@@ -0,0 +1,63 @@
+# build_bundle.py
+"""
+Build step for deployment: generates the solver tables and writes them as a compressed, checksummed table
+bundle, which app.py loads instead of generating tables at cold start.
+
+    python build_bundle.py [output] [--codec lzma|zlib] [--jobs N] [--twist-flip] [--optimal]
+
+With --optimal it also builds the optimal mode's corner pruning table (OPTIMAL_TABLE_FILE, default optimal.bin),
+which the server only maps and never generates.
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from cube_io_and_display import CubeTools
+from optimal_search import OptimalSearch
+from solver import Search
+
+TABLE_BUNDLE_FILE = "tables.bundle"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a compressed, checksummed solver table bundle.")
+    parser.add_argument("output", nargs="?", default=TABLE_BUNDLE_FILE)
+    parser.add_argument("--codec", choices=CubeTools.TABLE_BUNDLE_CODECS, default="lzma")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--twist-flip", action="store_true", help="include the twist-flip pruning table")
+    parser.add_argument("--optimal", action="store_true",
+                        help=f"also build the optimal-mode table at '{OptimalSearch.TABLE_FILE}'")
+    args = parser.parse_args(argv)
+
+    if args.twist_flip:
+        Search.set_twist_flip_pruning(True)
+    start_time = time.time()
+    Search.init(args.jobs)
+
+    tables = io.BytesIO()
+    CubeTools.write_tables(tables)
+    tmp_path = args.output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        CubeTools.write_bundle(f, args.codec)
+    with open(tmp_path, "rb") as f:
+        if CubeTools.read_bundle(f) != tables.getvalue():
+            raise AssertionError("bundle does not round-trip")
+    os.replace(tmp_path, args.output)
+
+    size = os.path.getsize(args.output)
+    print(f"Wrote '{args.output}' in {time.time() - start_time:.2f}s: "
+          f"{len(tables.getvalue())} bytes of tables in {size} bytes ({args.codec})")
+
+    if args.optimal:
+        start_time = time.time()
+        OptimalSearch.initialize_move_tables()
+        OptimalSearch.generate_table(OptimalSearch.TABLE_FILE, args.jobs)
+        OptimalSearch.init()
+        print(f"Wrote '{OptimalSearch.TABLE_FILE}' in {time.time() - start_time:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
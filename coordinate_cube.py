@@ -1,4 +1,12 @@
+import threading
+from array import array
 from cube_utils import CubeUtils
+from packed_cube import PackedCube
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class CoordCube:
 
@@ -22,26 +30,32 @@ class CoordCube:
     N_COMB = 140 if CubeUtils.USE_COMBINATION_PARITY_PRUNING else 70
     PHASE_2_PARITY_MOVE_FLAG = 0xA5 if CubeUtils.USE_COMBINATION_PARITY_PRUNING else 0
 
+    # Move and conjugation tables are flat arrays indexed by coord * stride + column; the stride is
+    # the number of moves in the phase (18 or 10) or of symmetries (8 or 16)
+
     # Phase 1 Tables
-    UD_SLICE_MOVE_TABLE = [[0] * 18 for _ in range(N_SLICE)]
-    TWIST_MOVE_TABLE = [[0] * 18 for _ in range(N_TWIST_SYM)]
-    FLIP_MOVE_TABLE = [[0] * 18 for _ in range(N_FLIP_SYM)]
-    UD_SLICE_CONJUGATION_TABLE = [[0] * 8 for _ in range(N_SLICE)]
+    UD_SLICE_MOVE_TABLE = array('H', [0]) * (N_SLICE * N_MOVES_PHASE_1)
+    TWIST_MOVE_TABLE = array('H', [0]) * (N_TWIST_SYM * N_MOVES_PHASE_1)
+    FLIP_MOVE_TABLE = array('H', [0]) * (N_FLIP_SYM * N_MOVES_PHASE_1)
+    UD_SLICE_CONJUGATION_TABLE = array('H', [0]) * (N_SLICE * 8)
     UD_SLICE_TWIST_PRUNING_TABLE = [0] * ((N_SLICE * N_TWIST_SYM) // 8 + 1)
     UDSliceFlipPrun = [0] * ((N_SLICE * N_FLIP_SYM) // 8 + 1)
-    TWIST_FLIP_PRUNING_TABLE = [0] * ((N_FLIP * N_TWIST_SYM) // 8 + 1) if CubeUtils.USE_TWIST_FLIP_PRUNING else None
+    TWIST_FLIP_PRUNING_TABLE = None  # Built on demand when twist-flip pruning is enabled
 
     # Phase 2 Tables
-    CORNER_PERMUTATION_MOVE_TABLE = [[0] * 10 for _ in range(N_PERM_SYM)]
-    EDGE_PERMUTATION_MOVE_TABLE = [[0] * 10 for _ in range(N_PERM_SYM)]
-    MIDDLE_PERMUTATION_MOVE_TABLE = [[0] * 10 for _ in range(N_MPERM)]
-    MIDDLE_PERMUTATION_CONJUGATION_TABLE = [[0] * 16 for _ in range(N_MPERM)]
+    CORNER_PERMUTATION_MOVE_TABLE = array('H', [0]) * (N_PERM_SYM * N_MOVES_PHASE_2)
+    EDGE_PERMUTATION_MOVE_TABLE = array('H', [0]) * (N_PERM_SYM * N_MOVES_PHASE_2)
+    MIDDLE_PERMUTATION_MOVE_TABLE = array('H', [0]) * (N_MPERM * N_MOVES_PHASE_2)
+    MIDDLE_PERMUTATION_CONJUGATION_TABLE = array('H', [0]) * (N_MPERM * 16)
     CORNER_COMBINATION_PLUS_PARITY_MOVE_TABLE = None
-    CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE = [[0] * 16 for _ in range(N_COMB)]
+    CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE = array('H', [0]) * (N_COMB * 16)
     MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE = [0] * ((N_MPERM * N_PERM_SYM) // 8 + 1)
     EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE = [0] * ((N_COMB * N_PERM_SYM) // 8 + 1)
     
     initialization_level = 0
+    # Guards one-time table setup (Search.init, CubeTools.init_from); reentrant as they nest
+    init_lock = threading.RLock()
+    USE_NUMPY = np is not None
 
 ####################################################### Pruning table access functions #######################################################
 
@@ -80,24 +94,26 @@ class CoordCube:
         self.flip_conjugate= 0
 
     @classmethod
-    def init(cls):
-        from cubie_cube import CubieCube
+    def init(cls, jobs=1):
         if cls.initialization_level == 2:
             return
+        with cls.init_lock:
+            if cls.initialization_level != 2:
+                cls.initialize_tables(jobs)
 
+    @classmethod
+    def initialize_tables(cls, jobs):
         if cls.initialization_level == 0:
-            # Move and conjugation tables
-            CubieCube.initialize_permutatioin_symmetry_to_raw()
-            cls.initialize_corner_permutation_move_table()
-            cls.initialize_edge_permutation_move_table()
-            cls.initialize_middle_permutation_move_and_conjugation_tables()
-            cls.initialize_corner_combination_plus_parity_move_and_conjugation_tables()
-
-            CubieCube.initialize_flip_symmetry_to_raw()
-            CubieCube.initialize_twist_symmetry_to_raw()
-            cls.initialize_flip_move_table()
-            cls.initialize_twist_move_table()
-            cls.initialize_ud_slice_move_and_conjugation_tables()
+            cls.initialize_move_tables()
+
+            if jobs > 1 and cls.USE_NUMPY:
+                try:
+                    cls.initialize_pruning_tables_parallel(jobs, cls.pruning_table_names())
+                    cls.initialization_level = 2
+                    return
+                except OSError as e:
+                    # Some sandboxes (e.g. serverless runtimes) cannot create process pools
+                    print(f"Parallel table generation unavailable ({e}); continuing on one core.")
 
         # Pruning tables
         if cls.initialize_pruning_tables(cls.initialization_level == 0):
@@ -105,6 +121,30 @@ class CoordCube:
         else:
             cls.initialization_level = 1
 
+    @classmethod
+    def initialize_move_tables(cls):
+        from cubie_cube import CubieCube
+        # Move and conjugation tables
+        CubieCube.initialize_permutatioin_symmetry_to_raw()
+        cls.initialize_corner_permutation_move_table()
+        cls.initialize_edge_permutation_move_table()
+        cls.initialize_middle_permutation_move_and_conjugation_tables()
+        cls.initialize_corner_combination_plus_parity_move_and_conjugation_tables()
+
+        CubieCube.initialize_flip_symmetry_to_raw()
+        CubieCube.initialize_twist_symmetry_to_raw()
+        cls.initialize_flip_move_table()
+        cls.initialize_twist_move_table()
+        cls.initialize_ud_slice_move_and_conjugation_tables()
+
+    @classmethod
+    def pruning_table_names(cls):
+        names = ["MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE", "EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE",
+                 "UD_SLICE_TWIST_PRUNING_TABLE", "UDSliceFlipPrun"]
+        if CubeUtils.USE_TWIST_FLIP_PRUNING:
+            names.append("TWIST_FLIP_PRUNING_TABLE")
+        return names
+
     @classmethod
     def initialize_pruning_tables(cls, is_first):
         from solver import Search
@@ -118,92 +158,226 @@ class CoordCube:
         return inited_prun
         
     @classmethod
-    def initialize_raw_to_symmetry_pruning_table(cls, prun_table, raw_move, raw_conj, sym_move, sym_state, prun_flag):
+    def decode_pruning_flag(cls, prun_flag):
+        """Returns (SYM_SHIFT, SYM_E2C_MAGIC, N_MOVES) encoded in a pruning table flag."""
         from cubie_cube import CubieCube
-        
         SYM_SHIFT = prun_flag & 0xf
         SYM_E2C_MAGIC = CubieCube.SYMMETRY_EDGE_TO_CORNER_MAGIC_NUMBER if ((prun_flag >> 4) & 1) == 1 else 0
         IS_PHASE2 = ((prun_flag >> 5) & 1) == 1
-        
-        N_RAW = len(raw_conj)
-        N_SYM = len(sym_move)
-        N_SIZE = N_RAW * N_SYM
-        N_MOVES_PHASE_1 = 10 if IS_PHASE2 else 18
-        
-        depth = 0
+        return SYM_SHIFT, SYM_E2C_MAGIC, 10 if IS_PHASE2 else 18
+
+    @classmethod
+    def initialize_raw_to_symmetry_pruning_table(cls, prun_table, raw_move, raw_conj, sym_move, sym_state, prun_flag, raw_self_conj=None):
+        N_MOVES = cls.decode_pruning_flag(prun_flag)[2]
+        N_SIZE = (len(raw_move) // N_MOVES) * (len(sym_move) // N_MOVES)
+        if cls.USE_NUMPY:
+            depths = PruningTableSearch(raw_move, raw_conj, sym_move, sym_state, *cls.decode_pruning_flag(prun_flag),
+                                        raw_self_conj=raw_self_conj).run()
+        else:
+            depths = cls.search_pruning_depths(raw_move, raw_conj, sym_move, sym_state, *cls.decode_pruning_flag(prun_flag),
+                                               raw_self_conj=raw_self_conj)
+        cls.pack_pruning_table(prun_table, depths, N_SIZE)
+        return True
+
+    @classmethod
+    def initialize_pruning_tables_parallel(cls, jobs, names):
+        """Builds the named pruning tables concurrently, splitting every BFS level across `jobs` processes.
+
+        Each table's depths live in a shared buffer; worker processes expand disjoint index ranges of it.
+        """
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        import multiprocessing
+
+        searches = {}
+        buffers = {}
+        for name in names:
+            raw_move, raw_conj, sym_move, sym_state, prun_flag, *raw_self_conj = cls.pruning_table_spec(name)
+            searches[name] = PruningTableSearch(raw_move, raw_conj, sym_move, sym_state, *cls.decode_pruning_flag(prun_flag),
+                                                raw_self_conj=raw_self_conj[0] if raw_self_conj else None)
+            buffers[name] = multiprocessing.RawArray('B', searches[name].n_size)
+
+        # Workers are forked so they never re-import the caller's __main__ (app.py truncates the cache it is building)
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise OSError("fork start method not available")
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                 initializer=install_pruning_workers, initargs=(searches, buffers)) as pool:
+            # Launch the workers before any driver thread exists
+            pool.submit(int).result()
+
+            def build(name):
+                depths = np.frombuffer(buffers[name], dtype=np.uint8)
+                searches[name].run(depths, pool, name, jobs)
+                cls.pack_pruning_table(getattr(cls, name), depths, searches[name].n_size)
+
+            if "TWIST_FLIP_PRUNING_TABLE" in names:
+                cls.TWIST_FLIP_PRUNING_TABLE = [0] * ((cls.N_FLIP * cls.N_TWIST_SYM) // 8 + 1)
+            with ThreadPoolExecutor(max_workers=len(names)) as drivers:
+                list(drivers.map(build, names))
+        return True
+
+    @classmethod
+    def search_pruning_depths(cls, raw_move, raw_conj, sym_move, sym_state, SYM_SHIFT, SYM_E2C_MAGIC, N_MOVES, raw_self_conj=None):
+        """Pure-Python breadth-first search, returning one depth per (sym, raw) entry.
+
+        `raw_self_conj` conjugates a raw coordinate by a self-symmetry and defaults to `raw_conj`.
+        """
+        if raw_self_conj is None:
+            raw_self_conj = raw_conj
+        N_RAW = len(raw_move) // N_MOVES
+        N_SIZE = N_RAW * (len(sym_move) // N_MOVES)
+        SYM_MASK = (1 << SYM_SHIFT) - 1
+
+        depths = bytearray(b"\x0f") * N_SIZE
+        depths[0] = 0
+        frontier = [0]
+        unvisited = None
         done = 1
-        
-        for i in range((N_SIZE + 7) // 8):
-            prun_table[i] = 0xFFFFFFFF
-        
-        cls.set_pruning_table_value(prun_table, 0, 0)
-        
-        while done < N_SIZE:
-            for i in range(N_SIZE):
-                if cls.get_pruning_table_value(prun_table, i) == depth:
-                    raw = i % N_RAW
-                    sym = i // N_RAW
-
-                    for m in range(N_MOVES_PHASE_1):
-                        sym_x = sym_move[sym][m]
-                        raw_x = raw_conj[raw_move[raw][m]][sym_x & ((1 << SYM_SHIFT) - 1)]
+        depth = 0
+
+        while done < N_SIZE and frontier:
+            next_frontier = []
+            if unvisited is None and done > N_SIZE // 2:
+                unvisited = [i for i in range(N_SIZE) if depths[i] == 15]
+
+            if unvisited is None:
+                # Forward: expand the current frontier
+                for i in frontier:
+                    raw_row = i % N_RAW * N_MOVES
+                    sym_row = i // N_RAW * N_MOVES
+                    for m in range(N_MOVES):
+                        sym_x = sym_move[sym_row + m]
+                        raw_x = raw_conj[(raw_move[raw_row + m] << SYM_SHIFT) + (sym_x & SYM_MASK)]
                         sym_x >>= SYM_SHIFT
-                        
                         idx2 = sym_x * N_RAW + raw_x
-                        if cls.get_pruning_table_value(prun_table, idx2) == 15:
-                            cls.set_pruning_table_value(prun_table, idx2, depth + 1)
-                            done += 1
-                            
-                            sym_state_val = sym_state[sym_x]
-                            if sym_state_val != 0:
-                                for j in range(1, 16):
-                                    if (sym_state_val >> j & 1) == 1:
-                                        idxx = sym_x * N_RAW + raw_conj[raw_x][j ^ (SYM_E2C_MAGIC >> (j << 1) & 3)]
-                                        if cls.get_pruning_table_value(prun_table, idxx) == 15:
-                                            cls.set_pruning_table_value(prun_table, idxx, depth + 1)
-                                            done += 1
+                        if depths[idx2] != 15:
+                            continue
+                        depths[idx2] = depth + 1
+                        next_frontier.append(idx2)
+
+                        sym_state_val = sym_state[sym_x]
+                        if sym_state_val != 0:
+                            for j in range(1, 16):
+                                if (sym_state_val >> j & 1) == 1:
+                                    idxx = sym_x * N_RAW + raw_self_conj[(raw_x << SYM_SHIFT) + (j ^ (SYM_E2C_MAGIC >> (j << 1) & 3))]
+                                    if depths[idxx] == 15:
+                                        depths[idxx] = depth + 1
+                                        next_frontier.append(idxx)
+            else:
+                # Backward: an unvisited entry is one move away from the frontier if any neighbour is
+                remaining = []
+                for i in unvisited:
+                    raw_row = i % N_RAW * N_MOVES
+                    sym_row = i // N_RAW * N_MOVES
+                    for m in range(N_MOVES):
+                        sym_x = sym_move[sym_row + m]
+                        raw_x = raw_conj[(raw_move[raw_row + m] << SYM_SHIFT) + (sym_x & SYM_MASK)]
+                        if depths[(sym_x >> SYM_SHIFT) * N_RAW + raw_x] == depth:
+                            next_frontier.append(i)
+                            break
+                    else:
+                        remaining.append(i)
+                for i in next_frontier:
+                    depths[i] = depth + 1
+                unvisited = remaining
+
+            done += len(next_frontier)
+            frontier = next_frontier
             depth += 1
-        return True
+        return depths
+
+    @classmethod
+    def pack_pruning_table(cls, prun_table, depths, N_SIZE):
+        """Packs one depth per entry into eight 4-bit values per word; unused nibbles stay 0xF."""
+        n_words = (N_SIZE + 7) // 8
+        if np is not None:
+            nibbles = np.full(n_words * 8, 15, dtype=np.uint32)
+            nibbles[:N_SIZE] = np.frombuffer(depths, dtype=np.uint8)
+            words = np.bitwise_or.reduce(nibbles.reshape(n_words, 8) << (np.arange(8, dtype=np.uint32) * 4), axis=1)
+            prun_table[:n_words] = words.tolist()
+            return
+        padded = bytes(depths) + b"\x0f" * (n_words * 8 - N_SIZE)
+        for w in range(n_words):
+            val = 0
+            for k in range(7, -1, -1):
+                val = (val << 4) | padded[w * 8 + k]
+            prun_table[w] = val
 
     @classmethod
     def initialize_twist_flip_pruning_table(cls):
-        return True
+        cls.TWIST_FLIP_PRUNING_TABLE = [0] * ((cls.N_FLIP * cls.N_TWIST_SYM) // 8 + 1)
+        return cls.initialize_raw_to_symmetry_pruning_table(
+            cls.TWIST_FLIP_PRUNING_TABLE, *cls.pruning_table_spec("TWIST_FLIP_PRUNING_TABLE"))
 
     @classmethod
-    def initialize_slice_twist_pruning_table(cls):
+    def pruning_table_spec(cls, name):
+        """Returns (raw_move, raw_conj, sym_move, sym_state, prun_flag) for the named pruning table."""
         from cubie_cube import CubieCube
+        if name == "UD_SLICE_TWIST_PRUNING_TABLE":
+            return (cls.UD_SLICE_MOVE_TABLE, cls.UD_SLICE_CONJUGATION_TABLE,
+                    cls.TWIST_MOVE_TABLE, CubieCube.SYMMETRY_STATE_TWIST, 0x69603)
+        if name == "UDSliceFlipPrun":
+            return (cls.UD_SLICE_MOVE_TABLE, cls.UD_SLICE_CONJUGATION_TABLE,
+                    cls.FLIP_MOVE_TABLE, CubieCube.SYMMETRY_STATE_FLIP, 0x69603)
+        if name == "MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE":
+            return (cls.MIDDLE_PERMUTATION_MOVE_TABLE, cls.MIDDLE_PERMUTATION_CONJUGATION_TABLE,
+                    cls.CORNER_PERMUTATION_MOVE_TABLE, CubieCube.SYMMETRY_STATE_PERMUTATION, 0x8ea34)
+        if name == "EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE":
+            return (cls.CORNER_COMBINATION_PLUS_PARITY_MOVE_TABLE, cls.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE,
+                    cls.EDGE_PERMUTATION_MOVE_TABLE, CubieCube.SYMMETRY_STATE_PERMUTATION, 0x7d824)
+        if name == "TWIST_FLIP_PRUNING_TABLE":
+            return cls.twist_flip_pruning_spec()
+        raise KeyError(name)
+
+    @classmethod
+    def twist_flip_pruning_spec(cls):
+        """Expresses the twist x flip coordinate (raw flip, twist symmetry) in raw-move/raw-conjugation form.
+
+        The raw flip is moved through its symmetry coordinate, so the "raw move" yields a flip symmetry
+        coordinate (class << 3 | sym) that the "raw conjugation" turns back into a raw flip. Self-symmetries
+        map a raw flip to another raw flip, which needs its own conjugation table.
+        """
+        from cubie_cube import CubieCube
+        if CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED is None:
+            CubieCube.initialize_flip_symmetry_to_raw_flipped()
+        if CubieCube.SYMMETRY_STATE_TWIST is None:
+            CubieCube.initialize_twist_symmetry_states()
+
+        FLIPPED = CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED
+        flip_move = array('H', [0]) * (cls.N_FLIP * cls.N_MOVES_PHASE_1)
+        flip_self_conj = array('H', [0]) * (cls.N_FLIP * 8)
+        for raw in range(cls.N_FLIP):
+            flip = CubieCube.flip_raw_to_symmetry(raw)
+            fsym = flip & 7
+            flip >>= 3
+            for m in range(cls.N_MOVES_PHASE_1):
+                flip_move[raw * cls.N_MOVES_PHASE_1 + m] = cls.FLIP_MOVE_TABLE[flip * cls.N_MOVES_PHASE_1 + CubieCube.SYMMETRY_8_MOVE_TABLE[(m << 3) | fsym]] ^ fsym
+            for j in range(8):
+                flip_self_conj[raw << 3 | j] = FLIPPED[(flip << 3 | fsym) ^ j]
+        flip_conj = array('H', [FLIPPED[i ^ j] for i in range(cls.N_FLIP_SYM * 8) for j in range(8)])
+
+        return (flip_move, flip_conj, cls.TWIST_MOVE_TABLE, CubieCube.SYMMETRY_STATE_TWIST, 0x19603, flip_self_conj)
+
+    @classmethod
+    def initialize_slice_twist_pruning_table(cls):
         return cls.initialize_raw_to_symmetry_pruning_table(
-            cls.UD_SLICE_TWIST_PRUNING_TABLE,
-            cls.UD_SLICE_MOVE_TABLE, cls.UD_SLICE_CONJUGATION_TABLE,
-            cls.TWIST_MOVE_TABLE, CubieCube.SYMMETRY_STATE_TWIST, 0x69603
-        )
+            cls.UD_SLICE_TWIST_PRUNING_TABLE, *cls.pruning_table_spec("UD_SLICE_TWIST_PRUNING_TABLE"))
 
     @classmethod
     def initialize_slice_flip_pruning_table(cls):
-        from cubie_cube import CubieCube
         return cls.initialize_raw_to_symmetry_pruning_table(
-            cls.UDSliceFlipPrun,
-            cls.UD_SLICE_MOVE_TABLE, cls.UD_SLICE_CONJUGATION_TABLE,
-            cls.FLIP_MOVE_TABLE, CubieCube.SYMMETRY_STATE_FLIP, 0x69603
-        )
+            cls.UDSliceFlipPrun, *cls.pruning_table_spec("UDSliceFlipPrun"))
 
     @classmethod
     def initialize_middle_corner_permutation_pruning_table(cls):
-        from cubie_cube import CubieCube
         return cls.initialize_raw_to_symmetry_pruning_table(
-            cls.MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE,
-            cls.MIDDLE_PERMUTATION_MOVE_TABLE, cls.MIDDLE_PERMUTATION_CONJUGATION_TABLE,
-            cls.CORNER_PERMUTATION_MOVE_TABLE, CubieCube.SYMMETRY_STATE_PERMUTATION, 0x8ea34
-        )
+            cls.MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE, *cls.pruning_table_spec("MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE"))
 
     @classmethod
     def init_perm_comb_p_prun(cls):
-        from cubie_cube import CubieCube
         return cls.initialize_raw_to_symmetry_pruning_table(
             cls.EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE,
-            cls.CORNER_COMBINATION_PLUS_PARITY_MOVE_TABLE, cls.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE,
-            cls.EDGE_PERMUTATION_MOVE_TABLE, CubieCube.SYMMETRY_STATE_PERMUTATION, 0x7d824
-        )
+            *cls.pruning_table_spec("EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE"))
 
     @classmethod
     def initialize_ud_slice_move_and_conjugation_tables(cls):
@@ -213,17 +387,17 @@ class CoordCube:
         for i in range(cls.N_SLICE):
             c.set_up_down_slice_from_index(i)
             for j in range(0, cls.N_MOVES_PHASE_1, 3):
-                CubieCube.multiply_edges(c, CubieCube.MOVE_CUBE_STATES[j], d)
-                cls.UD_SLICE_MOVE_TABLE[i][j] = d.get_up_down_slice_index()
+                PackedCube.multiply_edges_by_move(c, j, d)
+                cls.UD_SLICE_MOVE_TABLE[i * cls.N_MOVES_PHASE_1 + j] = d.get_up_down_slice_index()
             for j in range(0, 16, 2):
                 CubieCube.conjugate_edges(c, CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][j], d)
-                cls.UD_SLICE_CONJUGATION_TABLE[i][j >> 1] = d.get_up_down_slice_index()
+                cls.UD_SLICE_CONJUGATION_TABLE[i << 3 | j >> 1] = d.get_up_down_slice_index()
         for i in range(cls.N_SLICE):
             for j in range(0, cls.N_MOVES_PHASE_1, 3):
-                udslice = cls.UD_SLICE_MOVE_TABLE[i][j]
+                udslice = cls.UD_SLICE_MOVE_TABLE[i * cls.N_MOVES_PHASE_1 + j]
                 for k in range(1, 3):
-                    udslice = cls.UD_SLICE_MOVE_TABLE[udslice][j]
-                    cls.UD_SLICE_MOVE_TABLE[i][j + k] = udslice
+                    udslice = cls.UD_SLICE_MOVE_TABLE[udslice * cls.N_MOVES_PHASE_1 + j]
+                    cls.UD_SLICE_MOVE_TABLE[i * cls.N_MOVES_PHASE_1 + j + k] = udslice
 
     @classmethod
     def initialize_flip_move_table(cls):
@@ -233,8 +407,8 @@ class CoordCube:
         for i in range(cls.N_FLIP_SYM):
             c.set_flip_from_index(CubieCube.FLIP_SYMMETRY_TO_RAW[i])
             for j in range(cls.N_MOVES_PHASE_1):
-                CubieCube.multiply_edges(c, CubieCube.MOVE_CUBE_STATES[j], d)
-                cls.FLIP_MOVE_TABLE[i][j] = d.get_flip_symmetry()
+                PackedCube.multiply_edges_by_move(c, j, d)
+                cls.FLIP_MOVE_TABLE[i * cls.N_MOVES_PHASE_1 + j] = d.get_flip_symmetry()
 
     @classmethod
     def initialize_twist_move_table(cls):
@@ -244,8 +418,8 @@ class CoordCube:
         for i in range(cls.N_TWIST_SYM):
             c.set_twist_from_index(CubieCube.TWIST_SYMMETRY_TO_RAW[i])
             for j in range(cls.N_MOVES_PHASE_1):
-                CubieCube.multiply_corners(c, CubieCube.MOVE_CUBE_STATES[j], d)
-                cls.TWIST_MOVE_TABLE[i][j] = d.get_twist_symmetry()
+                PackedCube.multiply_corners_by_move(c, j, d)
+                cls.TWIST_MOVE_TABLE[i * cls.N_MOVES_PHASE_1 + j] = d.get_twist_symmetry()
 
     @classmethod
     def initialize_corner_permutation_move_table(cls):
@@ -255,8 +429,8 @@ class CoordCube:
         for i in range(cls.N_PERM_SYM):
             c.set_corner_permutation_from_index(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW[i])
             for j in range(cls.N_MOVES_PHASE_2):
-                CubieCube.multiply_corners(c, CubieCube.MOVE_CUBE_STATES[CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[j]], d)
-                cls.CORNER_PERMUTATION_MOVE_TABLE[i][j] = d.get_corner_permutation_symmetry()
+                PackedCube.multiply_corners_by_move(c, CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[j], d)
+                cls.CORNER_PERMUTATION_MOVE_TABLE[i * cls.N_MOVES_PHASE_2 + j] = d.get_corner_permutation_symmetry()
 
     @classmethod
     def initialize_edge_permutation_move_table(cls):
@@ -266,8 +440,8 @@ class CoordCube:
         for i in range(cls.N_PERM_SYM):
             c.set_edge_permutation_from_index(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW[i])
             for j in range(cls.N_MOVES_PHASE_2):
-                CubieCube.multiply_edges(c, CubieCube.MOVE_CUBE_STATES[CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[j]], d)
-                cls.EDGE_PERMUTATION_MOVE_TABLE[i][j] = d.get_edge_permutation_symmetry()
+                PackedCube.multiply_edges_by_move(c, CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[j], d)
+                cls.EDGE_PERMUTATION_MOVE_TABLE[i * cls.N_MOVES_PHASE_2 + j] = d.get_edge_permutation_symmetry()
 
     @classmethod
     def initialize_middle_permutation_move_and_conjugation_tables(cls):
@@ -277,35 +451,34 @@ class CoordCube:
         for i in range(cls.N_MPERM):
             c.set_middle_permutation_from_index(i)
             for j in range(cls.N_MOVES_PHASE_2):
-                CubieCube.multiply_edges(c, CubieCube.MOVE_CUBE_STATES[CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[j]], d)
-                cls.MIDDLE_PERMUTATION_MOVE_TABLE[i][j] = d.get_middle_permutation_index()
+                PackedCube.multiply_edges_by_move(c, CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[j], d)
+                cls.MIDDLE_PERMUTATION_MOVE_TABLE[i * cls.N_MOVES_PHASE_2 + j] = d.get_middle_permutation_index()
             for j in range(16):
                 CubieCube.conjugate_edges(c, CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][j], d)
-                cls.MIDDLE_PERMUTATION_CONJUGATION_TABLE[i][j] = d.get_middle_permutation_index()
+                cls.MIDDLE_PERMUTATION_CONJUGATION_TABLE[i << 4 | j] = d.get_middle_permutation_index()
 
     @classmethod
     def initialize_corner_combination_plus_parity_move_and_conjugation_tables(cls):
         from cubie_cube import CubieCube
         c = CubieCube()
         d = CubieCube()
-        cls.CORNER_COMBINATION_PLUS_PARITY_MOVE_TABLE = [[0] * cls.N_MOVES_PHASE_2 for _ in range(cls.N_COMB)]
+        cls.CORNER_COMBINATION_PLUS_PARITY_MOVE_TABLE = array('H', [0]) * (cls.N_COMB * cls.N_MOVES_PHASE_2)
         for i in range(cls.N_COMB):
             c.set_corner_combination_from_index(i % 70)
             for j in range(cls.N_MOVES_PHASE_2):
-                CubieCube.multiply_corners(c, CubieCube.MOVE_CUBE_STATES[CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[j]], d)
+                PackedCube.multiply_corners_by_move(c, CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[j], d)
                 parity = (cls.PHASE_2_PARITY_MOVE_FLAG >> j & 1) ^ (i // 70)
-                cls.CORNER_COMBINATION_PLUS_PARITY_MOVE_TABLE[i][j] = d.get_corner_combination_index() + 70 * parity
+                cls.CORNER_COMBINATION_PLUS_PARITY_MOVE_TABLE[i * cls.N_MOVES_PHASE_2 + j] = d.get_corner_combination_index() + 70 * parity
             for j in range(16):
                 CubieCube.conjugate_corners(c, CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][j], d)
-                cls.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE[i][j] = d.get_corner_combination_index() + 70 * (i // 70)
+                cls.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE[i << 4 | j] = d.get_corner_combination_index() + 70 * (i // 70)
                 
     # ###################################### END: Initialization Logic #################################################
     
 
     def set_coordinates_with_pruning(self, cc, depth: int) -> bool:
-        from cubie_cube import CubieCube
-        from cube_utils import CubeUtils
         from solver import Search
+        CubieCube = cubie_cube.CubieCube
 
         twist_sym = cc.get_twist_symmetry()
         flip_sym = cc.get_flip_symmetry()
@@ -326,11 +499,11 @@ class CoordCube:
 
         prun1 = self.get_pruning_table_value(
             self.UD_SLICE_TWIST_PRUNING_TABLE,
-            self.twist * self.N_SLICE + self.UD_SLICE_CONJUGATION_TABLE[self.slice][self.twist_symmetry]
+            self.twist * self.N_SLICE + self.UD_SLICE_CONJUGATION_TABLE[self.slice << 3 | self.twist_symmetry]
         )
         prun2 = self.get_pruning_table_value(
             self.UDSliceFlipPrun,
-            self.flip * self.N_SLICE + self.UD_SLICE_CONJUGATION_TABLE[self.slice][self.flip_symmetry]
+            self.flip * self.N_SLICE + self.UD_SLICE_CONJUGATION_TABLE[self.slice << 3 | self.flip_symmetry]
         )
         self.prun = max(self.prun, prun1, prun2)
 
@@ -354,26 +527,187 @@ class CoordCube:
         return self.prun <= depth
 
     def move_and_get_pruning_table_value_value(self, cc, m, is_phase1):
-        from cubie_cube import CubieCube
-        self.slice = self.UD_SLICE_MOVE_TABLE[cc.slice][m]
-        flip = self.FLIP_MOVE_TABLE[cc.flip][CubieCube.SYMMETRY_8_MOVE_TABLE[(m << 3) | cc.flip_symmetry]]
-        self.flip_symmetry = (flip & 7) ^ cc.flip_symmetry
-        self.flip = flip >> 3
-        twist = self.TWIST_MOVE_TABLE[cc.twist][CubieCube.SYMMETRY_8_MOVE_TABLE[(m << 3) | cc.twist_symmetry]]
-        self.twist_symmetry = (twist & 7) ^ cc.twist_symmetry
-        self.twist = twist >> 3
-        p1 = self.get_pruning_table_value(self.UD_SLICE_TWIST_PRUNING_TABLE, self.twist * self.N_SLICE + self.UD_SLICE_CONJUGATION_TABLE[self.slice][self.twist_symmetry])
-        p2 = self.get_pruning_table_value(self.UDSliceFlipPrun, self.flip * self.N_SLICE + self.UD_SLICE_CONJUGATION_TABLE[self.slice][self.flip_symmetry])
+        # Hot path: tables are read straight from the flat arrays and pruning nibbles are extracted inline
+        CubieCube = cubie_cube.CubieCube
+        N_MOVES = self.N_MOVES_PHASE_1
+        sym8_move = CubieCube.SYMMETRY_8_MOVE_TABLE
+        self.slice = slice_ = self.UD_SLICE_MOVE_TABLE[cc.slice * N_MOVES + m]
+        flip = self.FLIP_MOVE_TABLE[cc.flip * N_MOVES + sym8_move[(m << 3) | cc.flip_symmetry]]
+        self.flip_symmetry = flip_symmetry = (flip & 7) ^ cc.flip_symmetry
+        self.flip = flip = flip >> 3
+        twist = self.TWIST_MOVE_TABLE[cc.twist * N_MOVES + sym8_move[(m << 3) | cc.twist_symmetry]]
+        self.twist_symmetry = twist_symmetry = (twist & 7) ^ cc.twist_symmetry
+        self.twist = twist = twist >> 3
+
+        slice_conj = self.UD_SLICE_CONJUGATION_TABLE
+        idx = twist * self.N_SLICE + slice_conj[slice_ << 3 | twist_symmetry]
+        prun = (self.UD_SLICE_TWIST_PRUNING_TABLE[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+        idx = flip * self.N_SLICE + slice_conj[slice_ << 3 | flip_symmetry]
+        p2 = (self.UDSliceFlipPrun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+        if p2 > prun:
+            prun = p2
         if CubeUtils.USE_TWIST_FLIP_PRUNING:
-            p3 = self.get_pruning_table_value(self.TWIST_FLIP_PRUNING_TABLE, (self.twist << 11) | CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED[(self.flip << 3) | (self.flip_symmetry ^ self.twist_symmetry)])
-        else:
-            p3 = 0
-        self.prun = max(p1, p2, p3)
-        return self.prun
+            idx = (twist << 11) | CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED[(flip << 3) | (flip_symmetry ^ twist_symmetry)]
+            p3 = (self.TWIST_FLIP_PRUNING_TABLE[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+            if p3 > prun:
+                prun = p3
+        self.prun = prun
+        return prun
 
     def conjugate_move_and_get_pruning_table_value_value(self, cc, m):
-        from cubie_cube import CubieCube
+        CubieCube = cubie_cube.CubieCube
+        N_MOVES = self.N_MOVES_PHASE_1
         m = CubieCube.SYMMETRY_MOVE_TABLE[3][m]
-        flip_conjugate= self.FLIP_MOVE_TABLE[cc.flip_conjugate>> 3][CubieCube.SYMMETRY_8_MOVE_TABLE[(m << 3) | (cc.flip_conjugate& 7)]] ^ (cc.flip_conjugate& 7)
-        twist_conjugate= self.TWIST_MOVE_TABLE[cc.twist_conjugate>> 3][CubieCube.SYMMETRY_8_MOVE_TABLE[(m << 3) | (cc.twist_conjugate& 7)]] ^ (cc.twist_conjugate& 7)
-        return self.get_pruning_table_value(self.TWIST_FLIP_PRUNING_TABLE, ((twist_conjugate>> 3) << 11) | CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED[flip_conjugate^ (twist_conjugate& 7)])
+        fsym = cc.flip_conjugate & 7
+        tsym = cc.twist_conjugate & 7
+        self.flip_conjugate = flip = self.FLIP_MOVE_TABLE[(cc.flip_conjugate >> 3) * N_MOVES + CubieCube.SYMMETRY_8_MOVE_TABLE[(m << 3) | fsym]] ^ fsym
+        self.twist_conjugate = twist = self.TWIST_MOVE_TABLE[(cc.twist_conjugate >> 3) * N_MOVES + CubieCube.SYMMETRY_8_MOVE_TABLE[(m << 3) | tsym]] ^ tsym
+        idx = ((twist >> 3) << 11) | CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED[flip ^ (twist & 7)]
+        return (self.TWIST_FLIP_PRUNING_TABLE[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+
+
+class PruningTableSearch:
+    """Breadth-first search over a (sym, raw) pruning coordinate using NumPy batch gathers.
+
+    Forward levels expand the entries set by the previous level; once more than half of the entries
+    are visited, levels are searched backward from the unvisited entries instead.
+    """
+
+    CHUNK = 1 << 16
+
+    def __init__(self, raw_move, raw_conj, sym_move, sym_state, sym_shift, e2c_magic, n_moves, raw_self_conj=None):
+        self.raw_move = np.asarray(raw_move, dtype=np.int64).reshape(-1, n_moves)
+        self.sym_move = np.asarray(sym_move, dtype=np.int64).reshape(-1, n_moves)
+        self.sym_state = np.asarray(sym_state, dtype=np.int64)
+        self.sym_shift = sym_shift
+        self.sym_mask = (1 << sym_shift) - 1
+        # Conjugation tables stay flat, indexed by raw << sym_shift | sym
+        self.n_conj = 1 << sym_shift
+        self.raw_conj_flat = np.asarray(raw_conj, dtype=np.int64)
+        self.n_self_conj = self.n_conj
+        self.raw_self_conj_flat = self.raw_conj_flat if raw_self_conj is None else np.asarray(raw_self_conj, dtype=np.int64)
+        self.n_raw = len(self.raw_move)
+        self.n_size = self.n_raw * len(self.sym_move)
+        # Conjugation column used for each self-symmetry bit j
+        self.self_sym_columns = [(j, j ^ (e2c_magic >> (j << 1) & 3)) for j in range(1, 16)]
+        # Scratch for distinct(), allocated on first use so forked workers each get their own
+        self.slots = None
+
+    def distinct(self, idx):
+        """Returns `idx` without repeated entries, in O(len(idx)): one writer per entry wins its slot."""
+        if self.slots is None:
+            self.slots = np.empty(self.n_size, dtype=np.int32)
+        order = np.arange(len(idx), dtype=np.int32)
+        self.slots[idx] = order
+        return idx[self.slots.take(idx) == order]
+
+    def neighbors(self, nodes):
+        """Returns (sym_x, raw_x) arrays of shape (len(nodes), n_moves)."""
+        sym_x = self.sym_move[nodes // self.n_raw]
+        raw_x = self.raw_move[nodes % self.n_raw]
+        raw_x *= self.n_conj
+        raw_x += sym_x & self.sym_mask
+        return sym_x >> self.sym_shift, self.raw_conj_flat.take(raw_x)
+
+    def expand(self, depths, nodes, depth):
+        """Marks every unvisited neighbour of `nodes` (and its self-symmetric twins) with depth + 1.
+
+        Returns the entries it marked, each once.
+        """
+        marked = []
+        for lo in range(0, len(nodes), self.CHUNK):
+            sym_x, raw_x = self.neighbors(nodes[lo:lo + self.CHUNK])
+            idx = (sym_x * self.n_raw + raw_x).ravel()
+            idx = self.distinct(idx[depths.take(idx) == 15])
+            depths[idx] = depth + 1
+            marked.append(idx)
+
+            sym_x = idx // self.n_raw
+            raw_x = idx % self.n_raw
+            states = self.sym_state.take(sym_x)
+            if not states.any():
+                continue
+            for j, col in self.self_sym_columns:
+                sel = np.flatnonzero((states >> j) & 1)
+                if len(sel) == 0:
+                    continue
+                idxx = sym_x[sel] * self.n_raw + self.raw_self_conj_flat.take(raw_x[sel] * self.n_self_conj + col)
+                # Already distinct: conjugation permutes the raw coordinates of each sym
+                idxx = idxx[depths.take(idxx) == 15]
+                depths[idxx] = depth + 1
+                marked.append(idxx)
+        return np.concatenate(marked) if marked else np.empty(0, dtype=np.int64)
+
+    def expand_inverse(self, depths, nodes, depth):
+        """Marks every entry of `nodes` with a neighbour at `depth` as depth + 1, returning those entries."""
+        marked = []
+        for lo in range(0, len(nodes), self.CHUNK):
+            chunk = nodes[lo:lo + self.CHUNK]
+            sym_x, raw_x = self.neighbors(chunk)
+            hit = chunk[(depths.take(sym_x * self.n_raw + raw_x) == depth).any(axis=1)]
+            depths[hit] = depth + 1
+            marked.append(hit)
+        return np.concatenate(marked) if marked else np.empty(0, dtype=np.int64)
+
+    def expand_unvisited(self, depths, lo, hi, depth):
+        """Runs one backward BFS level over the unvisited entries in [lo, hi), returning the entries it set."""
+        return self.expand_inverse(depths, np.flatnonzero(depths[lo:hi] == 15) + lo, depth)
+
+    def run(self, depths=None, pool=None, name=None, jobs=1):
+        """Fills `depths` with the BFS depth of every entry, partitioning each level across `pool` if given.
+
+        Forward levels carry the entries set by the previous level as the next frontier; pool workers each
+        expand a slice of it and return what they set. Only backward levels scan `depths`.
+        """
+        if depths is None:
+            depths = np.empty(self.n_size, dtype=np.uint8)
+        depths[:] = 15
+        depths[0] = 0
+        frontier = np.zeros(1, dtype=np.int64)
+        done = 1
+        depth = 0
+        while done < self.n_size and len(frontier):
+            if done > self.n_size // 2:
+                if pool is None:
+                    frontier = self.expand_unvisited(depths, 0, self.n_size, depth)
+                else:
+                    bounds = [self.n_size * k // jobs for k in range(jobs + 1)]
+                    futures = [pool.submit(expand_pruning_range, name, bounds[k], bounds[k + 1], depth)
+                               for k in range(jobs)]
+                    frontier = np.concatenate([future.result() for future in futures])
+            else:
+                # Expanding in index order keeps the table gathers local
+                frontier.sort()
+                if pool is None:
+                    frontier = self.expand(depths, frontier, depth)
+                else:
+                    futures = [pool.submit(expand_pruning_frontier, name, part, depth)
+                               for part in np.array_split(frontier, jobs)]
+                    # Workers racing to the same entry both report it
+                    frontier = self.distinct(np.concatenate([future.result() for future in futures]))
+            depth += 1
+            done += len(frontier)
+        return depths
+
+
+# Worker-process state for CoordCube.initialize_pruning_tables_parallel
+worker_searches = {}
+worker_depths = {}
+
+
+def install_pruning_workers(searches, buffers):
+    worker_searches.update(searches)
+    worker_depths.update({name: np.frombuffer(buf, dtype=np.uint8) for name, buf in buffers.items()})
+
+
+def expand_pruning_frontier(name, nodes, depth):
+    return worker_searches[name].expand(worker_depths[name], nodes, depth)
+
+
+def expand_pruning_range(name, lo, hi, depth):
+    return worker_searches[name].expand_unvisited(worker_depths[name], lo, hi, depth)
+
+
+# Bound once the classes above exist: cubie_cube imports this module, and the per-node methods of
+# CoordCube cannot afford a function-level import on every call
+import cubie_cube
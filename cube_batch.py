@@ -0,0 +1,262 @@
+import numpy as np
+from cube_utils import CubeUtils
+from cubie_cube import CubieCube
+
+
+class CubeBatch:
+    """
+    NumPy versions of the per-cube helpers, for many cubes at once. A batch of cubes is a pair of uint8
+    arrays, corners (N, 8) and edges (N, 12), holding CubieCube.corner_array and edge_array for every cube.
+    """
+
+    FACE_LETTERS = np.frombuffer(b"URFDLB", dtype=np.uint8)
+    CENTERS = [CubeUtils.U5, CubeUtils.R5, CubeUtils.F5, CubeUtils.D5, CubeUtils.L5, CubeUtils.B5]
+    CORNER_FACELETS = np.array(CubeUtils.CORNER_FACELET_MAP)
+    EDGE_FACELETS = np.array(CubeUtils.EDGE_FACELET_MAP)
+    CHUNK = 1 << 16
+
+    # Colour pair (a * 7 + b, colour 6 = unknown letter) -> piece, as found by facelet_string_to_cubie_cube;
+    # pairs matching no piece give 0, as there
+    CORNER_COLORS = np.full(49, 0xFF, dtype=np.uint8)
+    EDGE_COLORS = np.zeros(49, dtype=np.uint8)
+    for _j in range(8):
+        CORNER_COLORS[CubeUtils.CORNER_FACELET_MAP[_j][1] // 9 * 7 + CubeUtils.CORNER_FACELET_MAP[_j][2] // 9] = _j
+    for _j in range(12):
+        _a, _b = CubeUtils.EDGE_FACELET_MAP[_j][0] // 9, CubeUtils.EDGE_FACELET_MAP[_j][1] // 9
+        EDGE_COLORS[_a * 7 + _b] = _j << 1
+        EDGE_COLORS[_b * 7 + _a] = _j << 1 | 1
+    del _j, _a, _b
+
+    # Facelet letters of every corner byte (ori << 3 | piece) and edge byte (piece << 1 | ori), in the order of
+    # the facelets of the slot holding it
+    CORNER_LETTERS = np.zeros((24, 3), dtype=np.uint8)
+    EDGE_LETTERS = np.zeros((24, 2), dtype=np.uint8)
+    for _j in range(8):
+        for _o in range(3):
+            for _q in range(3):
+                CORNER_LETTERS[_o << 3 | _j, _q] = FACE_LETTERS[CubeUtils.CORNER_FACELET_MAP[_j][(_q - _o) % 3] // 9]
+    for _j in range(12):
+        for _o in range(2):
+            for _q in range(2):
+                EDGE_LETTERS[_j << 1 | _o, _q] = FACE_LETTERS[CubeUtils.EDGE_FACELET_MAP[_j][(_q - _o) % 2] // 9]
+    del _j, _o, _q
+
+    # Corner byte with its twist increased by 0, 1 or 2
+    CORNER_TWIST_ADD = np.array([[((b >> 3) + t) % 3 << 3 | b & 7 for b in range(24)] for t in range(3)], dtype=np.uint8)
+    # Move names as Search.solution writes them ("U", "R2", "F'", ...) -> move index
+    SOLUTION_MOVES = {name[:-1]: m for m, name in enumerate(CubeUtils.MOVE_TO_STRING_MAP)}
+    IDENTITY_MOVE = 18      # Padding in move sequences (any negative move) is mapped to this extra no-op move
+    MOVE_BLOCK = 3          # Moves applied per gather step, through tables of every block of 19 moves
+    # Per block of moves: source slot and twist/flip added for every slot, composed from
+    # CubieCube.MOVE_CUBE_STATES; built on first use
+    CORNER_MOVE_SOURCE = None
+    CORNER_MOVE_TWIST = None
+    EDGE_MOVE_SOURCE = None
+    EDGE_MOVE_FLIP = None
+
+    def __init__(self):
+        raise TypeError("CubeBatch class should not be instantiated.")
+
+    @staticmethod
+    def initialize_move_tables():
+        if CubieCube.MOVE_CUBE_STATES[0] is None:
+            CubieCube.initialize_moves()
+        states = CubieCube.MOVE_CUBE_STATES + [CubieCube()]
+        corners = np.array([cc.corner_array for cc in states], dtype=np.uint8)
+        edges = np.array([cc.edge_array for cc in states], dtype=np.uint8)
+        # Compose the single moves into blocks: block b is the sequence of the digits of b in base 19
+        single = CubeBatch.move_block_tables(corners, edges)
+        for _ in range(CubeBatch.MOVE_BLOCK - 1):
+            moves = np.arange(len(corners) * 19) % 19
+            corners, edges = CubeBatch.step(np.repeat(corners, 19, axis=0), np.repeat(edges, 19, axis=0), moves,
+                                            *single)
+        (CubeBatch.CORNER_MOVE_SOURCE, CubeBatch.CORNER_MOVE_TWIST,
+         CubeBatch.EDGE_MOVE_SOURCE, CubeBatch.EDGE_MOVE_FLIP) = CubeBatch.move_block_tables(corners, edges)
+
+    @staticmethod
+    def move_block_tables(corners, edges):
+        return (corners & 7).astype(np.intp), corners >> 3, (edges >> 1).astype(np.intp), edges & 1
+
+    @staticmethod
+    def step(corners, edges, m, corner_source, corner_twist, edge_source, edge_flip):
+        """One gather step: cube i = cube i * table entry m[i]."""
+        corners = CubeBatch.CORNER_TWIST_ADD[corner_twist[m], np.take_along_axis(corners, corner_source[m], axis=1)]
+        edges = np.take_along_axis(edges, edge_source[m], axis=1) ^ edge_flip[m]
+        return corners, edges
+
+    @staticmethod
+    def solved(n):
+        """Returns (corners, edges) of n solved cubes."""
+        return (np.tile(np.arange(8, dtype=np.uint8), (n, 1)),
+                np.tile(np.arange(0, 24, 2, dtype=np.uint8), (n, 1)))
+
+    @staticmethod
+    def pad_moves(sequences):
+        """Packs move sequences of different lengths into an (N, L) array, padded with -1."""
+        lengths = np.fromiter(map(len, sequences), dtype=np.intp, count=len(sequences))
+        moves = np.full((len(sequences), lengths.max(initial=0)), -1, dtype=np.int8)
+        moves[np.arange(moves.shape[1]) < lengths[:, None]] = [m for sequence in sequences for m in sequence]
+        return moves
+
+    @staticmethod
+    def parse_solutions(solutions):
+        """
+        Converts solver output strings ("U, R2, F'", optionally with the ".  " phase separator and the "(Nf)"
+        suffix) into a padded move array as pad_moves gives. Returns (moves, ok); rows that are not a move
+        sequence, such as "Error 7", are empty with ok False.
+        """
+        get = CubeBatch.SOLUTION_MOVES.get
+        sequences = []
+        ok = np.ones(len(solutions), dtype=bool)
+        for i, solution in enumerate(solutions):
+            sequence = [get(token, -1) for token in solution.split("(")[0].replace(",", " ").replace(".", " ").split()]
+            if -1 in sequence:
+                ok[i] = False
+                sequence = []
+            sequences.append(sequence)
+        return CubeBatch.pad_moves(sequences), ok
+
+    @staticmethod
+    def apply_moves(corners, edges, moves):
+        """
+        Applies one move sequence per cube (cube = cube * M, as CubieCube.multiply_corners/edges and
+        PackedCube.move do). `moves` is an (N, L) array of move indices, padded with negative values.
+        Returns new (corners, edges) arrays.
+        """
+        if CubeBatch.CORNER_MOVE_SOURCE is None:
+            CubeBatch.initialize_move_tables()
+        tables = (CubeBatch.CORNER_MOVE_SOURCE, CubeBatch.CORNER_MOVE_TWIST,
+                  CubeBatch.EDGE_MOVE_SOURCE, CubeBatch.EDGE_MOVE_FLIP)
+        n, k = len(corners), CubeBatch.MOVE_BLOCK
+        moves = np.asarray(moves).reshape(n, -1)
+        blocks = np.full((n, -(-moves.shape[1] // k) * k), CubeBatch.IDENTITY_MOVE, dtype=np.intp)
+        blocks[:, :moves.shape[1]] = np.where(moves < 0, CubeBatch.IDENTITY_MOVE, moves)
+        blocks = blocks.reshape(n, -1, k) @ (19 ** np.arange(k - 1, -1, -1))
+        for m in blocks.T:
+            corners, edges = CubeBatch.step(corners, edges, m, *tables)
+        return corners, edges
+
+    @staticmethod
+    def to_facelets(corners, edges):
+        """Returns the facelet string of every cube, as CubeUtils.cubie_cube_to_facelet_string does."""
+        n = len(corners)
+        out = np.empty((n, 54), dtype=np.uint8)
+        out[:, CubeBatch.CENTERS] = CubeBatch.FACE_LETTERS
+        for c in range(8):
+            out[:, CubeUtils.CORNER_FACELET_MAP[c]] = CubeBatch.CORNER_LETTERS[corners[:, c]]
+        for e in range(12):
+            out[:, CubeUtils.EDGE_FACELET_MAP[e]] = CubeBatch.EDGE_LETTERS[edges[:, e]]
+        text = out.tobytes().decode("ascii")
+        return [text[i:i + 54] for i in range(0, 54 * n, 54)]
+
+    @staticmethod
+    def from_scramble_arrays(scrambles):
+        """Facelet strings of many scrambles (lists of move indices), as CubeTools.from_scramble_array gives."""
+        facelets = []
+        for start in range(0, len(scrambles), CubeBatch.CHUNK):
+            chunk = scrambles[start:start + CubeBatch.CHUNK]
+            corners, edges = CubeBatch.apply_moves(*CubeBatch.solved(len(chunk)), CubeBatch.pad_moves(chunk))
+            facelets += CubeBatch.to_facelets(corners, edges)
+        return facelets
+
+    @staticmethod
+    def verify_solutions(facelets, solutions, inverse=False):
+        """
+        Checks many (facelets, solution) pairs at once: True where the facelet string is a valid cube and
+        applying the solution to it gives the solved cube. With inverse=True the solutions are read as
+        Search.INVERSE_SOLUTION output, i.e. applying them to the solved cube must give the facelets.
+        """
+        corners, edges, errors = CubeBatch.parse_facelets(facelets)
+        if len(corners) != len(solutions):
+            raise ValueError(f"{len(corners)} cubes but {len(solutions)} solutions")
+        moves, ok = CubeBatch.parse_solutions(solutions)
+        ok &= errors == 0
+        solved_corners, solved_edges = CubeBatch.solved(1)
+        for start in range(0, len(ok), CubeBatch.CHUNK):
+            rows = slice(start, start + CubeBatch.CHUNK)
+            if inverse:
+                c, e = CubeBatch.apply_moves(*CubeBatch.solved(len(ok[rows])), moves[rows])
+                ok[rows] &= (c == corners[rows]).all(axis=1) & (e == edges[rows]).all(axis=1)
+            else:
+                c, e = CubeBatch.apply_moves(corners[rows], edges[rows], moves[rows])
+                ok[rows] &= (c == solved_corners).all(axis=1) & (e == solved_edges).all(axis=1)
+        return ok
+
+    @staticmethod
+    def facelet_array(facelets):
+        """
+        Returns an (N, 54) uint8 array of facelet letters, plus a mask of the rows too short to be a cube.
+        Accepts such an array (or a flat one of 54 * N letters) or a sequence of facelet strings; like
+        verify_facelet_string, characters past the 54th are ignored.
+        """
+        if isinstance(facelets, np.ndarray):
+            if facelets.size % 54 != 0:
+                raise ValueError(f"Facelet array of {facelets.size} letters is not a whole number of 54-letter cubes.")
+            letters = facelets.reshape(-1, 54).astype(np.uint8, copy=False)
+            return letters, np.zeros(letters.shape[0], dtype=bool)
+        short = np.array([len(s) < 54 for s in facelets], dtype=bool)
+        text = "".join(s[:54] if len(s) >= 54 else "?" * 54 for s in facelets)
+        return np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8).reshape(-1, 54), short
+
+    @staticmethod
+    def parse_facelets(facelets):
+        """
+        Validates and parses many facelet strings at once (see facelet_array for the accepted input).
+        Returns (corners, edges, errors): the cubie arrays of every cube and Search.verify_facelet_string's
+        result per row: 0 for a valid cube, -1 for wrong colours or duplicate pieces, -2 for a twist or flip
+        that does not sum to zero, -3 for mismatched permutation parities.
+        """
+        letters, short = CubeBatch.facelet_array(facelets)
+        n = len(letters)
+        corners = np.zeros((n, 8), dtype=np.uint8)
+        edges = np.zeros((n, 12), dtype=np.uint8)
+        errors = np.zeros(n, dtype=np.int8)
+        for start in range(0, n, CubeBatch.CHUNK):
+            rows = slice(start, start + CubeBatch.CHUNK)
+            corners[rows], edges[rows], errors[rows] = CubeBatch.parse_chunk(letters[rows])
+        errors[short] = -1
+        return corners, edges, errors
+
+    @staticmethod
+    def parse_chunk(letters):
+        n = len(letters)
+        # Colour of every facelet: index of the first centre with its letter, as center.find() does; 6 if none
+        rows = np.arange(n)
+        color_of = np.full((n, 256), 6, dtype=np.uint8)
+        for c in range(5, -1, -1):
+            color_of[rows, letters[:, CubeBatch.CENTERS[c]]] = c
+        f = np.take_along_axis(color_of, letters.astype(np.intp), axis=1)
+        counts = np.bincount((rows[:, None] * 7 + f).ravel(), minlength=n * 7).reshape(n, 7)
+        colors_ok = (counts[:, :6] == 9).all(axis=1)
+
+        # Corners: orientation is the first U/D facelet (0 if none); the next two colours identify the piece
+        cf = f[:, CubeBatch.CORNER_FACELETS]
+        up_down = (cf == 0) | (cf == 3)
+        ori = np.where(up_down.any(axis=2), up_down.argmax(axis=2), 0)
+        col1 = np.take_along_axis(cf, ((ori + 1) % 3)[:, :, None], axis=2)[:, :, 0]
+        col2 = np.take_along_axis(cf, ((ori + 2) % 3)[:, :, None], axis=2)[:, :, 0]
+        piece = CubeBatch.CORNER_COLORS[col1 * 7 + col2]
+        corners = np.where(piece == 0xFF, 0, ori.astype(np.uint8) << 3 | piece).astype(np.uint8)
+
+        ef = f[:, CubeBatch.EDGE_FACELETS]
+        edges = CubeBatch.EDGE_COLORS[ef[:, :, 0] * 7 + ef[:, :, 1]]
+
+        corner_perm = corners & 7
+        edge_perm = edges >> 1
+        corners_ok = np.bitwise_or.reduce(np.left_shift(1, corner_perm, dtype=np.uint16), axis=1) == 0xFF
+        edges_ok = np.bitwise_or.reduce(np.left_shift(1, edge_perm, dtype=np.uint16), axis=1) == 0xFFF
+        flip_ok = (edges & 1).sum(axis=1) % 2 == 0
+        twist_ok = (corners >> 3).sum(axis=1) % 3 == 0
+        parity_ok = CubeBatch.permutation_parity(corner_perm) == CubeBatch.permutation_parity(edge_perm)
+
+        errors = np.select([~colors_ok, ~edges_ok, ~corners_ok, ~flip_ok, ~twist_ok, ~parity_ok],
+                           [-1, -1, -1, -2, -2, -3], 0).astype(np.int8)
+        return corners, edges, errors
+
+    @staticmethod
+    def permutation_parity(perm):
+        """Parity (0 or 1) of every row of an (N, k) array of permutations, from its inversion count."""
+        parity = np.zeros(len(perm), dtype=np.uint8)
+        for i in range(perm.shape[1] - 1):
+            parity ^= (perm[:, i:i + 1] > perm[:, i + 1:]).sum(axis=1, dtype=np.uint8)
+        return parity & 1
@@ -1,10 +1,22 @@
+import io
+import lzma
+import mmap
+import os
 import random
 import struct
+import zlib
+from array import array
 from cubie_cube import CubieCube
+from packed_cube import PackedCube
 from coordinate_cube import CoordCube
 from solver import Search
 from cube_utils import CubeUtils
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class InputReader:
     def __init__(self, data: bytes):
@@ -117,20 +129,349 @@ class CubeTools:
         for row in arr:
             CubeTools.read_int_array(row, inp)
 
+    # Tables persisted in the cache file, in on-disk order: (owner, attribute, typecode, length)
+    TABLE_LAYOUT = [
+        (CubieCube, "FLIP_SYMMETRY_TO_RAW", 'H', CoordCube.N_FLIP_SYM),
+        (CubieCube, "TWIST_SYMMETRY_TO_RAW", 'H', CoordCube.N_TWIST_SYM),
+        (CubieCube, "EDGE_PERMUTATION_SYMMETRY_TO_RAW", 'H', CoordCube.N_PERM_SYM),
+        (CubieCube, "FLIP_RAW_TO_SYMMETRY", 'B', CoordCube.N_FLIP + CoordCube.N_FLIP_HALF),
+        (CubieCube, "TWIST_RAW_TO_SYMMETRY", 'B', CoordCube.N_TWIST + CoordCube.N_TWIST_HALF),
+        (CubieCube, "EDGE_PERMUTATION_RAW_TO_SYMMETRY", 'B', CoordCube.N_PERM_HALF),
+        (CubieCube, "PERMUTATION_TO_COMBINATION_PLUS_PARITY", 'H', CoordCube.N_PERM_SYM),
+        (CubieCube, "PERMUTATION_INVERSE_EDGE_SYMMETRY", 'H', CoordCube.N_PERM_SYM),
+        (CoordCube, "UD_SLICE_MOVE_TABLE", 'H', CoordCube.N_SLICE * CoordCube.N_MOVES_PHASE_1),
+        (CoordCube, "TWIST_MOVE_TABLE", 'H', CoordCube.N_TWIST_SYM * CoordCube.N_MOVES_PHASE_1),
+        (CoordCube, "FLIP_MOVE_TABLE", 'H', CoordCube.N_FLIP_SYM * CoordCube.N_MOVES_PHASE_1),
+        (CoordCube, "UD_SLICE_CONJUGATION_TABLE", 'H', CoordCube.N_SLICE * 8),
+        (CoordCube, "UD_SLICE_TWIST_PRUNING_TABLE", 'I', CoordCube.N_SLICE * CoordCube.N_TWIST_SYM // 8 + 1),
+        (CoordCube, "UDSliceFlipPrun", 'I', CoordCube.N_SLICE * CoordCube.N_FLIP_SYM // 8 + 1),
+        (CoordCube, "CORNER_PERMUTATION_MOVE_TABLE", 'H', CoordCube.N_PERM_SYM * CoordCube.N_MOVES_PHASE_2),
+        (CoordCube, "EDGE_PERMUTATION_MOVE_TABLE", 'H', CoordCube.N_PERM_SYM * CoordCube.N_MOVES_PHASE_2),
+        (CoordCube, "MIDDLE_PERMUTATION_MOVE_TABLE", 'H', CoordCube.N_MPERM * CoordCube.N_MOVES_PHASE_2),
+        (CoordCube, "MIDDLE_PERMUTATION_CONJUGATION_TABLE", 'H', CoordCube.N_MPERM * 16),
+        (CoordCube, "CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE", 'H', CoordCube.N_COMB * 16),
+        (CoordCube, "MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE", 'I', CoordCube.N_MPERM * CoordCube.N_PERM_SYM // 8 + 1),
+        (CoordCube, "EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE", 'I', CoordCube.N_COMB * CoordCube.N_PERM_SYM // 8 + 1),
+    ]
+    TWIST_FLIP_TABLE_LAYOUT = [
+        (CubieCube, "FLIP_SYMMETRY_TO_RAW_FLIPPED", 'H', CoordCube.N_FLIP_SYM * 8),
+        (CoordCube, "TWIST_FLIP_PRUNING_TABLE", 'I', CoordCube.N_FLIP * CoordCube.N_TWIST_SYM // 8 + 1),
+    ]
+    # CubeUtils options a table's contents depend on, beyond its name, type and length
+    TABLE_CONFIG_OPTIONS = {
+        "PERMUTATION_TO_COMBINATION_PLUS_PARITY": ("USE_COMBINATION_PARITY_PRUNING",),
+        "CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE": ("USE_COMBINATION_PARITY_PRUNING",),
+        "EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE": ("USE_COMBINATION_PARITY_PRUNING",),
+    }
+    # Builders that regenerate stale sections, in dependency order: (builder, tables it fills)
+    TABLE_BUILDERS = [
+        (CubieCube.initialize_permutatioin_symmetry_to_raw,
+         ("EDGE_PERMUTATION_SYMMETRY_TO_RAW", "EDGE_PERMUTATION_RAW_TO_SYMMETRY",
+          "PERMUTATION_TO_COMBINATION_PLUS_PARITY", "PERMUTATION_INVERSE_EDGE_SYMMETRY")),
+        (CubieCube.initialize_flip_symmetry_to_raw, ("FLIP_SYMMETRY_TO_RAW", "FLIP_RAW_TO_SYMMETRY")),
+        (CubieCube.initialize_twist_symmetry_to_raw, ("TWIST_SYMMETRY_TO_RAW", "TWIST_RAW_TO_SYMMETRY")),
+        (CubieCube.initialize_flip_symmetry_to_raw_flipped, ("FLIP_SYMMETRY_TO_RAW_FLIPPED",)),
+        (CoordCube.initialize_corner_permutation_move_table, ("CORNER_PERMUTATION_MOVE_TABLE",)),
+        (CoordCube.initialize_edge_permutation_move_table, ("EDGE_PERMUTATION_MOVE_TABLE",)),
+        (CoordCube.initialize_middle_permutation_move_and_conjugation_tables,
+         ("MIDDLE_PERMUTATION_MOVE_TABLE", "MIDDLE_PERMUTATION_CONJUGATION_TABLE")),
+        (CoordCube.initialize_corner_combination_plus_parity_move_and_conjugation_tables,
+         ("CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE",)),
+        (CoordCube.initialize_flip_move_table, ("FLIP_MOVE_TABLE",)),
+        (CoordCube.initialize_twist_move_table, ("TWIST_MOVE_TABLE",)),
+        (CoordCube.initialize_ud_slice_move_and_conjugation_tables, ("UD_SLICE_MOVE_TABLE", "UD_SLICE_CONJUGATION_TABLE")),
+        (CoordCube.initialize_middle_corner_permutation_pruning_table, ("MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE",)),
+        (CoordCube.init_perm_comb_p_prun, ("EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE",)),
+        (CoordCube.initialize_slice_twist_pruning_table, ("UD_SLICE_TWIST_PRUNING_TABLE",)),
+        (CoordCube.initialize_slice_flip_pruning_table, ("UDSliceFlipPrun",)),
+        (CoordCube.initialize_twist_flip_pruning_table, ("TWIST_FLIP_PRUNING_TABLE",)),
+    ]
+
+    # Table file v3: header, section directory, then native-endian sections aligned to SECTION_ALIGNMENT.
+    # v2 files (no fingerprint or CRC per section) are still read
+    TABLE_FILE_MAGIC = b"RCSTABLE"
+    TABLE_FILE_VERSION = 3
+    TABLE_FILE_HEADER = struct.Struct("=8sHHI")             # magic, version, section count, byte order mark
+    TABLE_FILE_SECTION = struct.Struct("=64s1s3xIIQII")     # name, typecode, rows, columns (0 if 1-D), offset,
+                                                            # config fingerprint, CRC32
+    TABLE_FILE_SECTION_V2 = struct.Struct("=64s1s3xIIQ")
+    BYTE_ORDER_MARK = 0x01020304
+    SECTION_ALIGNMENT = 64
+
+    # Table bundle: header, then a compressed table file; built for deployment by build_bundle.py
+    TABLE_BUNDLE_MAGIC = b"RCSBUNDL"
+    TABLE_BUNDLE_VERSION = 1
+    TABLE_BUNDLE_HEADER = struct.Struct("=8sHHIBxxxIQ")  # magic, version, table file version, config, codec, CRC32, size
+    TABLE_CONFIG_TWIST_FLIP = 0x1
+    TABLE_CONFIG_COMBINATION_PARITY = 0x2
+    TABLE_BUNDLE_CODECS = ["zlib", "lzma"]
+
+    # Default cache file of the command-line tools, next to this module
+    CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache.bin")
+
+    # Keeps the mapping alive for as long as the tables reference it
+    table_buffer = None
+
+    @staticmethod
+    def table_layout():
+        if CubeUtils.USE_TWIST_FLIP_PRUNING:
+            return CubeTools.TABLE_LAYOUT + CubeTools.TWIST_FLIP_TABLE_LAYOUT
+        return CubeTools.TABLE_LAYOUT
+
     @staticmethod
     def init_from(file_handle):
         """Initializes all tables from a cached file."""
         from solver import Search
-        if Search.inited and CoordCube.initialization_level == 2:
-            return
-        
+        with CoordCube.init_lock:
+            if not (Search.inited and CoordCube.initialization_level == 2):
+                CubeTools.load_tables(file_handle)
+
+    @staticmethod
+    def load_tables(file_handle):
+        from solver import Search
         print("Loading tables from cache...")
         CubieCube.initialize_moves()
         CubieCube.initialize_symmetries()
 
-        file_content = file_handle.read()
-        inp = InputReader(file_content)
+        magic = file_handle.read(len(CubeTools.TABLE_FILE_MAGIC))
+        file_handle.seek(0)
+        if magic == CubeTools.TABLE_FILE_MAGIC:
+            stale = CubeTools.map_tables(CubeTools.open_table_buffer(file_handle))
+            if stale:
+                print(f"Rebuilding {len(stale)} missing or stale table(s): {', '.join(sorted(stale))}")
+                CubeTools.rebuild_tables(stale)
+                # Only a cache the caller opened for writing ('r+b') is updated; the shipped one is never touched
+                if not getattr(file_handle, "writable", lambda: False)():
+                    print("Cache file opened read-only; rebuilt tables are kept in memory only.")
+                else:
+                    try:
+                        CubeTools.rewrite_sections(file_handle.name, stale)
+                    except (AttributeError, OSError) as e:
+                        print(f"Could not update the cache file ({e}); rebuilt tables are kept in memory only.")
+        elif magic == CubeTools.TABLE_BUNDLE_MAGIC:
+            stale = CubeTools.map_tables(CubeTools.read_bundle(file_handle))
+            CubeTools.rebuild_tables(stale)
+        else:
+            CubeTools.read_legacy_tables(InputReader(file_handle.read()))
+
+        if CubeUtils.USE_TWIST_FLIP_PRUNING and CoordCube.TWIST_FLIP_PRUNING_TABLE is None:
+            print("Cache has no twist-flip pruning table; building it...")
+            CoordCube.initialize_twist_flip_pruning_table()
+        # Published last: Search.init skips the lock once both are set
+        Search.inited = True
+        CoordCube.initialization_level = 2
+        print("Loading complete.")
+
+    @staticmethod
+    def open_table_buffer(file_handle):
+        """Maps the cache file read-only, falling back to an in-memory copy for non-file handles."""
+        try:
+            return mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            return file_handle.read()
+
+    @staticmethod
+    def table_directory(buffer):
+        """Returns the file version and {name: (directory position, typecode, rows, columns, offset, fingerprint, crc)}
+        of a v2 or v3 table file; fingerprint and crc are None for v2."""
+        magic, version, count, bom = CubeTools.TABLE_FILE_HEADER.unpack_from(buffer, 0)
+        if magic != CubeTools.TABLE_FILE_MAGIC or version not in (2, CubeTools.TABLE_FILE_VERSION):
+            raise ValueError("Unsupported table file format.")
+        if bom != CubeTools.BYTE_ORDER_MARK:
+            raise ValueError("Table file was written on a machine with a different byte order.")
+
+        entry = CubeTools.TABLE_FILE_SECTION if version == CubeTools.TABLE_FILE_VERSION else CubeTools.TABLE_FILE_SECTION_V2
+        directory = {}
+        pos = CubeTools.TABLE_FILE_HEADER.size
+        for _ in range(count):
+            name, typecode, rows, cols, offset, *checks = entry.unpack_from(buffer, pos)
+            fingerprint, crc = checks or (None, None)
+            directory[name.rstrip(b"\0").decode("ascii")] = (pos, typecode.decode("ascii"), rows, cols, offset, fingerprint, crc)
+            pos += entry.size
+        return version, directory
+
+    @staticmethod
+    def table_sections(buffer):
+        """Returns {name: (flat table view, fingerprint, crc)} for every complete section of a table file."""
+        view = memoryview(buffer)
+        sections = {}
+        for name, (_, typecode, rows, cols, offset, fingerprint, crc) in CubeTools.table_directory(view)[1].items():
+            end = offset + rows * (cols or 1) * array(typecode).itemsize
+            if end <= len(view):
+                sections[name] = (view[offset:end].cast(typecode), fingerprint, crc)
+        return sections
+
+    @staticmethod
+    def table_fingerprint(attr, typecode, length):
+        """Fingerprint of the configuration a table was built for: its name, type, length and relevant options."""
+        options = [f"{option}={getattr(CubeUtils, option)}" for option in CubeTools.TABLE_CONFIG_OPTIONS.get(attr, ())]
+        return zlib.crc32("/".join([attr, typecode, str(length)] + options).encode("ascii"))
+
+    @staticmethod
+    def map_tables(buffer):
+        """
+        Points every table attribute at a zero-copy view into a table file. Returns the names of the tables
+        whose sections are missing, truncated, built for another configuration or fail their CRC.
+        """
+        try:
+            sections = CubeTools.table_sections(buffer)
+        except (ValueError, struct.error) as e:
+            print(f"Cannot read the table directory ({e}).")
+            sections = {}
+        stale = set()
+        for owner, attr, typecode, length in CubeTools.table_layout():
+            view, fingerprint, crc = sections.get(attr, (None, None, None))
+            if (view is None or view.format != typecode or len(view) != length
+                    or fingerprint not in (None, CubeTools.table_fingerprint(attr, typecode, length))
+                    or crc not in (None, zlib.crc32(view))):
+                stale.add(attr)
+            else:
+                setattr(owner, attr, view)
+        CubeTools.table_buffer = buffer
+        return stale
+
+    @staticmethod
+    def new_table(typecode, length):
+        # Pruning tables ('I') are filled by slice assignment from lists, so they stay lists
+        return bytearray(length) if typecode == 'B' else [0] * length if typecode == 'I' else array(typecode, [0]) * length
+
+    @staticmethod
+    def rebuild_tables(names):
+        """Regenerates the named tables, and any table built alongside them, with their builders."""
+        layout = {attr: (owner, typecode, length) for owner, attr, typecode, length in CubeTools.table_layout()}
+        pruning_tables = set(CoordCube.pruning_table_names())
+        for builder, attrs in CubeTools.TABLE_BUILDERS:
+            if names.isdisjoint(attrs):
+                continue
+            for attr in attrs:
+                owner, typecode, length = layout[attr]
+                setattr(owner, attr, CubeTools.new_table(typecode, length))
+            if not pruning_tables.isdisjoint(attrs):
+                CubeTools.prepare_pruning_table_inputs()
+            builder()
+
+    @staticmethod
+    def prepare_pruning_table_inputs():
+        """Rebuilds the symmetry states and move tables that pruning-table searches need but the cache does not store."""
+        if CubieCube.SYMMETRY_STATE_TWIST is None:
+            CubieCube.initialize_twist_symmetry_states()
+        if CubieCube.SYMMETRY_STATE_FLIP is None:
+            CubieCube.initialize_flip_symmetry_states()
+        if CubieCube.SYMMETRY_STATE_PERMUTATION is None:
+            CubieCube.initialize_permutation_symmetry_states()
+        if CoordCube.CORNER_COMBINATION_PLUS_PARITY_MOVE_TABLE is None:
+            CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE = CubeTools.new_table('H', CoordCube.N_COMB * 16)
+            CoordCube.initialize_corner_combination_plus_parity_move_and_conjugation_tables()
+
+    @staticmethod
+    def rewrite_sections(path, names):
+        """
+        Writes the named tables back into the table file at `path`. Sections that exist with the same size are
+        overwritten in place; otherwise (new sections, resized ones, or a v2 file) the whole file is rewritten.
+        """
+        with open(path, 'r+b') as f:
+            try:
+                version, directory = CubeTools.table_directory(f.read())
+            except (ValueError, struct.error):
+                version, directory = None, {}
+            updates = []
+            for owner, attr, typecode, length in CubeTools.table_layout():
+                if attr not in names:
+                    continue
+                data = array(typecode, getattr(owner, attr)).tobytes()
+                entry = directory.get(attr)
+                if (version != CubeTools.TABLE_FILE_VERSION or entry is None
+                        or entry[2] * (entry[3] or 1) * array(entry[1]).itemsize != len(data)):
+                    break
+                updates.append((entry[0], entry[4], CubeTools.TABLE_FILE_SECTION.pack(
+                    attr.encode("ascii"), typecode.encode("ascii"), length, 0, entry[4],
+                    CubeTools.table_fingerprint(attr, typecode, length), zlib.crc32(data)), data))
+            else:
+                for pos, offset, entry, data in updates:
+                    f.seek(offset)
+                    f.write(data)
+                    f.seek(pos)
+                    f.write(entry)
+                return
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            CubeTools.write_tables(f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def table_config():
+        """Bit mask of the options that change which tables are stored or what they hold."""
+        return ((CubeTools.TABLE_CONFIG_TWIST_FLIP if CubeUtils.USE_TWIST_FLIP_PRUNING else 0)
+                | (CubeTools.TABLE_CONFIG_COMBINATION_PARITY if CubeUtils.USE_COMBINATION_PARITY_PRUNING else 0))
+
+    @staticmethod
+    def read_bundle(file_handle):
+        """Returns the table file inside a table bundle, after checking its header, configuration and checksum."""
+        header = file_handle.read(CubeTools.TABLE_BUNDLE_HEADER.size)
+        if len(header) != CubeTools.TABLE_BUNDLE_HEADER.size:
+            raise ValueError("Table bundle is truncated.")
+        magic, version, file_version, config, codec, crc, size = CubeTools.TABLE_BUNDLE_HEADER.unpack(header)
+        if magic != CubeTools.TABLE_BUNDLE_MAGIC or version != CubeTools.TABLE_BUNDLE_VERSION:
+            raise ValueError("Unsupported table bundle format.")
+        if file_version != CubeTools.TABLE_FILE_VERSION or codec >= len(CubeTools.TABLE_BUNDLE_CODECS):
+            raise ValueError("Table bundle was built by an incompatible version.")
+        if config != CubeTools.table_config():
+            raise ValueError(f"Table bundle was built for another configuration "
+                             f"({config:#x}, running with {CubeTools.table_config():#x}).")
+        try:
+            if CubeTools.TABLE_BUNDLE_CODECS[codec] == "lzma":
+                data = lzma.decompress(file_handle.read())
+            else:
+                data = zlib.decompress(file_handle.read())
+        except (lzma.LZMAError, zlib.error) as e:
+            raise ValueError(f"Table bundle is corrupt: {e}")
+        if len(data) != size or zlib.crc32(data) != crc:
+            raise ValueError("Table bundle checksum mismatch.")
+        return data
 
+    @staticmethod
+    def write_bundle(file_handle, codec="lzma"):
+        """Writes the loaded tables as a compressed, checksummed table bundle."""
+        buffer = io.BytesIO()
+        CubeTools.write_tables(buffer)
+        data = buffer.getvalue()
+        if codec == "lzma":
+            payload = lzma.compress(data, preset=9 | lzma.PRESET_EXTREME)
+        else:
+            payload = zlib.compress(data, 9)
+        file_handle.write(CubeTools.TABLE_BUNDLE_HEADER.pack(
+            CubeTools.TABLE_BUNDLE_MAGIC, CubeTools.TABLE_BUNDLE_VERSION, CubeTools.TABLE_FILE_VERSION,
+            CubeTools.table_config(), CubeTools.TABLE_BUNDLE_CODECS.index(codec), zlib.crc32(data), len(data)))
+        file_handle.write(payload)
+
+    @staticmethod
+    def init_from_bundle(path, jobs=1):
+        """
+        Initializes all tables from a table bundle, regenerating them in memory if the bundle is missing,
+        corrupt, fails its checksum or was built for another configuration (see table_config).
+        """
+        try:
+            with open(path, 'rb') as f:
+                CubeTools.init_from(f)
+        except (OSError, ValueError) as e:
+            print(f"Cannot load table bundle '{path}' ({e}); generating tables...")
+            Search.init(jobs)
+
+    @staticmethod
+    def init_from_cache(path=None, jobs=1):
+        """Loads the tables from the cache file `path` (default CACHE_FILE), or generates and saves them there if it does not exist."""
+        path = path or CubeTools.CACHE_FILE
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                CubeTools.init_from(f)
+        else:
+            with open(path, 'wb') as f:
+                CubeTools.save_to(f, jobs=jobs)
+
+    @staticmethod
+    def read_legacy_tables(inp):
+        """Reads the original big-endian cache layout, one value at a time."""
         CubeTools.read_char_array(CubieCube.FLIP_SYMMETRY_TO_RAW, inp)
         CubeTools.read_char_array(CubieCube.TWIST_SYMMETRY_TO_RAW, inp)
         CubeTools.read_char_array(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW, inp)
@@ -141,37 +482,73 @@ class CubeTools:
         CubeTools.read_char_array(CubieCube.PERMUTATION_INVERSE_EDGE_SYMMETRY, inp) # Ensures this is read as a char array
 
         # CoordCube tables
-        CubeTools.read_char_2d_array(CoordCube.UD_SLICE_MOVE_TABLE, inp)
-        CubeTools.read_char_2d_array(CoordCube.TWIST_MOVE_TABLE, inp)
-        CubeTools.read_char_2d_array(CoordCube.FLIP_MOVE_TABLE, inp)
-        CubeTools.read_char_2d_array(CoordCube.UD_SLICE_CONJUGATION_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.UD_SLICE_MOVE_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.TWIST_MOVE_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.FLIP_MOVE_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.UD_SLICE_CONJUGATION_TABLE, inp)
         CubeTools.read_int_array(CoordCube.UD_SLICE_TWIST_PRUNING_TABLE, inp)
         CubeTools.read_int_array(CoordCube.UDSliceFlipPrun, inp)
-        CubeTools.read_char_2d_array(CoordCube.CORNER_PERMUTATION_MOVE_TABLE, inp)
-        CubeTools.read_char_2d_array(CoordCube.EDGE_PERMUTATION_MOVE_TABLE, inp)
-        CubeTools.read_char_2d_array(CoordCube.MIDDLE_PERMUTATION_MOVE_TABLE, inp)
-        CubeTools.read_char_2d_array(CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE, inp)
-        CubeTools.read_char_2d_array(CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.CORNER_PERMUTATION_MOVE_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.EDGE_PERMUTATION_MOVE_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.MIDDLE_PERMUTATION_MOVE_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE, inp)
+        CubeTools.read_char_array(CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE, inp)
         CubeTools.read_int_array(CoordCube.MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE, inp)
         CubeTools.read_int_array(CoordCube.EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE, inp)
 
-        if CubeUtils.USE_TWIST_FLIP_PRUNING:
+        if CubeUtils.USE_TWIST_FLIP_PRUNING and inp.offset < len(inp.buffer):
+            CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED = [0] * (CoordCube.N_FLIP_SYM * 8)
+            CoordCube.TWIST_FLIP_PRUNING_TABLE = [0] * ((CoordCube.N_FLIP * CoordCube.N_TWIST_SYM) // 8 + 1)
             CubeTools.read_char_array(CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED, inp)
             CubeTools.read_int_array(CoordCube.TWIST_FLIP_PRUNING_TABLE, inp)
 
-        Search.inited = True
-        CoordCube.initialization_level = 2
-        print("Loading complete.")
-
-
     @staticmethod
-    def save_to(file_handle):
-        """Generates and saves all tables to a cache file."""
+    def save_to(file_handle, legacy=False, jobs=1):
+        """Generates and saves all tables to a cache file, building independent tables on `jobs` processes."""
         print("Generating and caching tables...")
         
-        Search.init() 
-        out = OutputWriter(file_handle)
+        Search.init(jobs)
+        if legacy:
+            CubeTools.write_legacy_tables(OutputWriter(file_handle))
+        else:
+            CubeTools.write_tables(file_handle)
+        
+        print("Tables saved to cache.")
+
+    @staticmethod
+    def write_tables(file_handle):
+        """Writes all tables in the v3 layout: a section directory followed by aligned native-endian arrays."""
+        sections = []
+        for owner, attr, typecode, length in CubeTools.table_layout():
+            data = array(typecode, getattr(owner, attr))
+            if len(data) != length:
+                raise ValueError(f"{attr} has {len(data)} entries, expected {length}.")
+            sections.append((attr, typecode, length, 0, data.tobytes()))
+
+        align = CubeTools.SECTION_ALIGNMENT
+        offset = CubeTools.TABLE_FILE_HEADER.size + CubeTools.TABLE_FILE_SECTION.size * len(sections)
+        offsets = []
+        for section in sections:
+            offset = (offset + align - 1) // align * align
+            offsets.append(offset)
+            offset += len(section[4])
+
+        file_handle.write(CubeTools.TABLE_FILE_HEADER.pack(
+            CubeTools.TABLE_FILE_MAGIC, CubeTools.TABLE_FILE_VERSION, len(sections), CubeTools.BYTE_ORDER_MARK))
+        for (attr, typecode, rows, cols, data), offset in zip(sections, offsets):
+            file_handle.write(CubeTools.TABLE_FILE_SECTION.pack(
+                attr.encode("ascii"), typecode.encode("ascii"), rows, cols, offset,
+                CubeTools.table_fingerprint(attr, typecode, rows), zlib.crc32(data)))
+
+        pos = CubeTools.TABLE_FILE_HEADER.size + CubeTools.TABLE_FILE_SECTION.size * len(sections)
+        for section, offset in zip(sections, offsets):
+            file_handle.write(b"\0" * (offset - pos))
+            file_handle.write(section[4])
+            pos = offset + len(section[4])
 
+    @staticmethod
+    def write_legacy_tables(out):
+        """Writes the original big-endian cache layout."""
         # Write CubieCube tables
         CubeTools.write_char_array(CubieCube.FLIP_SYMMETRY_TO_RAW, out)
         CubeTools.write_char_array(CubieCube.TWIST_SYMMETRY_TO_RAW, out)
@@ -183,40 +560,27 @@ class CubeTools:
         CubeTools.write_char_array(CubieCube.PERMUTATION_INVERSE_EDGE_SYMMETRY, out)
         
         # Write CoordCube tables
-        CubeTools.write_char_2d_array(CoordCube.UD_SLICE_MOVE_TABLE, out)
-        CubeTools.write_char_2d_array(CoordCube.TWIST_MOVE_TABLE, out)
-        CubeTools.write_char_2d_array(CoordCube.FLIP_MOVE_TABLE, out)
-        CubeTools.write_char_2d_array(CoordCube.UD_SLICE_CONJUGATION_TABLE, out)
+        CubeTools.write_char_array(CoordCube.UD_SLICE_MOVE_TABLE, out)
+        CubeTools.write_char_array(CoordCube.TWIST_MOVE_TABLE, out)
+        CubeTools.write_char_array(CoordCube.FLIP_MOVE_TABLE, out)
+        CubeTools.write_char_array(CoordCube.UD_SLICE_CONJUGATION_TABLE, out)
         CubeTools.write_int_array(CoordCube.UD_SLICE_TWIST_PRUNING_TABLE, out)
         CubeTools.write_int_array(CoordCube.UDSliceFlipPrun, out)
-        CubeTools.write_char_2d_array(CoordCube.CORNER_PERMUTATION_MOVE_TABLE, out)
-        CubeTools.write_char_2d_array(CoordCube.EDGE_PERMUTATION_MOVE_TABLE, out)
-        CubeTools.write_char_2d_array(CoordCube.MIDDLE_PERMUTATION_MOVE_TABLE, out)
-        CubeTools.write_char_2d_array(CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE, out)
-        CubeTools.write_char_2d_array(CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE, out)
+        CubeTools.write_char_array(CoordCube.CORNER_PERMUTATION_MOVE_TABLE, out)
+        CubeTools.write_char_array(CoordCube.EDGE_PERMUTATION_MOVE_TABLE, out)
+        CubeTools.write_char_array(CoordCube.MIDDLE_PERMUTATION_MOVE_TABLE, out)
+        CubeTools.write_char_array(CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE, out)
+        CubeTools.write_char_array(CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE, out)
         CubeTools.write_int_array(CoordCube.MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE, out)
         CubeTools.write_int_array(CoordCube.EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE, out)
 
         if CubeUtils.USE_TWIST_FLIP_PRUNING:
             CubeTools.write_char_array(CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED, out)
             CubeTools.write_int_array(CoordCube.TWIST_FLIP_PRUNING_TABLE, out)
-        
-        print("Tables saved to cache.")
 
     @staticmethod
     def from_scramble_array(scramble :list[int]):
-        c1 = CubieCube()
-        c2 = CubieCube()
-
-        for i in range(len(scramble)):
-            # Apply move
-            CubieCube.multiply_corners(c1, CubieCube.MOVE_CUBE_STATES[scramble[i]], c2)
-            CubieCube.multiply_edges(c1, CubieCube.MOVE_CUBE_STATES[scramble[i]], c2)
-
-            # Copy result back to c1
-            c1.copy(c2)
-
-        return CubeUtils.cubie_cube_to_facelet_string(c1)
+        return CubeUtils.cubie_cube_to_facelet_string(PackedCube().apply_moves(scramble).to_cubie_cube())
 
 
     @staticmethod
@@ -282,6 +646,73 @@ class CubeTools:
             
         return " ".join(scramble)
     
+    @staticmethod
+    def random_cubie_cube(rng=random):
+        """Returns a CubieCube drawn uniformly from all solvable cube states."""
+        cperm, eperm = rng.randrange(40320), rng.randrange(479001600)
+        cc = CubieCube(cperm, rng.randrange(2187), eperm, rng.randrange(2048))
+        # Half of the permutation pairs are unreachable; swapping two edges maps them 1:1 onto the reachable half
+        if CubeUtils.get_permutation_parity(cperm, 8) != CubeUtils.get_permutation_parity(eperm, 12):
+            cc.edge_array[0], cc.edge_array[1] = cc.edge_array[1], cc.edge_array[0]
+        return cc
+
+    @staticmethod
+    def random_state(rng=random):
+        """Returns the facelet string of a uniformly random cube state."""
+        return CubeUtils.cubie_cube_to_facelet_string(CubeTools.random_cubie_cube(rng))
+
+    @staticmethod
+    def random_state_scramble(rng=random, max_depth=21, max_probes=100000):
+        """Returns (facelets, scramble) for a uniformly random state; the scramble is its inverse solution."""
+        facelets = CubeTools.random_state(rng)
+        scramble = Search().solution(facelets, max_depth, max_probes, 0, Search.INVERSE_SOLUTION)
+        return facelets, scramble.replace(",", "")
+
+    RANDOM_STATE_CHUNK = 1 << 16
+
+    @staticmethod
+    def random_states(count, seed=None):
+        """
+        Returns `count` facelet strings drawn uniformly from all solvable cube states, generated in NumPy
+        batches. Falls back to random_state() per state without NumPy.
+        """
+        if np is None:
+            rng = random.Random(seed)
+            return [CubeTools.random_state(rng) for _ in range(count)]
+        rng = np.random.default_rng(seed)
+        states = []
+        for start in range(0, count, CubeTools.RANDOM_STATE_CHUNK):
+            states += CubeTools.random_states_batch(rng, min(CubeTools.RANDOM_STATE_CHUNK, count - start))
+        return states
+
+    @staticmethod
+    def random_states_batch(rng, n):
+        from cube_batch import CubeBatch
+        rows = np.arange(n)
+        perms, parity = [], np.zeros(n, dtype=np.uint8)
+        for size in (8, 12):
+            # Vectorised Fisher-Yates; every swap of two distinct slots flips the permutation parity
+            perm = np.tile(np.arange(size, dtype=np.uint8), (n, 1))
+            swaps = rng.integers(0, np.arange(1, size + 1), (n, size))
+            for i in range(size - 1, 0, -1):
+                j = swaps[:, i]
+                piece = perm[rows, j]
+                perm[rows, j] = perm[:, i]
+                perm[:, i] = piece
+                parity ^= j != i
+            perms.append(perm)
+        cperm, eperm = perms
+        # Half of the permutation pairs are unreachable; swapping two edges maps them 1:1 onto the reachable half
+        odd = parity.astype(bool)
+        eperm[odd, 0], eperm[odd, 1] = eperm[odd, 1], eperm[odd, 0]
+
+        twist = rng.integers(0, 3, (n, 8), dtype=np.uint8)
+        twist[:, 7] = (6 * 7 - twist[:, :7].sum(axis=1, dtype=np.uint16)) % 3
+        flip = rng.integers(0, 2, (n, 12), dtype=np.uint8)
+        flip[:, 11] = flip[:, :11].sum(axis=1, dtype=np.uint16) & 1
+
+        return CubeBatch.to_facelets(twist << 3 | cperm, eperm << 1 | flip)
+
     @staticmethod
     def print_facelets_2d(facelets):
         """Prints the cube's facelet string in a 2D net format with colors."""
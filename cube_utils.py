@@ -1,6 +1,12 @@
+from itertools import combinations, permutations
+from operator import itemgetter
+
+
 class CubeUtils:
+    # Third phase-1 heuristic; switch it at startup with Search.set_twist_flip_pruning()
     USE_TWIST_FLIP_PRUNING = False
-    USE_COMBINATION_PARITY_PRUNING = USE_TWIST_FLIP_PRUNING
+    # Sizes the phase-2 tables at import time
+    USE_COMBINATION_PARITY_PRUNING = False
     # Edges
     UR = 0
     UF = 1
@@ -246,6 +252,90 @@ class CubeUtils:
                 arr[i] = CubeUtils.set_piece_value(arr[i], fill, is_edge)
                 fill -= 1
 
+    # Table-driven rank/unrank for the cases used by CubieCube, built by initialize_rank_tables. An 8-piece
+    # permutation index is prefix * 24 + suffix: the rank of its first four pieces among the 1680 arrangements of
+    # 4 of 8 and the rank of the relative order of the last four. Pieces are matched as bytes, mapped from the
+    # cubie bytes with bytes.translate.
+    CORNER_PIECE_BYTES = bytes(range(8)) * 32
+    EDGE_PIECE_BYTES = bytes(b >> 1 for b in range(256))
+
+    def initialize_rank_tables():
+        CubeUtils.PERMUTATION_PREFIXES = [None] * 1680
+        CubeUtils.PERMUTATION_RESTS = [None] * 1680
+        CubeUtils.PERMUTATION_PREFIX_RANK = {}
+        for prefix in permutations(range(8), 4):
+            rest = sorted(set(range(8)) - set(prefix))
+            idx = CubeUtils.get_index_from_permutation(prefix + tuple(rest), 8, False) // 24
+            CubeUtils.PERMUTATION_PREFIXES[idx] = bytes(prefix)
+            CubeUtils.PERMUTATION_RESTS[idx] = rest
+            CubeUtils.PERMUTATION_PREFIX_RANK[bytes(prefix)] = idx
+        # The last four pieces give the index mod 24 by their relative order alone
+        CubeUtils.PERMUTATION_SUFFIX_ORDERS = [None] * 24
+        for order in permutations(range(4)):
+            CubeUtils.PERMUTATION_SUFFIX_ORDERS[CubeUtils.get_index_from_permutation(order, 4, False)] = itemgetter(*order)
+        CubeUtils.PERMUTATION_SUFFIX_RANK = {}
+        CubeUtils.MIDDLE_PERMUTATION_RANK = {}
+        for values in combinations(range(12), 4):
+            for idx, order in enumerate(CubeUtils.PERMUTATION_SUFFIX_ORDERS):
+                suffix = bytes(order(values))
+                if values[3] < 8:
+                    CubeUtils.PERMUTATION_SUFFIX_RANK[suffix] = idx
+                CubeUtils.MIDDLE_PERMUTATION_RANK[suffix] = idx
+        CubeUtils.MIDDLE_PERMUTATIONS = []
+        for idx in range(24):
+            pieces = [0] * 12
+            CubeUtils.set_permutation_from_index(pieces, idx, 12, False)
+            CubeUtils.MIDDLE_PERMUTATIONS.append(bytes(pieces))
+
+        # Combinations: a byte per slot, 1 where the piece is in the group (mask .. mask + 3), ranks the slots
+        CubeUtils.CORNER_GROUP_BYTES = [bytes(int((b & 7 & 0xC) == mask) for b in range(256)) for mask in (0, 4)]
+        CubeUtils.EDGE_GROUP_BYTES = [bytes(int((b >> 1 & 0xC) == mask) for b in range(256)) for mask in (0, 4, 8)]
+        CubeUtils.COMBINATION_RANK = {}
+        CubeUtils.COMBINATION_PIECES = {}
+        for n in (8, 12):
+            for mask in range(0, n - 3, 4):
+                CubeUtils.COMBINATION_PIECES[n, mask] = table = []
+                for idx in range(CubeUtils.COMBINATIONS_TABLE[n][4]):
+                    pieces = [0] * n
+                    CubeUtils.set_combination_from_index(pieces, idx, mask, False)
+                    table.append(bytes(pieces))
+                    CubeUtils.COMBINATION_RANK[bytes(int((p & 0xC) == mask) for p in pieces)] = idx
+
+    def rank_permutation(arr, is_edge):
+        """get_index_from_permutation(arr, 8, is_edge) for a permutation of pieces 0..7 in arr[:8]."""
+        pieces = bytes(arr[:8]).translate(CubeUtils.EDGE_PIECE_BYTES if is_edge else CubeUtils.CORNER_PIECE_BYTES)
+        return CubeUtils.PERMUTATION_PREFIX_RANK[pieces[:4]] * 24 + CubeUtils.PERMUTATION_SUFFIX_RANK[pieces[4:]]
+
+    def unrank_permutation(arr, idx, is_edge):
+        """set_permutation_from_index(arr, idx, 8, is_edge)."""
+        prefix = idx // 24
+        pieces = CubeUtils.PERMUTATION_PREFIXES[prefix] + bytes(
+            CubeUtils.PERMUTATION_SUFFIX_ORDERS[idx % 24](CubeUtils.PERMUTATION_RESTS[prefix]))
+        CubeUtils.set_piece_values(arr, pieces, is_edge)
+
+    def rank_middle_permutation(arr):
+        """get_index_from_permutation(arr, 12, True) % 24: the order of the edges in the last four slots."""
+        return CubeUtils.MIDDLE_PERMUTATION_RANK[bytes(arr[8:]).translate(CubeUtils.EDGE_PIECE_BYTES)]
+
+    def unrank_middle_permutation(arr, idx):
+        """set_permutation_from_index(arr, idx, 12, True) for idx < 24."""
+        CubeUtils.set_piece_values(arr, CubeUtils.MIDDLE_PERMUTATIONS[idx], True)
+
+    def rank_combination(arr, mask, is_edge):
+        """get_combination_from_index(arr, mask, is_edge) for 8 or 12 slots."""
+        group = CubeUtils.EDGE_GROUP_BYTES if is_edge else CubeUtils.CORNER_GROUP_BYTES
+        return CubeUtils.COMBINATION_RANK[bytes(arr).translate(group[mask >> 2])]
+
+    def unrank_combination(arr, idx_c, mask, is_edge):
+        """set_combination_from_index(arr, idx_c, mask, is_edge) for 8 or 12 slots."""
+        CubeUtils.set_piece_values(arr, CubeUtils.COMBINATION_PIECES[len(arr), mask][idx_c], is_edge)
+
+    def set_piece_values(arr, pieces, is_edge):
+        if is_edge:
+            arr[:len(pieces)] = [p << 1 | v & 1 for p, v in zip(pieces, arr)]
+        else:
+            arr[:len(pieces)] = [p | v & 0xF8 for p, v in zip(pieces, arr)]
+
     # Initialize STANDARD_TO_UP_DOWN_MOVE_MAP using UP_DOWN_TO_STANDARD_MOVE_MAP
     STANDARD_TO_UP_DOWN_MOVE_MAP = [0] * 18
     for i in range(18):
@@ -267,3 +357,6 @@ class CubeUtils:
         COMBINATIONS_TABLE[i][0] = COMBINATIONS_TABLE[i][i] = 1
         for j in range(1, i):
             COMBINATIONS_TABLE[i][j] = COMBINATIONS_TABLE[i - 1][j - 1] + COMBINATIONS_TABLE[i - 1][j]
+
+
+CubeUtils.initialize_rank_tables()
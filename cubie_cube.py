@@ -1,6 +1,7 @@
 import bisect
 from cube_utils import CubeUtils
 from coordinate_cube import CoordCube
+from packed_cube import PackedCube
 
 
 class CubieCube:
@@ -30,9 +31,8 @@ class CubieCube:
     TWIST_RAW_TO_SYMMETRY = bytearray(CoordCube.N_TWIST + CoordCube.N_TWIST_HALF)
     EDGE_PERMUTATION_RAW_TO_SYMMETRY = bytearray(CoordCube.N_PERM_HALF)
 
+    # Built on demand when twist-flip pruning is enabled
     FLIP_SYMMETRY_TO_RAW_FLIPPED = None
-    if CubeUtils.USE_TWIST_FLIP_PRUNING:
-        FLIP_SYMMETRY_TO_RAW_FLIPPED = [0] * (CoordCube.N_FLIP_SYM * 8)
 
     SYMMETRY_STATE_TWIST = None
     SYMMETRY_STATE_FLIP = None
@@ -49,12 +49,11 @@ class CubieCube:
         [8, 7, 6, 2, 1, 0, 5, 4, 3, 17, 16, 15, 11, 10, 9, 14, 13, 12],
         [5, 4, 3, 8, 7, 6, 2, 1, 0, 14, 13, 12, 17, 16, 15, 11, 10, 9],
     ]
-    temps = None
 
     def __init__(self, cperm=None, twist=None, eperm=None, flip=None):
         self.corner_array = list(range(8))  # 8 corner positions
         self.edge_array = [i * 2 for i in range(12)]  # 12 edge positions
-        self.temps = None
+        self.temps = None  # Scratch cube, created on first use; per instance so concurrent solves never share one
 
         if cperm is not None and twist is not None and eperm is not None and flip is not None:
             self.set_corner_permutation_from_index(cperm)
@@ -77,6 +76,8 @@ class CubieCube:
                 CubieCube.multiply_edges(CubieCube.MOVE_CUBE_STATES[a + p], CubieCube.MOVE_CUBE_STATES[a], CubieCube.MOVE_CUBE_STATES[a + p + 1])
                 CubieCube.multiply_corners(CubieCube.MOVE_CUBE_STATES[a + p], CubieCube.MOVE_CUBE_STATES[a], CubieCube.MOVE_CUBE_STATES[a + p + 1])
 
+        PackedCube.initialize_move_tables(CubieCube.MOVE_CUBE_STATES)
+
     @staticmethod
     def initialize_symmetries():
         # from cube_utils import CubeUtils
@@ -169,9 +170,6 @@ class CubieCube:
                 elif coord == 1: idx = d.get_twist_index()
                 elif coord == 2: idx = d.get_edge_permutation_index()
 
-                if coord == 0 and CubeUtils.USE_TWIST_FLIP_PRUNING:
-                    CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED[(count << 3) | (s >> 1)] = idx
-                
                 if idx == i:
                     SymState[count] |= 1 << (s // sym_inc)
                 
@@ -192,6 +190,64 @@ class CubieCube:
         CubieCube.SYMMETRY_STATE_FLIP = [0] * CoordCube.N_FLIP_SYM
         CubieCube.initialize_symmetry_to_raw_mapping(CoordCube.N_FLIP, CubieCube.FLIP_SYMMETRY_TO_RAW, CubieCube.FLIP_RAW_TO_SYMMETRY, CubieCube.SYMMETRY_STATE_FLIP, 0)
 
+    @staticmethod
+    def initialize_flip_symmetry_to_raw_flipped():
+        """Raw flip of every flip symmetry class representative under each of the 8 phase-1 symmetries."""
+        from coordinate_cube import CoordCube
+        c = CubieCube()
+        d = CubieCube()
+        CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED = [0] * (CoordCube.N_FLIP_SYM * 8)
+        for i in range(CoordCube.N_FLIP_SYM):
+            c.set_flip_from_index(CubieCube.FLIP_SYMMETRY_TO_RAW[i])
+            for s in range(0, 16, 2):
+                CubieCube.conjugate_edges(c, s, d)
+                CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED[(i << 3) | (s >> 1)] = d.get_flip_index()
+
+    @staticmethod
+    def initialize_flip_symmetry_states():
+        """Rebuilds SYMMETRY_STATE_FLIP from FLIP_SYMMETRY_TO_RAW, e.g. after loading tables from the cache."""
+        from coordinate_cube import CoordCube
+        c = CubieCube()
+        d = CubieCube()
+        CubieCube.SYMMETRY_STATE_FLIP = [0] * CoordCube.N_FLIP_SYM
+        for i in range(CoordCube.N_FLIP_SYM):
+            raw = CubieCube.FLIP_SYMMETRY_TO_RAW[i]
+            c.set_flip_from_index(raw)
+            for s in range(0, 16, 2):
+                CubieCube.conjugate_edges(c, s, d)
+                if d.get_flip_index() == raw:
+                    CubieCube.SYMMETRY_STATE_FLIP[i] |= 1 << (s >> 1)
+
+    @staticmethod
+    def initialize_twist_symmetry_states():
+        """Rebuilds SYMMETRY_STATE_TWIST from TWIST_SYMMETRY_TO_RAW, e.g. after loading tables from the cache."""
+        from coordinate_cube import CoordCube
+        c = CubieCube()
+        d = CubieCube()
+        CubieCube.SYMMETRY_STATE_TWIST = [0] * CoordCube.N_TWIST_SYM
+        for i in range(CoordCube.N_TWIST_SYM):
+            raw = CubieCube.TWIST_SYMMETRY_TO_RAW[i]
+            c.set_twist_from_index(raw)
+            for s in range(0, 16, 2):
+                CubieCube.conjugate_corners(c, s, d)
+                if d.get_twist_index() == raw:
+                    CubieCube.SYMMETRY_STATE_TWIST[i] |= 1 << (s >> 1)
+
+    @staticmethod
+    def initialize_permutation_symmetry_states():
+        """Rebuilds SYMMETRY_STATE_PERMUTATION from EDGE_PERMUTATION_SYMMETRY_TO_RAW, e.g. after loading tables from the cache."""
+        from coordinate_cube import CoordCube
+        c = CubieCube()
+        d = CubieCube()
+        CubieCube.SYMMETRY_STATE_PERMUTATION = [0] * CoordCube.N_PERM_SYM
+        for i in range(CoordCube.N_PERM_SYM):
+            raw = CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW[i]
+            c.set_edge_permutation_from_index(raw)
+            for s in range(16):
+                CubieCube.conjugate_edges(c, s, d)
+                if d.get_edge_permutation_index() == raw:
+                    CubieCube.SYMMETRY_STATE_PERMUTATION[i] |= 1 << s
+
     @staticmethod
     def initialize_twist_symmetry_to_raw():
         from coordinate_cube import CoordCube
@@ -209,7 +265,7 @@ class CubieCube:
         for i in range(CoordCube.N_PERM_SYM):
             cc.set_edge_permutation_from_index(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW[i])
             
-            comb_p = CubeUtils.get_combination_from_index(cc.edge_array, 0, True)
+            comb_p = CubeUtils.rank_combination(cc.edge_array, 0, True)
             if CubeUtils.USE_COMBINATION_PARITY_PRUNING:
                 comb_p += CubeUtils.get_permutation_parity(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW[i], 8) * 70
             CubieCube.PERMUTATION_TO_COMBINATION_PLUS_PARITY[i] = comb_p
@@ -223,10 +279,10 @@ class CubieCube:
 
     # ----- Corner permutation -----
     def get_corner_permutation_index(self):
-        return CubeUtils.get_index_from_permutation(self.corner_array, 8, False)
+        return CubeUtils.rank_permutation(self.corner_array, False)
 
     def set_corner_permutation_from_index(self, idx):
-        CubeUtils.set_permutation_from_index(self.corner_array, idx, 8, False)
+        CubeUtils.unrank_permutation(self.corner_array, idx, False)
 
     # ----- Corner orientation -----
     def get_twist_index(self):
@@ -261,42 +317,42 @@ class CubieCube:
         self.edge_array[11] = (self.edge_array[11] & 0xFE) | parity
 
     def get_up_down_slice_index(self):
-        return 494 - CubeUtils.get_combination_from_index(self.edge_array, 8, True)
+        return 494 - CubeUtils.rank_combination(self.edge_array, 8, True)
 
     def set_up_down_slice_from_index(self, idx):
-        CubeUtils.set_combination_from_index(self.edge_array, 494 - idx, 8, True)
+        CubeUtils.unrank_combination(self.edge_array, 494 - idx, 8, True)
 
     # ----- Edge permutation -----
     def get_edge_permutation_index(self):
-        return CubeUtils.get_index_from_permutation(self.edge_array, 8, True)
+        return CubeUtils.rank_permutation(self.edge_array, True)
 
     def set_edge_permutation_from_index(self, idx):
-        CubeUtils.set_permutation_from_index(self.edge_array, idx, 8, True)
+        CubeUtils.unrank_permutation(self.edge_array, idx, True)
 
     # ----- MPerm (middle slice edge permutation mod 24) -----
     def get_middle_permutation_index(self):
-        return CubeUtils.get_index_from_permutation(self.edge_array, 12, True) % 24
+        return CubeUtils.rank_middle_permutation(self.edge_array)
 
     def set_middle_permutation_from_index(self, idx):
-        CubeUtils.set_permutation_from_index(self.edge_array, idx, 12, True)
+        CubeUtils.unrank_middle_permutation(self.edge_array, idx)
 
     # ----- CComb (combination of corners for certain pruning) -----
     def get_corner_combination_index(self):
-        return CubeUtils.get_combination_from_index(self.corner_array, 0, False)
+        return CubeUtils.rank_combination(self.corner_array, 0, False)
 
     def set_corner_combination_from_index(self, idx):
-        CubeUtils.set_combination_from_index(self.corner_array, idx, 0, False)
+        CubeUtils.unrank_combination(self.corner_array, idx, 0, False)
 
     def get_corner_permutation_symmetry(self):
         from coordinate_cube import CoordCube # Local import to avoid circular dependency
 
         k = CubieCube.edge_symmetry_to_corner_symmetry(CoordCube.get_pruning_table_value_table_value_byte(CubieCube.EDGE_PERMUTATION_RAW_TO_SYMMETRY, self.get_corner_permutation_index())) & 0xF
 
-        if CubieCube.temps is None:
-            CubieCube.temps = CubieCube()
+        if self.temps is None:
+            self.temps = CubieCube()
 
-        CubieCube.conjugate_corners(self, CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][k], CubieCube.temps)
-        idx = CubieCube.binary_search(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW, CubieCube.temps.get_corner_permutation_index())
+        CubieCube.conjugate_corners(self, CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][k], self.temps)
+        idx = CubieCube.binary_search(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW, self.temps.get_corner_permutation_index())
         assert idx >= 0, "Corner permutation coordinate not found in symmetry table"
 
         return (idx << 4) | k
@@ -308,30 +364,30 @@ class CubieCube:
         raw_coord = self.get_edge_permutation_index()
         k = CoordCube.get_pruning_table_value_table_value_byte(CubieCube.EDGE_PERMUTATION_RAW_TO_SYMMETRY, raw_coord)
 
-        if CubieCube.temps is None:
-            CubieCube.temps = CubieCube()
+        if self.temps is None:
+            self.temps = CubieCube()
 
-        CubieCube.conjugate_edges(self, CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][k], CubieCube.temps)
-        idx = CubieCube.binary_search(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW, CubieCube.temps.get_edge_permutation_index())
+        CubieCube.conjugate_edges(self, CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][k], self.temps)
+        idx = CubieCube.binary_search(CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW, self.temps.get_edge_permutation_index())
         assert idx >= 0, "Edge permutation coordinate not found in symmetry table"
 
         return (idx << 4) | k
 
     def invert_cubie_cube(self):
-        if CubieCube.temps is None:
-            CubieCube.temps = CubieCube()
+        if self.temps is None:
+            self.temps = CubieCube()
 
         for edge in range(12):
             idx = self.edge_array[edge] >> 1
-            CubieCube.temps.edge_array[idx] = (edge << 1) | (self.edge_array[edge] & 1)
+            self.temps.edge_array[idx] = (edge << 1) | (self.edge_array[edge] & 1)
 
         for corner in range(8):
             idx = self.corner_array[corner] & 0x7
             ori = self.corner_array[corner] >> 3
             ori = (3 - ori) % 3 if ori < 3 else ori
-            CubieCube.temps.corner_array[idx] = (corner | (ori << 3))
+            self.temps.corner_array[idx] = (corner | (ori << 3))
 
-        self.copy(CubieCube.temps)
+        self.copy(self.temps)
 
 
     def binary_search(a, x):
@@ -414,13 +470,13 @@ class CubieCube:
             b.edge_array[ed] = sinv.edge_array[a.edge_array[s.edge_array[ed] >> 1] >> 1] ^ (a.edge_array[s.edge_array[ed] >> 1] & 1) ^ (s.edge_array[ed] & 1)
 
     def perform_urf_conjugation(self):
-        if CubieCube.temps is None:
-            CubieCube.temps = CubieCube()
+        if self.temps is None:
+            self.temps = CubieCube()
 
-        CubieCube.multiply_corners(CubieCube.URF_CONJUGATE_CUBE_INVERSE, self, CubieCube.temps)
-        CubieCube.multiply_corners(CubieCube.temps, CubieCube.URF_CONJUGATE_CUBE, self)
-        CubieCube.multiply_edges(CubieCube.URF_CONJUGATE_CUBE_INVERSE, self, CubieCube.temps)
-        CubieCube.multiply_edges(CubieCube.temps, CubieCube.URF_CONJUGATE_CUBE, self)
+        CubieCube.multiply_corners(CubieCube.URF_CONJUGATE_CUBE_INVERSE, self, self.temps)
+        CubieCube.multiply_corners(self.temps, CubieCube.URF_CONJUGATE_CUBE, self)
+        CubieCube.multiply_edges(CubieCube.URF_CONJUGATE_CUBE_INVERSE, self, self.temps)
+        CubieCube.multiply_edges(self.temps, CubieCube.URF_CONJUGATE_CUBE, self)
 
 
     def verify_facelet_string(self):
@@ -9,6 +9,10 @@ def main():
     except NameError:
         script_dir = os.getcwd()
     CACHE_FILE = os.path.join(script_dir, "cache.bin")
+    if os.environ.get("TWIST_FLIP_PRUNING") == "1":
+        Search.set_twist_flip_pruning(True)
+    # Optional per-solve time limit in seconds; the best solution found by then is printed
+    time_limit = float(os.environ["SOLVE_TIME_LIMIT"]) if os.environ.get("SOLVE_TIME_LIMIT") else None
 
     if os.path.exists(CACHE_FILE):
         with open(CACHE_FILE, 'rb') as f:
@@ -16,7 +20,7 @@ def main():
     else:
         with open(CACHE_FILE, 'wb') as f:
             start_time = time.time()
-            CubeTools.save_to(f)
+            CubeTools.save_to(f, jobs=os.cpu_count() or 1)
             end_time = time.time()
             print(f"\nGenerated tables in {end_time - start_time :.4f} seconds\n")
 
@@ -81,11 +85,13 @@ def main():
             search = Search()
             
             start_time = time.time()
-            soln = search.solution(facelets, 21, 100000, 0, 0)
+            soln = search.solution(facelets, 21, 100000, 0, 0, time_limit)
             end_time = time.time()
             
             print("\nSolution:")
             print(soln)
+            if search.cut_short:
+                print(f"(Stopped at the {time_limit}s time limit; best solution found so far)")
             print(f"\nTime taken: {end_time - start_time:.4f} seconds")
 
 if __name__ == "__main__":
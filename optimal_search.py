@@ -0,0 +1,280 @@
+import mmap
+import os
+from array import array
+from coordinate_cube import CoordCube, PruningTableSearch, install_pruning_workers, np
+from cubie_cube import CubieCube
+from packed_cube import PackedCube
+
+
+class OptimalTableUnavailable(RuntimeError):
+    """The corner pruning table file of the optimal mode is missing, truncated or unreadable."""
+
+
+class OptimalSearch:
+    """IDA* search for provably shortest solutions, used by Search in OPTIMAL_SOLUTION mode.
+
+    The heuristic is, over the cube and its two URF conjugates, the largest of the corners-only distance
+    and the phase-1 slice-twist / slice-flip (and twist-flip) pruning values; each of these is a lower
+    bound on the distance to solved. The corners-only distance is read from CORNER_PRUNING_TABLE, which
+    covers corner permutation symmetry class x raw twist (2768 x 2187 entries, two per byte) and is
+    memory-mapped from TABLE_FILE. The file is built offline, on several cores, by generate_table
+    (python optimal_search.py or python build_bundle.py --optimal); it is never generated on demand.
+    """
+
+####################################################### Constants and Class variables #######################################################
+
+    N_MOVES = 18
+    N_CORNER_PRUNING = CoordCube.N_PERM_SYM * CoordCube.N_TWIST
+    TABLE_FILE = os.environ.get("OPTIMAL_TABLE_FILE", "optimal.bin")
+    # Nodes between deadline / cancellation checks
+    STOP_CHECK_INTERVAL = 128
+
+    # Raw corner permutation and raw twist move tables, raw corner permutation -> class << 4 | sym,
+    # and raw twist conjugation (twist << 4 | sym), laid out like the CoordCube tables
+    CORNER_PERMUTATION_MOVE_TABLE = None
+    CORNER_PERMUTATION_RAW_TO_SYMMETRY = None
+    TWIST_MOVE_TABLE = None
+    TWIST_CONJUGATION_TABLE = None
+    CORNER_PRUNING_TABLE = None
+
+    # Move on the cube -> move on its k-th URF conjugate
+    AXIS_MOVE_MAP = [CubieCube.URF_MOVE_MAP[(3 - k) % 3] for k in range(3)]
+
+    inited = False
+    # Why the table could not be mapped; set by the first failed init, which later calls re-raise
+    init_error = None
+
+####################################################### Initialization #######################################################
+
+    @classmethod
+    def init(cls, path=None):
+        """Maps the corner pruning table from `path` (default TABLE_FILE). If the file is missing, truncated or
+        unreadable, raises OptimalTableUnavailable, now and on every later call, without retrying.
+        The two-phase tables (Search.init or CubeTools.init_from) must already be loaded."""
+        if cls.inited:
+            return
+        with CoordCube.init_lock:
+            if cls.inited:
+                return
+            if cls.init_error is not None:
+                raise OptimalTableUnavailable(cls.init_error)
+            path = path or cls.TABLE_FILE
+            try:
+                if os.path.getsize(path) != (cls.N_CORNER_PRUNING + 1) // 2:
+                    raise OSError(f"'{path}' is truncated")
+                with open(path, 'rb') as f:
+                    table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except OSError as e:
+                cls.init_error = (f"Optimal pruning table unavailable ({e}). Build it with "
+                                  f"'python optimal_search.py' or 'python build_bundle.py --optimal'.")
+                raise OptimalTableUnavailable(cls.init_error) from e
+            cls.initialize_move_tables()
+            cls.CORNER_PRUNING_TABLE = table
+            cls.inited = True
+
+    @classmethod
+    def initialize_move_tables(cls):
+        c = CubieCube()
+        d = CubieCube()
+
+        permutations = []
+        for i in range(CoordCube.N_PERM):
+            c.set_corner_permutation_from_index(i)
+            permutations.append(bytes(c.corner_array))
+        index = {p: i for i, p in enumerate(permutations)}
+        cperm_move = array('H', [0]) * (CoordCube.N_PERM * cls.N_MOVES)
+        cperm_sym = array('H', [0]) * CoordCube.N_PERM
+        for i, p in enumerate(permutations):
+            for m in range(cls.N_MOVES):
+                cperm_move[i * cls.N_MOVES + m] = index[bytes(PackedCube.CORNER_GATHER[m](p))]
+            c.corner_array = list(p)
+            cperm_sym[i] = c.get_corner_permutation_symmetry()
+
+        twist_move = array('H', [0]) * (CoordCube.N_TWIST * cls.N_MOVES)
+        twist_conj = array('H', [0]) * (CoordCube.N_TWIST * 16)
+        c = CubieCube()
+        for i in range(CoordCube.N_TWIST):
+            c.set_twist_from_index(i)
+            for m in range(cls.N_MOVES):
+                PackedCube.multiply_corners_by_move(c, m, d)
+                twist_move[i * cls.N_MOVES + m] = d.get_twist_index()
+            for s in range(16):
+                CubieCube.conjugate_corners(c, CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][s], d)
+                twist_conj[i << 4 | s] = d.get_twist_index()
+
+        cls.CORNER_PERMUTATION_MOVE_TABLE = cperm_move
+        cls.CORNER_PERMUTATION_RAW_TO_SYMMETRY = cperm_sym
+        cls.TWIST_MOVE_TABLE = twist_move
+        cls.TWIST_CONJUGATION_TABLE = twist_conj
+
+    @classmethod
+    def corner_pruning_search(cls):
+        """Returns the (raw twist, corner permutation class) breadth-first search over all 18 moves."""
+        if CubieCube.SYMMETRY_STATE_PERMUTATION is None:
+            CubieCube.initialize_permutation_symmetry_states()
+        sym_move = array('H', [0]) * (CoordCube.N_PERM_SYM * cls.N_MOVES)
+        for i in range(CoordCube.N_PERM_SYM):
+            raw = CubieCube.EDGE_PERMUTATION_SYMMETRY_TO_RAW[i]
+            for m in range(cls.N_MOVES):
+                sym_move[i * cls.N_MOVES + m] = cls.CORNER_PERMUTATION_RAW_TO_SYMMETRY[
+                    cls.CORNER_PERMUTATION_MOVE_TABLE[raw * cls.N_MOVES + m]]
+        return (cls.TWIST_MOVE_TABLE, cls.TWIST_CONJUGATION_TABLE, sym_move, CubieCube.SYMMETRY_STATE_PERMUTATION,
+                4, CubieCube.SYMMETRY_EDGE_TO_CORNER_MAGIC_NUMBER, cls.N_MOVES)
+
+    @classmethod
+    def generate_table(cls, path, jobs=1):
+        """Builds the corner pruning table, splitting every BFS level across `jobs` processes, and writes it to `path`."""
+        spec = cls.corner_pruning_search()
+        depths = None
+        if np is None:
+            print("NumPy is not available; building the optimal pruning table in pure Python (slow).")
+            depths = CoordCube.search_pruning_depths(*spec)
+        elif jobs > 1:
+            try:
+                depths = cls.search_corner_pruning_parallel(PruningTableSearch(*spec), jobs)
+            except OSError as e:
+                print(f"Parallel table generation unavailable ({e}); continuing on one core.")
+        if depths is None:
+            depths = PruningTableSearch(*spec).run()
+
+        if np is not None:
+            depths = np.frombuffer(depths, dtype=np.uint8)
+            packed = (depths[0::2] | (depths[1::2] << 4)).tobytes()
+        else:
+            packed = bytes(a | b << 4 for a, b in zip(depths[0::2], depths[1::2]))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(packed)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def search_corner_pruning_parallel(cls, search, jobs):
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise OSError("fork start method not available")
+        buffer = multiprocessing.RawArray('B', search.n_size)
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=install_pruning_workers,
+                                 initargs=({"CORNER_PRUNING_TABLE": search}, {"CORNER_PRUNING_TABLE": buffer})) as pool:
+            depths = np.frombuffer(buffer, dtype=np.uint8)
+            search.run(depths, pool, "CORNER_PRUNING_TABLE", jobs)
+        return depths
+
+    @classmethod
+    def get_corner_pruning_value(cls, cperm, twist):
+        sym = cls.CORNER_PERMUTATION_RAW_TO_SYMMETRY[cperm]
+        idx = (sym >> 4) * CoordCube.N_TWIST + cls.TWIST_CONJUGATION_TABLE[twist << 4 | (sym & 0xf)]
+        return (cls.CORNER_PRUNING_TABLE[idx >> 1] >> ((idx & 1) << 2)) & 0xF
+
+####################################################### Search #######################################################
+
+    def __init__(self):
+        # Per depth: raw corner permutation and twist, and phase-1 coordinates, of the cube and its URF conjugates
+        self.corner_permutations = [[0] * 3 for _ in range(31)]
+        self.twists = [[0] * 3 for _ in range(31)]
+        self.phase1_nodes = [[CoordCube() for _ in range(3)] for _ in range(31)]
+        self.move = [0] * 31
+        self.start = None
+        self.should_stop = None
+        self.countdown = 0
+        self.nodes = 0
+
+    def solve(self, cc, max_depth, should_stop=None):
+        """Returns a shortest move sequence solving `cc` of at most `max_depth` moves, or None.
+
+        `should_stop()` is polled every STOP_CHECK_INTERVAL nodes; once it returns True the search gives up.
+        """
+        c = CubieCube()
+        c.copy(cc)
+        for k in range(3):
+            self.corner_permutations[0][k] = c.get_corner_permutation_index()
+            self.twists[0][k] = c.get_twist_index()
+            self.phase1_nodes[0][k].set_coordinates_with_pruning(c, 20)
+            c.perform_urf_conjugation()
+        self.start = PackedCube.from_cubie_cube(cc)
+        self.should_stop = should_stop
+        self.countdown = self.STOP_CHECK_INTERVAL
+        self.nodes = 0
+
+        bound = self.heuristic(0)
+        for maxl in range(bound, max_depth + 1):
+            ret = self.search(0, maxl, -1)
+            if ret == 0:
+                return self.move[:maxl]
+            if ret < 0:
+                break
+        return None
+
+    def heuristic(self, depth):
+        h = 0
+        for k in range(3):
+            h = max(h, self.get_corner_pruning_value(self.corner_permutations[depth][k], self.twists[depth][k]),
+                    self.phase1_nodes[depth][k].prun)
+        return h
+
+    def search(self, depth, maxl, last_face):
+        """Depth-first search for `maxl` more moves from the node at `depth`; returns 0 when solved,
+        1 when there is no solution within the bound and -1 once stopped."""
+        self.nodes += 1
+        if maxl == 0:
+            moves = self.move[:depth]
+            return 0 if PackedCube(self.start.corners, self.start.edges).apply_moves(moves).is_solved() else 1
+        if self.should_stop is not None:
+            self.countdown -= 1
+            if self.countdown == 0:
+                self.countdown = self.STOP_CHECK_INTERVAL
+                if self.should_stop():
+                    return -1
+
+        cperm_move = self.CORNER_PERMUTATION_MOVE_TABLE
+        twist_move = self.TWIST_MOVE_TABLE
+        cperm_sym = self.CORNER_PERMUTATION_RAW_TO_SYMMETRY
+        twist_conj = self.TWIST_CONJUGATION_TABLE
+        prun_table = self.CORNER_PRUNING_TABLE
+        N_TWIST = CoordCube.N_TWIST
+        cperms = self.corner_permutations[depth]
+        twists = self.twists[depth]
+        nodes = self.phase1_nodes[depth]
+        next_cperms = self.corner_permutations[depth + 1]
+        next_twists = self.twists[depth + 1]
+        next_nodes = self.phase1_nodes[depth + 1]
+
+        for m in range(self.N_MOVES):
+            face = m // 3
+            # Same face twice, or the two faces of an axis in the other order, repeat shorter sequences
+            if face == last_face or face + 3 == last_face:
+                continue
+            for k in range(3):
+                mk = self.AXIS_MOVE_MAP[k][m]
+                cperm = cperm_move[cperms[k] * 18 + mk]
+                twist = twist_move[twists[k] * 18 + mk]
+                sym = cperm_sym[cperm]
+                idx = (sym >> 4) * N_TWIST + twist_conj[twist << 4 | (sym & 0xf)]
+                if (prun_table[idx >> 1] >> ((idx & 1) << 2)) & 0xF >= maxl:
+                    break
+                if next_nodes[k].move_and_get_pruning_table_value_value(nodes[k], mk, True) >= maxl:
+                    break
+                next_cperms[k] = cperm
+                next_twists[k] = twist
+            else:
+                self.move[depth] = m
+                ret = self.search(depth + 1, maxl - 1, face)
+                if ret <= 0:
+                    return ret
+        return 1
+
+
+if __name__ == "__main__":
+    # Offline generator: python optimal_search.py [jobs] [path]
+    import sys
+    import time
+    from cube_io_and_display import CubeTools
+    CubeTools.init_from_cache()
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    path = sys.argv[2] if len(sys.argv) > 2 else OptimalSearch.TABLE_FILE
+    start_time = time.time()
+    OptimalSearch.initialize_move_tables()
+    OptimalSearch.generate_table(path, jobs)
+    print(f"Wrote '{path}' in {time.time() - start_time:.2f}s")
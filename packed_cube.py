@@ -0,0 +1,162 @@
+from operator import itemgetter
+
+
+class PackedCube:
+    """Cube state packed into two integers: byte i (little-endian) of `corners` holds corner_array[i]
+    (ori << 3 | idx) and byte i of `edges` holds edge_array[i] (idx << 1 | ori).
+
+    Moves are applied with per-move lookup tables over the packed bytes instead of per-cubie loops.
+    The static multiply_*_by_move / move_multiply helpers are drop-ins for CubieCube.multiply_corners /
+    multiply_edges when one operand is a move, writing the result into a CubieCube.
+    """
+
+####################################################### Constants and Class variables #######################################################
+
+    SOLVED_CORNERS = int.from_bytes(bytes(range(8)), 'little')
+    SOLVED_EDGES = int.from_bytes(bytes(range(0, 24, 2)), 'little')
+
+    # cube * move: gather the cubies the move brings into each position, then fix orientations.
+    # Corners add the move's twist in bits 6-7 of each byte and CORNER_ORIENTATION_TABLE folds it in.
+    CORNER_GATHER = [None] * 18
+    CORNER_TWIST = [0] * 18
+    EDGE_GATHER = [None] * 18
+    EDGE_FLIP = [0] * 18
+    CORNER_ORIENTATION_TABLE = b''
+
+    # move * cube: a pure byte-for-byte relabelling, one translate table per move
+    CORNER_PRE_MOVE_TABLE = [b''] * 18
+    EDGE_PRE_MOVE_TABLE = [b''] * 18
+
+    CORNER_INDEX_TABLE = b''
+    CORNER_INVERSE_TWIST_TABLE = b''
+    EDGE_FLIP_TABLE = bytes(i & 1 for i in range(256))
+
+    inited = False
+
+####################################################### Initialization #######################################################
+
+    @staticmethod
+    def initialize_move_tables(move_cubes):
+        """Builds the lookup tables from the 18 move cubes (CubieCube.MOVE_CUBE_STATES)."""
+        orientation = bytearray(256)
+        for oriB in range(3):
+            for oriA in range(6):
+                ori = oriA + (oriB if oriA < 3 else 6 - oriB)
+                ori = (ori % 3) + (0 if oriA < 3 else 3)
+                for idx in range(8):
+                    orientation[oriB << 6 | oriA << 3 | idx] = ori << 3 | idx
+        PackedCube.CORNER_ORIENTATION_TABLE = bytes(orientation)
+        PackedCube.CORNER_INDEX_TABLE = bytes(i & 7 for i in range(256))
+        PackedCube.CORNER_INVERSE_TWIST_TABLE = bytes(
+            ((3 - (i >> 3)) % 3 if (i >> 3) < 3 else (i >> 3) & 7) << 3 for i in range(256))
+
+        for m, mv in enumerate(move_cubes):
+            PackedCube.CORNER_GATHER[m] = itemgetter(*[mv.corner_array[c] & 7 for c in range(8)])
+            PackedCube.CORNER_TWIST[m] = sum((mv.corner_array[c] >> 3) << (8 * c + 6) for c in range(8))
+            PackedCube.EDGE_GATHER[m] = itemgetter(*[mv.edge_array[e] >> 1 for e in range(12)])
+            PackedCube.EDGE_FLIP[m] = sum((mv.edge_array[e] & 1) << (8 * e) for e in range(12))
+
+            corners = bytearray(256)
+            for oriB in range(6):
+                for idx in range(8):
+                    oriA = mv.corner_array[idx] >> 3
+                    ori = (oriA + oriB) % 3 + (0 if oriB < 3 else 3)
+                    corners[oriB << 3 | idx] = (mv.corner_array[idx] & 7) | (ori << 3)
+            edges = bytearray(256)
+            for v in range(24):
+                edges[v] = mv.edge_array[v >> 1] ^ (v & 1)
+            PackedCube.CORNER_PRE_MOVE_TABLE[m] = bytes(corners)
+            PackedCube.EDGE_PRE_MOVE_TABLE[m] = bytes(edges)
+        PackedCube.inited = True
+
+####################################################### Packed cube #######################################################
+
+    __slots__ = ('corners', 'edges')
+
+    def __init__(self, corners=SOLVED_CORNERS, edges=SOLVED_EDGES):
+        self.corners = corners
+        self.edges = edges
+
+    @staticmethod
+    def from_cubie_cube(cc):
+        return PackedCube(int.from_bytes(bytes(cc.corner_array), 'little'),
+                          int.from_bytes(bytes(cc.edge_array), 'little'))
+
+    def to_cubie_cube(self, cc=None):
+        if cc is None:
+            from cubie_cube import CubieCube
+            cc = CubieCube()
+        cc.corner_array = list(self.corners.to_bytes(8, 'little'))
+        cc.edge_array = list(self.edges.to_bytes(12, 'little'))
+        return cc
+
+    def __eq__(self, other):
+        return isinstance(other, PackedCube) and self.corners == other.corners and self.edges == other.edges
+
+    def __hash__(self):
+        return hash((self.corners, self.edges))
+
+    def __repr__(self):
+        return f"PackedCube(0x{self.corners:016x}, 0x{self.edges:024x})"
+
+    def is_solved(self):
+        return self.corners == PackedCube.SOLVED_CORNERS and self.edges == PackedCube.SOLVED_EDGES
+
+    def move(self, m):
+        """Applies move m (self = self * M), like turning the cube in a scramble."""
+        self.corners = int.from_bytes(
+            (int.from_bytes(bytes(PackedCube.CORNER_GATHER[m](self.corners.to_bytes(8, 'little'))), 'little')
+             + PackedCube.CORNER_TWIST[m]).to_bytes(8, 'little').translate(PackedCube.CORNER_ORIENTATION_TABLE), 'little')
+        self.edges = int.from_bytes(bytes(PackedCube.EDGE_GATHER[m](self.edges.to_bytes(12, 'little'))),
+                                    'little') ^ PackedCube.EDGE_FLIP[m]
+        return self
+
+    def apply_moves(self, moves):
+        for m in moves:
+            self.move(m)
+        return self
+
+    def pre_move(self, m):
+        """Applies move m on the other side (self = M * self)."""
+        self.corners = int.from_bytes(
+            self.corners.to_bytes(8, 'little').translate(PackedCube.CORNER_PRE_MOVE_TABLE[m]), 'little')
+        self.edges = int.from_bytes(
+            self.edges.to_bytes(12, 'little').translate(PackedCube.EDGE_PRE_MOVE_TABLE[m]), 'little')
+        return self
+
+    def inverse(self):
+        corners = self.corners.to_bytes(8, 'little')
+        order = sorted(range(8), key=corners.translate(PackedCube.CORNER_INDEX_TABLE).__getitem__)
+        inverse_corners = (int.from_bytes(bytes(order), 'little') + int.from_bytes(
+            bytes(map(corners.__getitem__, order)).translate(PackedCube.CORNER_INVERSE_TWIST_TABLE), 'little'))
+        edges = self.edges.to_bytes(12, 'little')
+        order = sorted(range(12), key=edges.__getitem__)
+        inverse_edges = (int.from_bytes(bytes(order), 'little') * 2 + int.from_bytes(
+            bytes(map(edges.__getitem__, order)).translate(PackedCube.EDGE_FLIP_TABLE), 'little'))
+        return PackedCube(inverse_corners, inverse_edges)
+
+####################################################### CubieCube drop-ins #######################################################
+
+    @staticmethod
+    def multiply_corners_by_move(a, m, prod):
+        """prod = a * M_m on the corners; same result as CubieCube.multiply_corners(a, MOVE_CUBE_STATES[m], prod)."""
+        prod.corner_array = list(
+            (int.from_bytes(bytes(PackedCube.CORNER_GATHER[m](a.corner_array)), 'little') + PackedCube.CORNER_TWIST[m])
+            .to_bytes(8, 'little').translate(PackedCube.CORNER_ORIENTATION_TABLE))
+
+    @staticmethod
+    def multiply_edges_by_move(a, m, prod):
+        prod.edge_array = list(
+            (int.from_bytes(bytes(PackedCube.EDGE_GATHER[m](a.edge_array)), 'little') ^ PackedCube.EDGE_FLIP[m])
+            .to_bytes(12, 'little'))
+
+    @staticmethod
+    def multiply_by_move(a, m, prod):
+        PackedCube.multiply_corners_by_move(a, m, prod)
+        PackedCube.multiply_edges_by_move(a, m, prod)
+
+    @staticmethod
+    def move_multiply(m, b, prod):
+        """prod = M_m * b; same result as multiplying MOVE_CUBE_STATES[m] by b corner- and edge-wise."""
+        prod.corner_array = list(bytes(b.corner_array).translate(PackedCube.CORNER_PRE_MOVE_TABLE[m]))
+        prod.edge_array = list(bytes(b.edge_array).translate(PackedCube.EDGE_PRE_MOVE_TABLE[m]))
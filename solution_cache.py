@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+from cube_utils import CubeUtils
+from cubie_cube import CubieCube
+
+
+class SolutionCache:
+    """Bounded LRU cache of solutions keyed by the canonical form of a cube's symmetry class.
+
+    The class of a cube is its 48 conjugates by the cube symmetries (16 symmetries x 3 URF
+    conjugations) and those of its inverse. The canonical form is the smallest of these 96 cubes;
+    solutions are stored as moves for the canonical cube and mapped back on each hit.
+    """
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def canonicalize(cc):
+        """Returns (key, variant) where variant = inverse * 48 + urf * 16 + sym maps `cc` onto the canonical cube."""
+        c = CubieCube()
+        c.copy(cc)
+        d = CubieCube()
+        best = None
+        variant = 0
+        for i in range(96):
+            sym = CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][i % 16]
+            CubieCube.conjugate_corners(c, sym, d)
+            # Edges only matter when the corners tie or beat the best so far
+            if best is None or d.corner_array <= best[:8]:
+                CubieCube.conjugate_edges(c, sym, d)
+                candidate = d.corner_array + d.edge_array
+                if best is None or candidate < best:
+                    best = candidate
+                    variant = i
+            if i % 16 == 15:
+                c.perform_urf_conjugation()
+            if i % 48 == 47:
+                c.invert_cubie_cube()
+        return bytes(best), variant
+
+    @staticmethod
+    def invert_moves(moves):
+        return [m // 3 * 3 + 2 - m % 3 for m in reversed(moves)]
+
+    @staticmethod
+    def to_canonical_moves(moves, variant):
+        if variant >= 48:
+            moves = SolutionCache.invert_moves(moves)
+        urf_map = CubieCube.URF_MOVE_MAP[(3 - variant // 16 % 3) % 3]
+        sym_map = CubieCube.SYMMETRY_MOVE_TABLE[variant % 16]
+        return [sym_map[urf_map[m]] for m in moves]
+
+    @staticmethod
+    def from_canonical_moves(moves, variant):
+        sym_map = CubieCube.SYMMETRY_MOVE_TABLE[CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[0][variant % 16]]
+        urf_map = CubieCube.URF_MOVE_MAP[variant // 16 % 3]
+        moves = [urf_map[sym_map[m]] for m in moves]
+        return SolutionCache.invert_moves(moves) if variant >= 48 else moves
+
+    def get(self, key, variant, max_length):
+        """Returns the cached solution moves for the cube `variant` maps onto `key`, or None."""
+        with self.lock:
+            moves = self.entries.get(key)
+            if moves is None or len(moves) > max_length:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return self.from_canonical_moves(moves, variant)
+
+    def put(self, key, variant, moves):
+        moves = self.to_canonical_moves(moves, variant)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                if len(self.entries[key]) <= len(moves):
+                    return
+            self.entries[key] = moves
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.entries), 'capacity': self.capacity,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    @staticmethod
+    def parse_moves(solution):
+        """Converts a solver output string ("U, R2, F'", optionally with a "(Nf)" suffix) into move indices."""
+        return [CubeUtils.MOVE_TO_STRING_MAP.index(token + ",")
+                for token in solution.split("(")[0].replace(",", " ").split()]
+
+    @staticmethod
+    def format_moves(moves):
+        return ", ".join(CubeUtils.MOVE_TO_STRING_MAP[m][:-1] for m in moves)
@@ -1,6 +1,41 @@
+import time
 from cube_utils import CubeUtils
 from coordinate_cube import CoordCube
 from cubie_cube import CubieCube
+from optimal_search import OptimalSearch
+from packed_cube import PackedCube
+from solution_cache import SolutionCache
+
+class SearchStats:
+    """Counters and timings of one Search.solution call, read back as `search.stats`.
+
+    The urf_conjugate, pre_moves and phase1_length fields describe the search that produced the returned
+    solution (None if there is none); phase1_length counts the pre-moves. Times are in seconds.
+    """
+
+    __slots__ = ('phase1_nodes', 'phase2_nodes', 'optimal_nodes', 'probes', 'phase2_inits', 'phase2_init_rejections',
+                 'urf_conjugate', 'pre_moves', 'phase1_length', 'length', 'cache_hit',
+                 'setup_time', 'phase1_time', 'phase2_time', 'total_time')
+
+    def __init__(self):
+        self.phase1_nodes = 0
+        self.phase2_nodes = 0
+        self.optimal_nodes = 0
+        self.probes = 0
+        self.phase2_inits = 0
+        self.phase2_init_rejections = 0
+        self.urf_conjugate = None
+        self.pre_moves = None
+        self.phase1_length = None
+        self.length = None
+        self.cache_hit = False
+        self.setup_time = 0.0
+        self.phase1_time = 0.0
+        self.phase2_time = 0.0
+        self.total_time = 0.0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
 
 class Search:
 
@@ -11,8 +46,11 @@ class Search:
     USE_CONJUGATE_PRUNING = CubeUtils.USE_TWIST_FLIP_PRUNING
     MIN_PHASE1_LENGTH_AFTER_PREMOVES = 7
     MAX_PHASE2_DEPTH = 13
+    # Nodes between deadline / cancellation checks
+    STOP_CHECK_INTERVAL = 128
 
     inited = False
+    solution_cache = None
 
     def __init__(self):
         self.move = [0] * 31
@@ -29,9 +67,17 @@ class Search:
             self.pre_move_cubie_cubes[i + 1] = CubieCube()
 
         self.pre_move_sequence = [0] * self.MAX_PRE_MOVES
+        # cube, ssym, lm, skipped moves and next move per pre-move level of search_phase1_with_pre_moves
+        self.pre_move_stack = [[None] * (self.MAX_PRE_MOVES + 1)] + [[0] * (self.MAX_PRE_MOVES + 1) for _ in range(4)]
+        # ssym, lm, skipped moves and current move per phase-1 level, and the node coordinates
+        # (twist, twist sym, flip, flip sym, slice, prun, conjugate twist and flip) per phase-1 depth
+        self.phase1_stack = [[0] * 21 for _ in range(4)]
+        self.phase1_coordinates = [[0] * 21 for _ in range(8)]
         self.pre_move_sequence_length = 0
         self.max_pre_moves_to_try = 0
         self.phase2_cubie_cube = None
+        # edge, esym, corn, csym, mid and move per level of the iterative phase-2 search
+        self.phase2_stack = [[0] * (self.MAX_PHASE2_DEPTH + 1) for _ in range(6)]
 
         self.self_symmetries = 0
         self.conjugate_mask = 0
@@ -40,7 +86,7 @@ class Search:
         self.current_phase1_depth = 0
         self.max_phase2_depth_allowed = 0
         self.sol = 0
-        self.solution_string = ""
+        self.solution_string = None
         self.probe = 0
         self.max_probes = 0
         self.min_probes = 0
@@ -49,6 +95,13 @@ class Search:
         self.allow_shorter_phase1 = False
         self.cc = CubieCube()
         self.is_recursive_call = False
+        self.deadline = None
+        self.cancel_token = None
+        self.stoppable = False
+        self.cut_short = False
+        self.on_solution = None
+        self.optimal_search = None
+        self.stats = SearchStats()
 
     # verbosity_level flags
     USE_SEPARATOR = 0x1
@@ -56,7 +109,26 @@ class Search:
     APPEND_LENGTH = 0x4
     OPTIMAL_SOLUTION = 0x8
 
-    def solution(self, facelets: str, maxDepth: int, max_probes: int, min_probes: int, verbosity_level: int) -> str:
+    def solution(self, facelets: str, maxDepth: int, max_probes: int, min_probes: int, verbosity_level: int,
+                 time_limit: float = None, deadline: float = None, cancel_token=None, on_solution=None) -> str:
+        """Solves `facelets`, or returns "Error N".
+
+        The search stops at `deadline` (a time.monotonic() value, or `time_limit` seconds from now) or once
+        `cancel_token` (e.g. a threading.Event) is set, returning the best solution found so far; cut_short
+        then reports True. "Error 9" means it was stopped before any solution was found.
+        `on_solution(solution, length)` is called with each shorter solution as soon as it is found.
+        With OPTIMAL_SOLUTION set in `verbosity_level` the solution is a shortest one (see OptimalSearch); this
+        raises OptimalTableUnavailable if its table file has not been built.
+        Node counts, probes and timings of the call are left in `self.stats`.
+        """
+        start_time = time.perf_counter()
+        self.stats = stats = SearchStats()
+        self.cut_short = False
+        self.on_solution = on_solution
+        self.deadline = deadline if deadline is not None or time_limit is None else time.monotonic() + time_limit
+        self.cancel_token = cancel_token
+        self.stoppable = self.deadline is not None or cancel_token is not None
+
         check = self.verify_facelet_string(facelets)
         if check != 0:
             return f"Error {abs(check)}"
@@ -66,13 +138,63 @@ class Search:
         self.max_probes = max_probes
         self.min_probes = min(min_probes, max_probes)
         self.verbosity_level = verbosity_level
-        self.solution = None
+        self.solution_string = None
         self.is_recursive_call = False
 
         Search.init()
-        self.initialize_search_parameters()
-
-        return self.search()
+        optimal = (verbosity_level & self.OPTIMAL_SOLUTION) != 0
+        cache = Search.solution_cache if (verbosity_level & self.USE_SEPARATOR) == 0 else None
+        if cache is not None:
+            key, variant = cache.canonicalize(self.cc)
+            # Cached solutions are not necessarily the shortest, but an optimal one is still worth caching.
+            # Requests for refinement (min_probes) search too, as the entry may be a first-found solution
+            moves = None if optimal or min_probes > 0 else cache.get(key, variant, maxDepth)
+            if moves is not None:
+                solution = self.format_cached_solution(moves, verbosity_level)
+                if on_solution is not None:
+                    on_solution(solution, len(moves))
+                stats.cache_hit = True
+                stats.length = len(moves)
+                stats.total_time = stats.setup_time = time.perf_counter() - start_time
+                return solution
+
+        if optimal:
+            stats.setup_time = time.perf_counter() - start_time
+            solution = self.optimal_solution(maxDepth, verbosity_level)
+        else:
+            self.initialize_search_parameters()
+            stats.setup_time = time.perf_counter() - start_time
+            solution = self.search()
+        stats.probes = self.probe
+        stats.total_time = time.perf_counter() - start_time
+        stats.phase1_time = stats.total_time - stats.setup_time - stats.phase2_time
+
+        if cache is not None and not solution.startswith("Error") and not self.cut_short:
+            moves = cache.parse_moves(solution)
+            cache.put(key, variant, cache.invert_moves(moves) if verbosity_level & self.INVERSE_SOLUTION else moves)
+        return solution
+
+    def optimal_solution(self, maxDepth, verbosity_level):
+        OptimalSearch.init()
+        if self.optimal_search is None:
+            self.optimal_search = OptimalSearch()
+        moves = self.optimal_search.solve(self.cc, maxDepth, self.should_stop if self.stoppable else None)
+        self.stats.optimal_nodes = self.optimal_search.nodes
+        if moves is None:
+            return "Error 9" if self.cut_short else "Error 7"
+        solution = self.format_cached_solution(moves, verbosity_level)
+        self.stats.length = len(moves)
+        if self.on_solution is not None:
+            self.on_solution(solution, len(moves))
+        return solution
+
+    def format_cached_solution(self, moves, verbosity_level):
+        if (verbosity_level & self.INVERSE_SOLUTION) != 0:
+            moves = SolutionCache.invert_moves(moves)
+        moves_str = SolutionCache.format_moves(moves)
+        if (verbosity_level & self.APPEND_LENGTH) != 0:
+            moves_str += f" ({len(moves)}f)"
+        return moves_str
         
     def initialize_search_parameters(self):
         self.conjugate_mask = (0 if self.TRY_INVERSE_SOLUTION else 0x38) | (0 if self.TRY_ALL_THREE_AXES else 0x36)
@@ -96,12 +218,33 @@ class Search:
                 self.cc.invert_cubie_cube()
 
     @staticmethod
-    def init():
-        if not Search.inited:
-            CubieCube.initialize_moves()
-            CubieCube.initialize_symmetries()
-        CoordCube.init()
-        Search.inited = True
+    def set_twist_flip_pruning(enabled: bool):
+        """Turns the twist x flip phase-1 pruning table, and conjugate pruning with it, on or off.
+
+        Call at startup; if the tables are already loaded and lack it, the table is built on the spot.
+        """
+        with CoordCube.init_lock:
+            if enabled and CoordCube.initialization_level == 2 and CoordCube.TWIST_FLIP_PRUNING_TABLE is None:
+                CoordCube.initialize_twist_flip_pruning_table()
+            CubeUtils.USE_TWIST_FLIP_PRUNING = enabled
+            Search.USE_CONJUGATE_PRUNING = enabled
+
+    @staticmethod
+    def set_solution_cache(capacity):
+        """Puts a symmetry-aware LRU cache of `capacity` solutions in front of solution(); 0 or None removes it."""
+        Search.solution_cache = SolutionCache(capacity) if capacity else None
+        return Search.solution_cache
+
+    @staticmethod
+    def init(jobs=1):
+        if Search.inited and CoordCube.initialization_level == 2:
+            return
+        with CoordCube.init_lock:
+            if not Search.inited:
+                CubieCube.initialize_moves()
+                CubieCube.initialize_symmetries()
+            CoordCube.init(jobs)
+            Search.inited = True
     
     def verify_facelet_string(self, facelets: str) -> int:
         count = 0x000000
@@ -130,51 +273,222 @@ class Search:
         return self.cc.verify_facelet_string()
     
     def search_phase1_with_pre_moves(self, maxl: int, lm: int, cc: CubieCube, ssym: int) -> int:
-        self.pre_move_sequence_length = self.max_pre_moves_to_try - maxl
-
-        if (self.is_recursive_call and self.current_phase1_depth == self.phase1_length - self.pre_move_sequence_length) or \
-        (not self.is_recursive_call and (self.pre_move_sequence_length == 0 or ((0x36FB7 >> lm) & 1) == 0)):
-
-            self.current_phase1_depth = self.phase1_length - self.pre_move_sequence_length
-            self.phase1_cubie_cubes[0] = cc
-            self.allow_shorter_phase1 = (self.current_phase1_depth == self.MIN_PHASE1_LENGTH_AFTER_PREMOVES and self.pre_move_sequence_length != 0)
+        """Searches phase 1 after every pre-move sequence of up to maxl moves, as a single loop.
+
+        Pre-move levels and phase-1 levels keep their state in the flat per-depth arrays set up in
+        __init__, and phase-1 moves are applied with the move and pruning tables inline. Returns 0 when
+        the search is done or stopped and 1 when every sequence was tried. Visits the same nodes in the same order as
+        the recursive reference engine in benchmarks.py, including when resuming along self.move and
+        self.pre_move_sequence with is_recursive_call set.
+        """
+        N_MOVES = CoordCube.N_MOVES_PHASE_1
+        N_SLICE = CoordCube.N_SLICE
+        slice_move = CoordCube.UD_SLICE_MOVE_TABLE
+        flip_move = CoordCube.FLIP_MOVE_TABLE
+        twist_move = CoordCube.TWIST_MOVE_TABLE
+        slice_conj = CoordCube.UD_SLICE_CONJUGATION_TABLE
+        slice_twist_prun = CoordCube.UD_SLICE_TWIST_PRUNING_TABLE
+        slice_flip_prun = CoordCube.UDSliceFlipPrun
+        twist_flip_prun = CoordCube.TWIST_FLIP_PRUNING_TABLE
+        use_twist_flip = CubeUtils.USE_TWIST_FLIP_PRUNING
+        use_conjugate = self.USE_CONJUGATE_PRUNING
+        flip_raw_flipped = CubieCube.FLIP_SYMMETRY_TO_RAW_FLIPPED
+        sym8_move = CubieCube.SYMMETRY_8_MOVE_TABLE
+        conjugate_move = CubieCube.SYMMETRY_MOVE_TABLE[3]
+        move_symmetries = CubieCube.MOVE_CUBE_SYMMETRIES
+        skippable_moves = CubieCube.get_skippable_moves_for_symmetry
+        move = self.move
+        pre_move_sequence = self.pre_move_sequence
+        max_pre_moves = self.max_pre_moves_to_try
+        min_phase1_length = self.MIN_PHASE1_LENGTH_AFTER_PREMOVES
+        p_cube, p_ssym, p_lm, p_skip, p_move = self.pre_move_stack
+        q_ssym, q_lm, q_skip, q_move = self.phase1_stack
+        c_twist, c_tsym, c_flip, c_fsym, c_slice, c_prun, c_twistc, c_flipc = self.phase1_coordinates
+        stoppable = self.stoppable
+        countdown = self.STOP_CHECK_INTERVAL
+        nodes = 0
+
+        # Pre-move level p: p_move[p] is -2 on entry, -1 once phase 1 was tried there, then the next pre-move.
+        # Phase-1 level q (q >= 0 while phase 1 runs): its node is at index q + 1 of the coordinate arrays.
+        top = maxl
+        p = maxl
+        p_cube[p] = cc
+        p_ssym[p] = ssym
+        p_lm[p] = lm
+        p_move[p] = -2
+        q = -1
+        depth = 0
+        entering = False
+        m = 0
+        while True:
+            if q < 0:
+                m = p_move[p]
+                pre_length = max_pre_moves - p
+                if m == -2:
+                    self.pre_move_sequence_length = pre_length
+                    p_move[p] = m = -1
+                    lm = p_lm[p]
+                    if (self.is_recursive_call and self.current_phase1_depth == self.phase1_length - pre_length) or \
+                    (not self.is_recursive_call and (pre_length == 0 or ((0x36FB7 >> lm) & 1) == 0)):
+                        depth = self.current_phase1_depth = self.phase1_length - pre_length
+                        cc = p_cube[p]
+                        self.phase1_cubie_cubes[0] = cc
+                        self.allow_shorter_phase1 = (depth == min_phase1_length and pre_length != 0)
+                        node = self.phase1_nodes[depth + 1]
+                        if node.set_coordinates_with_pruning(cc, depth):
+                            i = depth + 1
+                            c_twist[i], c_tsym[i], c_flip[i], c_fsym[i] = node.twist, node.twist_symmetry, node.flip, node.flip_symmetry
+                            c_slice[i], c_prun[i], c_twistc[i], c_flipc[i] = node.slice, node.prun, node.twist_conjugate, node.flip_conjugate
+                            q = depth
+                            q_ssym[q] = p_ssym[p]
+                            q_lm[q] = -1
+                            entering = True
+                            continue
+
+                if m == -1:
+                    if p == 0 or pre_length + min_phase1_length >= self.phase1_length:
+                        if p == top:
+                            self.stats.phase1_nodes += nodes
+                            return 1
+                        p += 1
+                        continue
+                    skip = skippable_moves(p_ssym[p])
+                    if p == 1 or pre_length + 1 + min_phase1_length >= self.phase1_length:
+                        skip |= 0x36FB7
+                    p_skip[p] = skip
+                    m = 0
+
+                lm = (p_lm[p] // 3) * 3
+                skip = p_skip[p]
+                while m < 18 and (m == lm or m == lm - 9 or m == lm + 9 or (skip >> m) & 1 != 0 or
+                                  (self.is_recursive_call and m != pre_move_sequence[pre_length])):
+                    m += 1
+                if m == 18:
+                    if p == top:
+                        self.stats.phase1_nodes += nodes
+                        return 1
+                    p += 1
+                    continue
 
-            if self.phase1_nodes[self.current_phase1_depth + 1].set_coordinates_with_pruning(cc, self.current_phase1_depth) and \
-                self.phase1(self.phase1_nodes[self.current_phase1_depth + 1], ssym, self.current_phase1_depth, -1) == 0:
-                return 0
+                p_move[p] = m + 1
+                PackedCube.move_multiply(m, p_cube[p], self.pre_move_cubie_cubes[p])
+                pre_move_sequence[pre_length] = m
+                p -= 1
+                p_cube[p] = self.pre_move_cubie_cubes[p + 1]
+                p_ssym[p] = p_ssym[p + 1] & move_symmetries[m]
+                p_lm[p] = m
+                p_move[p] = -2
+                continue
 
-        if maxl == 0 or self.pre_move_sequence_length + self.MIN_PHASE1_LENGTH_AFTER_PREMOVES >= self.phase1_length:
-            return 1
+            if entering:
+                entering = False
+                if c_prun[q + 1] == 0 and q < 5:
+                    if self.allow_shorter_phase1 or q == 0:
+                        self.current_phase1_depth = depth - q
+                        ret = self.initialize_phase2_from_pre_moves()
+                        self.current_phase1_depth = depth
+                    else:
+                        ret = 1
+                    # Return ret to the level above: the search ends on 0, 2 skips the rest of that move's axis
+                    if ret == 0:
+                        self.stats.phase1_nodes += nodes
+                        return 0
+                    if q == depth:
+                        q = -1
+                        continue
+                    q += 1
+                    m = q_move[q]
+                    m = m - m % 3 + 3 if ret == 2 else m + 1
+                else:
+                    ssym = q_ssym[q]
+                    q_skip[q] = skippable_moves(ssym) if ssym > 1 else 0
+                    m = 0
+
+            i = q + 1
+            lm = q_lm[q]
+            skip = q_skip[q]
+            while m < 18:
+                if m % 3 == 0 and (m == lm or m == lm - 9):
+                    m += 3
+                    continue
+                if (skip >> m) & 1 != 0 or (self.is_recursive_call and m != move[depth - q]):
+                    m += 1
+                    continue
 
-        skipMoves = CubieCube.get_skippable_moves_for_symmetry(ssym)
+                # CoordCube.move_and_get_pruning_table_value_value, inlined
+                slice_ = slice_move[c_slice[i] * N_MOVES + m]
+                fsym = c_fsym[i]
+                flip = flip_move[c_flip[i] * N_MOVES + sym8_move[(m << 3) | fsym]]
+                fsym ^= flip & 7
+                flip >>= 3
+                tsym = c_tsym[i]
+                twist = twist_move[c_twist[i] * N_MOVES + sym8_move[(m << 3) | tsym]]
+                tsym ^= twist & 7
+                twist >>= 3
+                idx = twist * N_SLICE + slice_conj[slice_ << 3 | tsym]
+                prun = (slice_twist_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+                idx = flip * N_SLICE + slice_conj[slice_ << 3 | fsym]
+                p2 = (slice_flip_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+                if p2 > prun:
+                    prun = p2
+                if use_twist_flip:
+                    idx = (twist << 11) | flip_raw_flipped[(flip << 3) | (fsym ^ tsym)]
+                    p2 = (twist_flip_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+                    if p2 > prun:
+                        prun = p2
+                if prun > q:
+                    m = m - m % 3 + 3
+                    continue
+                elif prun == q:
+                    m += 1
+                    continue
 
-        if maxl == 1 or self.pre_move_sequence_length + 1 + self.MIN_PHASE1_LENGTH_AFTER_PREMOVES >= self.phase1_length:
-            skipMoves |= 0x36FB7
+                if use_conjugate:
+                    # CoordCube.conjugate_move_and_get_pruning_table_value_value, inlined
+                    mc = conjugate_move[m]
+                    flipc = c_flipc[i]
+                    flipc = flip_move[(flipc >> 3) * N_MOVES + sym8_move[(mc << 3) | (flipc & 7)]] ^ (flipc & 7)
+                    twistc = c_twistc[i]
+                    twistc = twist_move[(twistc >> 3) * N_MOVES + sym8_move[(mc << 3) | (twistc & 7)]] ^ (twistc & 7)
+                    idx = ((twistc >> 3) << 11) | flip_raw_flipped[flipc ^ (twistc & 7)]
+                    p2 = (twist_flip_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+                    if p2 > q:
+                        m = m - m % 3 + 3
+                        continue
+                    elif p2 == q:
+                        m += 1
+                        continue
+                    c_twistc[q] = twistc
+                    c_flipc[q] = flipc
 
-        lm = (lm // 3) * 3
+                c_twist[q], c_tsym[q], c_flip[q], c_fsym[q], c_slice[q], c_prun[q] = twist, tsym, flip, fsym, slice_, prun
+                move[depth - q] = m
+                if depth - q < self.valid_phase1_moves_count:
+                    self.valid_phase1_moves_count = depth - q
+                break
 
-        for m in range(18):
-            if m == lm or m == lm - 9 or m == lm + 9:
-                m += 2
+            if m < 18:
+                if stoppable:
+                    countdown -= 1
+                    if countdown == 0:
+                        countdown = self.STOP_CHECK_INTERVAL
+                        if self.should_stop():
+                            self.stats.phase1_nodes += nodes
+                            return 0
+                nodes += 1
+                q_move[q] = m
+                q -= 1
+                q_ssym[q] = q_ssym[q + 1] & move_symmetries[m]
+                q_lm[q] = m - m % 3
+                entering = True
                 continue
-            if (self.is_recursive_call and m != self.pre_move_sequence[self.max_pre_moves_to_try - maxl]) or \
-            ((skipMoves & (1 << m)) != 0):
-                continue
-
-            CubieCube.multiply_corners(CubieCube.MOVE_CUBE_STATES[m], cc, self.pre_move_cubie_cubes[maxl])
-            CubieCube.multiply_edges(CubieCube.MOVE_CUBE_STATES[m], cc, self.pre_move_cubie_cubes[maxl])
-            self.pre_move_sequence[self.max_pre_moves_to_try - maxl] = m
-
-            ret = self.search_phase1_with_pre_moves(
-                maxl - 1,
-                m,
-                self.pre_move_cubie_cubes[maxl],
-                ssym & CubieCube.MOVE_CUBE_SYMMETRIES[m]
-            )
-            if ret == 0:
-                return 0
 
-        return 1
+            # Every move from level q was tried: return 1 to the level above
+            if q == depth:
+                q = -1
+                continue
+            q += 1
+            m = q_move[q] + 1
 
     def search(self) -> str:
         self.phase1_length = self.phase1_length if self.is_recursive_call else 0
@@ -189,41 +503,56 @@ class Search:
                     continue
 
                 if self.search_phase1_with_pre_moves(self.max_pre_moves_to_try, -30, self.urf_conjugated_cubie_cubes[self.urf_conjugate_index], int(self.self_symmetries & 0xffff)) == 0:
-                    return "Error 8" if self.solution is None else self.solution
+                    if self.solution_string is None:
+                        return "Error 9" if self.cut_short else "Error 8"
+                    return self.solution_string
 
                 self.urf_conjugate_index += 1
 
             self.phase1_length += 1
 
-        return "Error 7" if self.solution is None else self.solution
+        return "Error 7" if self.solution_string is None else self.solution_string
+
+    def should_stop(self) -> bool:
+        """Polled during the search; latches cut_short once the deadline has passed or the search was cancelled."""
+        if (self.deadline is not None and time.monotonic() >= self.deadline) or \
+        (self.cancel_token is not None and self.cancel_token.is_set()):
+            self.cut_short = True
+        return self.cut_short
 
     def initialize_phase2_from_pre_moves(self) -> int:
         self.is_recursive_call = False
-        if self.probe >= (self.max_probes if self.solution is None else self.min_probes):
+        if self.probe >= (self.max_probes if self.solution_string is None else self.min_probes):
+            return 0
+        if self.stoppable and self.should_stop():
             return 0
 
         self.probe += 1
 
         for i in range(self.valid_phase1_moves_count, self.current_phase1_depth):
-            CubieCube.multiply_corners(self.phase1_cubie_cubes[i], CubieCube.MOVE_CUBE_STATES[self.move[i]], self.phase1_cubie_cubes[i + 1])
-            CubieCube.multiply_edges(self.phase1_cubie_cubes[i], CubieCube.MOVE_CUBE_STATES[self.move[i]], self.phase1_cubie_cubes[i + 1])
+            PackedCube.multiply_by_move(self.phase1_cubie_cubes[i], self.move[i], self.phase1_cubie_cubes[i + 1])
 
         self.valid_phase1_moves_count = self.current_phase1_depth
         self.phase2_cubie_cube = self.phase1_cubie_cubes[self.current_phase1_depth]
 
+        start_time = time.perf_counter()
         ret = self.initialize_phase2()
+        self.stats.phase2_time += time.perf_counter() - start_time
+        if self.cut_short:
+            return 0
         if ret == 0 or self.pre_move_sequence_length == 0 or ret == 2:
             return ret
 
         m = (self.pre_move_sequence[self.pre_move_sequence_length - 1] // 3) * 3 + 1
         self.phase2_cubie_cube = CubieCube()
-        CubieCube.multiply_corners(CubieCube.MOVE_CUBE_STATES[m], self.phase1_cubie_cubes[self.current_phase1_depth], self.phase2_cubie_cube)
-        CubieCube.multiply_edges(CubieCube.MOVE_CUBE_STATES[m], self.phase1_cubie_cubes[self.current_phase1_depth], self.phase2_cubie_cube)
+        PackedCube.move_multiply(m, self.phase1_cubie_cubes[self.current_phase1_depth], self.phase2_cubie_cube)
 
         self.pre_move_sequence[self.pre_move_sequence_length - 1] += 2 - (self.pre_move_sequence[self.pre_move_sequence_length - 1] % 3) * 2
+        start_time = time.perf_counter()
         ret = self.initialize_phase2()
+        self.stats.phase2_time += time.perf_counter() - start_time
         self.pre_move_sequence[self.pre_move_sequence_length - 1] += 2 - (self.pre_move_sequence[self.pre_move_sequence_length - 1] % 3) * 2
-        return ret
+        return 0 if self.cut_short else ret
 
     def initialize_phase2(self) -> int:
         p2corn = self.phase2_cubie_cube.get_corner_permutation_symmetry()
@@ -241,17 +570,20 @@ class Search:
                 CoordCube.EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE,
                 p2edge * CoordCube.N_COMB +
                 CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE[
-                    CubieCube.PERMUTATION_TO_COMBINATION_PLUS_PARITY[p2corn] & 0xff
-                ][CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[p2esym][p2csym]]
+                    (CubieCube.PERMUTATION_TO_COMBINATION_PLUS_PARITY[p2corn] & 0xff) << 4 |
+                    CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[p2esym][p2csym]
+                ]
             ),
             CoordCube.get_pruning_table_value(
                 CoordCube.MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE,
                 p2corn * CoordCube.N_MPERM +
-                CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE[p2mid][p2csym]
+                CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE[p2mid << 4 | p2csym]
             )
         )
 
+        self.stats.phase2_inits += 1
         if prun >= self.max_phase2_depth_allowed:
+            self.stats.phase2_init_rejections += 1
             return 2 if prun > self.max_phase2_depth_allowed else 1
 
         for depth2 in range(self.max_phase2_depth_allowed - 1, prun - 1, -1):
@@ -267,7 +599,14 @@ class Search:
             for i in range(self.pre_move_sequence_length - 1, -1, -1):
                 self.append_move_to_solution(self.pre_move_sequence[i])
 
-            self.solution = self.solution_to_string()
+            self.solution_string = self.solution_to_string()
+            stats = self.stats
+            stats.urf_conjugate = self.urf_conjugate_index
+            stats.pre_moves = self.pre_move_sequence_length
+            stats.phase1_length = self.phase1_length
+            stats.length = self.sol
+            if self.on_solution is not None:
+                self.on_solution(self.solution_string, self.sol)
 
         if depth2 != self.max_phase2_depth_allowed - 1:
             self.max_phase2_depth_allowed = min(self.MAX_PHASE2_DEPTH, self.sol - self.phase1_length)
@@ -275,50 +614,6 @@ class Search:
         else:
             return 1
 
-    def phase1(self, node, ssym, maxl, lm):
-        if node.prun == 0 and maxl < 5:
-            if self.allow_shorter_phase1 or maxl == 0:
-                self.current_phase1_depth -= maxl
-                ret = self.initialize_phase2_from_pre_moves()
-                self.current_phase1_depth += maxl
-                return ret
-            else:
-                return 1
-
-        skipMoves = CubieCube.get_skippable_moves_for_symmetry(ssym)
-
-        for axis in range(0, 18, 3):
-            if axis == lm or axis == lm - 9:
-                continue
-            for power in range(3):
-                m = axis + power
-
-                if (self.is_recursive_call and m != self.move[self.current_phase1_depth - maxl]) or \
-                (skipMoves != 0 and (skipMoves & (1 << m)) != 0):
-                    continue
-
-                prun = self.phase1_nodes[maxl].move_and_get_pruning_table_value_value(node, m, True)
-                if prun > maxl:
-                    break
-                elif prun == maxl:
-                    continue
-
-                if self.USE_CONJUGATE_PRUNING:
-                    prun = self.phase1_nodes[maxl].conjugate_move_and_get_pruning_table_value_value(node, m)
-                    if prun > maxl:
-                        break
-                    elif prun == maxl:
-                        continue
-
-                self.move[self.current_phase1_depth - maxl] = m
-                self.valid_phase1_moves_count = min(self.valid_phase1_moves_count, self.current_phase1_depth - maxl)
-                ret = self.phase1(self.phase1_nodes[maxl], ssym & CubieCube.MOVE_CUBE_SYMMETRIES[m], maxl - 1, axis)
-                if ret == 0:
-                    return 0
-                elif ret == 2:
-                    break
-        return 1
-
     def append_move_to_solution(self, cur_move):
         if self.sol == 0:
             self.solution_move_sequence[self.sol] = cur_move
@@ -349,55 +644,122 @@ class Search:
         self.sol += 1
 
     def phase2(self, edge, esym, corn, csym, mid, maxl, depth, lm):
+        """Searches phase 2 depth-first from the given coordinates within maxl moves, on an explicit stack.
+
+        Returns the number of moves left unused and writes the moves to self.move[depth:] on success, -1
+        otherwise or when should_stop() fires. Visits the same nodes in the same order as the recursive
+        reference engine in benchmarks.py.
+        """
         if edge == 0 and corn == 0 and mid == 0:
             return maxl
 
-        move_mask = CubeUtils.CHECK_MOVE_TO_BIT_MAP[lm]
+        N_MOVES = CoordCube.N_MOVES_PHASE_2
+        N_COMB = CoordCube.N_COMB
+        N_MPERM = CoordCube.N_MPERM
+        mid_move = CoordCube.MIDDLE_PERMUTATION_MOVE_TABLE
+        corn_move = CoordCube.CORNER_PERMUTATION_MOVE_TABLE
+        edge_move = CoordCube.EDGE_PERMUTATION_MOVE_TABLE
+        mid_conj = CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE
+        comb_conj = CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE
+        mid_corn_prun = CoordCube.MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE
+        edge_comb_prun = CoordCube.EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE
+        perm_to_comb = CubieCube.PERMUTATION_TO_COMBINATION_PLUS_PARITY
+        perm_inverse = CubieCube.PERMUTATION_INVERSE_EDGE_SYMMETRY
+        edge_to_corner = CubieCube.SYMMETRY_EDGE_TO_CORNER_MAGIC_NUMBER
+        sym_mult = CubieCube.SYMMETRY_MULTIPLICATION_TABLE
+        sym_mult_inv = CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE
+        sym_moves = CubieCube.SYMMETRY_UP_DOWN_MOVE_TABLE
+        check_moves = CubeUtils.CHECK_MOVE_TO_BIT_MAP
+        st_edge, st_esym, st_corn, st_csym, st_mid, st_move = self.phase2_stack
+        stoppable = self.stoppable
+        countdown = self.STOP_CHECK_INTERVAL
+        nodes = 0
+
+        # Stack level i holds the node at depth + i while st_move[i] is the move being tried from it
+        level = 0
         m = 0
-        while m < 10:
+        move_mask = check_moves[lm]
+        csym_moves = sym_moves[csym]
+        esym_moves = sym_moves[esym]
+        while True:
+            if m >= 10:
+                if level == 0:
+                    self.stats.phase2_nodes += nodes
+                    return -1
+                level -= 1
+                maxl += 1
+                edge = st_edge[level]
+                esym = st_esym[level]
+                corn = st_corn[level]
+                csym = st_csym[level]
+                mid = st_mid[level]
+                m = st_move[level] + 1
+                move_mask = check_moves[st_move[level - 1] if level > 0 else lm]
+                csym_moves = sym_moves[csym]
+                esym_moves = sym_moves[esym]
+                continue
+
             if (move_mask >> m) & 1 != 0:
-                m += (0x42 >> m) & 3
-                m += 1
+                m += ((0x42 >> m) & 3) + 1
                 continue
 
-            midx = CoordCube.MIDDLE_PERMUTATION_MOVE_TABLE[mid][m]
-            cornx = CoordCube.CORNER_PERMUTATION_MOVE_TABLE[corn][CubieCube.SYMMETRY_UP_DOWN_MOVE_TABLE[csym][m]]
-            csymx = CubieCube.SYMMETRY_MULTIPLICATION_TABLE[cornx & 0xf][csym]
+            midx = mid_move[mid * N_MOVES + m]
+            cornx = corn_move[corn * N_MOVES + csym_moves[m]]
+            csymx = sym_mult[cornx & 0xf][csym]
             cornx >>= 4
-            edgex = CoordCube.EDGE_PERMUTATION_MOVE_TABLE[edge][CubieCube.SYMMETRY_UP_DOWN_MOVE_TABLE[esym][m]]
-            esymx = CubieCube.SYMMETRY_MULTIPLICATION_TABLE[edgex & 0xf][esym]
+            edgex = edge_move[edge * N_MOVES + esym_moves[m]]
+            esymx = sym_mult[edgex & 0xf][esym]
             edgex >>= 4
 
-            edgei = CubieCube.get_inverse_permutation_symmetry(edgex, esymx, False)
-            corni = CubieCube.get_inverse_permutation_symmetry(cornx, csymx, True)
+            # CubieCube.get_inverse_permutation_symmetry, inlined for the edge and the corner coordinate
+            edgei = perm_inverse[edgex]
+            esymi = sym_mult[edgei & 0xf][esymx]
+            corni = perm_inverse[cornx]
+            corni ^= (edge_to_corner >> ((corni & 0xf) << 1)) & 3
+            csymi = sym_mult[corni & 0xf][csymx]
 
-            prun = CoordCube.get_pruning_table_value(
-                CoordCube.EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE,
-                (edgei >> 4) * CoordCube.N_COMB + CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE[CubieCube.PERMUTATION_TO_COMBINATION_PLUS_PARITY[corni >> 4] & 0xff][CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[edgei & 0xf][corni & 0xf]]
-            )
+            idx = (edgei >> 4) * N_COMB + comb_conj[(perm_to_comb[corni >> 4] & 0xff) << 4 | sym_mult_inv[esymi][csymi]]
+            prun = (edge_comb_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
             if prun >= maxl:
-                m += ((0x42 >> m) & 3) & (maxl - prun)
-                m += 1
+                m += (((0x42 >> m) & 3) & (maxl - prun)) + 1
                 continue
 
-            # --- Pruning Check 2 ---
-            prun = max(
-                CoordCube.get_pruning_table_value(CoordCube.MIDDLE_CORNER_PERMUTATION_PRUNING_TABLE, cornx * CoordCube.N_MPERM + CoordCube.MIDDLE_PERMUTATION_CONJUGATION_TABLE[midx][csymx]),
-                CoordCube.get_pruning_table_value(CoordCube.EDGE_PERMUTATION_CORNER_COMBINATION_PRUNING_TABLE, edgex * CoordCube.N_COMB + CoordCube.CORNER_COMBINATION_PLUS_PARITY_CONJUGATION_TABLE[CubieCube.PERMUTATION_TO_COMBINATION_PLUS_PARITY[cornx] & 0xff][CubieCube.SYMMETRY_MULTIPLICATION_INVERSE_TABLE[esymx][csymx]])
-            )
+            idx = cornx * N_MPERM + mid_conj[midx << 4 | csymx]
+            prun = (mid_corn_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF
+            idx = edgex * N_COMB + comb_conj[(perm_to_comb[cornx] & 0xff) << 4 | sym_mult_inv[esymx][csymx]]
+            prun = max(prun, (edge_comb_prun[idx >> 3] >> ((idx & 7) << 2)) & 0xF)
             if prun >= maxl:
-                m += ((0x42 >> m) & 3) & (maxl - prun)
-                m += 1
+                m += (((0x42 >> m) & 3) & (maxl - prun)) + 1
                 continue
-                
-            ret = self.phase2(edgex, esymx, cornx, csymx, midx, maxl - 1, depth + 1, m)
-            if ret >= 0:
-                self.move[depth] = CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[m]
-                return ret
-            
-            m += 1
-            
-        return -1
+
+            st_move[level] = m
+            if edgex == 0 and cornx == 0 and midx == 0:
+                for i in range(level + 1):
+                    self.move[depth + i] = CubeUtils.UP_DOWN_TO_STANDARD_MOVE_MAP[st_move[i]]
+                self.stats.phase2_nodes += nodes + 1
+                return maxl - 1
+
+            if stoppable:
+                countdown -= 1
+                if countdown == 0:
+                    countdown = self.STOP_CHECK_INTERVAL
+                    if self.should_stop():
+                        self.stats.phase2_nodes += nodes
+                        return -1
+
+            nodes += 1
+            st_edge[level] = edge
+            st_esym[level] = esym
+            st_corn[level] = corn
+            st_csym[level] = csym
+            st_mid[level] = mid
+            level += 1
+            maxl -= 1
+            edge, esym, corn, csym, mid = edgex, esymx, cornx, csymx, midx
+            move_mask = check_moves[m]
+            csym_moves = sym_moves[csym]
+            esym_moves = sym_moves[esym]
+            m = 0
 
     def solution_to_string(self):
         sb = []